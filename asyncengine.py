@@ -0,0 +1,642 @@
+'''
+6.176 MIT POKERBOTS ASYNCIO ENGINE
+Plays many games of the engine at once on one event loop, with results and logs identical to engine.py.
+'''
+from collections import deque
+from array import array
+import contextvars
+import contextlib
+import subprocess
+import tempfile
+import asyncio
+import random
+import shutil
+import socket
+import time
+import sys
+import os
+
+sys.path.append(os.getcwd())
+from config import *
+import engine
+import gamerecord
+from botpool import BotPool
+from latencylog import LatencyLog
+from localplayer import LocalPlayer
+from engine import RoundState, TerminalState, CheckAction, FoldAction, InvalidAction
+from engine import DECODE, PROTOCOL_OFFER, RESPONSE, BINARY_QUIT, NEW_GAME
+
+# the file each running game prints to, so that concurrent games do not interleave their output
+GAME_OUTPUT = contextvars.ContextVar('GAME_OUTPUT', default=sys.stdout)
+
+
+class GameOutput():
+    '''
+    Stands in for sys.stdout while games run, writing to the output of the game whose task is printing.
+    '''
+
+    def write(self, text):
+        return GAME_OUTPUT.get().write(text)
+
+    def flush(self):
+        GAME_OUTPUT.get().flush()
+
+
+class BotConnection(asyncio.Protocol):
+    '''
+    Buffers the responses a pokerbot sends over its socket.
+    Each response is stamped with the time it arrived, so that a busy event loop is not charged to the pokerbot.
+    '''
+
+    def __init__(self):
+        self.transport = None
+        self.binary = False
+        self.buffer = bytearray()
+        self.responses = deque()
+        self.waiter = None
+        self.closed = False
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data):
+        arrival_time = time.perf_counter()
+        self.buffer += data
+        self.split(arrival_time)
+
+    def connection_lost(self, exc):
+        if self.buffer and not self.binary:
+            # a partial line is returned before the end of the stream, as readline does
+            self.responses.append((bytes(self.buffer), time.perf_counter()))
+            self.buffer.clear()
+        self.closed = True
+        self.wake()
+
+    def split(self, arrival_time):
+        '''
+        Moves every complete response in the buffer to the response queue.
+        '''
+        buffer = self.buffer
+        start = 0
+        if self.binary:
+            while len(buffer) - start >= RESPONSE.size:
+                self.responses.append((bytes(buffer[start:start+RESPONSE.size]), arrival_time))
+                start += RESPONSE.size
+        else:
+            end = buffer.find(b'\n', start)
+            while end >= 0:
+                self.responses.append((bytes(buffer[start:end+1]), arrival_time))
+                start = end + 1
+                end = buffer.find(b'\n', start)
+        if start:
+            del buffer[:start]
+            self.wake()
+
+    def wake(self):
+        '''
+        Resumes the coroutine waiting for a response, if any.
+        '''
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result(None)
+
+    def write(self, data):
+        '''
+        Writes to the socket without blocking.
+        '''
+        if self.closed or self.transport.is_closing():
+            raise ConnectionResetError
+        self.transport.write(data)
+
+    def expire(self):
+        '''
+        Times out the coroutine waiting for a response, if any.
+        '''
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_exception(asyncio.TimeoutError())
+
+    async def receive(self, timeout):
+        '''
+        Waits up to timeout seconds for the next response and returns it along with its arrival time.
+        The response is empty once the pokerbot has disconnected.
+        '''
+        if not self.responses and not self.closed:
+            # a timer on one future is much cheaper than asyncio.wait_for, which wraps every wait in a task
+            loop = asyncio.get_running_loop()
+            self.waiter = loop.create_future()
+            timer = loop.call_later(max(timeout, 0.), self.expire)
+            try:
+                await self.waiter
+            finally:
+                timer.cancel()
+                self.waiter = None
+        if self.responses:
+            return self.responses.popleft()
+        return b'', time.perf_counter()
+
+    def use_binary(self):
+        '''
+        Switches to binary responses once the binary protocol has been accepted.
+        '''
+        self.binary = True
+        self.split(time.perf_counter())
+
+
+class BotProcess(asyncio.SubprocessProtocol):
+    '''
+    Streams a pokerbot's output to its bot log and notes when it quits.
+    '''
+
+    def __init__(self, player):
+        # the bot log is looked up on each write, since a warm pokerbot moves on to another game's log
+        self.player = player
+        loop = asyncio.get_running_loop()
+        self.exited = loop.create_future()
+        self.output_closed = loop.create_future()
+
+    def pipe_data_received(self, fd, data):
+        self.player.bot_log.write(data)
+
+    def pipe_connection_lost(self, fd, exc):
+        if not self.output_closed.done():
+            self.output_closed.set_result(None)
+
+    def process_exited(self):
+        if not self.exited.done():
+            self.exited.set_result(None)
+
+
+class AsyncPlayer(engine.Player):
+    '''
+    Handles subprocess and socket interactions with one player's pokerbot without blocking the event loop.
+    '''
+
+    def __init__(self, name, path, output_dir=''):
+        super().__init__(name, path, output_dir)
+        self.connection = None
+        self.process = None
+        self.bot_transport = None
+
+    async def start(self, args, pass_fds=()):
+        '''
+        Starts the pokerbot with its connection arguments and streams its output into the bot log.
+        '''
+        loop = asyncio.get_running_loop()
+        self.bot_transport, self.process = await loop.subprocess_exec(
+            lambda: BotProcess(self), *(self.commands['run'] + args), stdin=None,
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, cwd=self.path, pass_fds=pass_fds)
+
+    async def negotiate(self, sock):
+        '''
+        Attaches the connected socket to the event loop, first offering the binary protocol
+        if BOT_PROTOCOL is 'binary'.
+        '''
+        loop = asyncio.get_running_loop()
+        _, connection = await loop.connect_accepted_socket(BotConnection, sock)
+        if BOT_PROTOCOL == 'binary':
+            connection.write((PROTOCOL_OFFER + '\n').encode())
+            response, _ = await connection.receive(CONNECT_TIMEOUT)
+            if response.decode().strip() == PROTOCOL_OFFER:
+                connection.use_binary()
+                self.binary = True
+        self.connection = connection
+
+    async def connect_socketpair(self):
+        '''
+        Hands the pokerbot one end of a connected socket pair as an inherited file descriptor.
+        '''
+        engine_socket, bot_socket = socket.socketpair()
+        try:
+            with bot_socket:
+                await self.start(['--fd', str(bot_socket.fileno())], pass_fds=(bot_socket.fileno(),))
+            await self.negotiate(engine_socket)
+        except BaseException:
+            engine_socket.close()
+            raise
+        print(self.name, 'connected successfully')
+
+    async def connect_server(self, transport):
+        '''
+        Listens on a loopback TCP port or a Unix domain socket until the pokerbot connects.
+        '''
+        loop = asyncio.get_running_loop()
+        socket_dir = None
+        try:
+            if transport == 'unix':
+                socket_dir = tempfile.mkdtemp(prefix='pokerbots')
+                address = os.path.join(socket_dir, 'engine.sock')
+                server_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            else:
+                address = ('', 0)
+                server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            with server_socket:
+                server_socket.bind(address)
+                server_socket.setblocking(False)
+                server_socket.listen()
+                if transport == 'unix':
+                    await self.start(['--unix', address])
+                else:
+                    await self.start([str(server_socket.getsockname()[1])])
+                # wait until we timeout or the player connects
+                client_socket, _ = await asyncio.wait_for(loop.sock_accept(server_socket), CONNECT_TIMEOUT)
+                try:
+                    if transport != 'unix':
+                        # messages may be written back to back, which Nagle's algorithm would delay
+                        client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                    await self.negotiate(client_socket)
+                except BaseException:
+                    client_socket.close()
+                    raise
+                print(self.name, 'connected successfully')
+        finally:
+            if socket_dir is not None:
+                shutil.rmtree(socket_dir, ignore_errors=True)
+
+    async def run(self):
+        '''
+        Runs the pokerbot and establishes the socket connection over BOT_TRANSPORT.
+        '''
+        if self.commands is not None and len(self.commands['run']) > 0:
+            transport = self.transport()
+            try:
+                if transport == 'socketpair':
+                    await self.connect_socketpair()
+                else:
+                    await self.connect_server(transport)
+            except (TypeError, ValueError):
+                print(self.name, 'run command misformatted')
+            except asyncio.TimeoutError:
+                print('Timed out waiting for', self.name, 'to connect')
+            except OSError:
+                print(self.name, 'run failed - check "run" in commands.json')
+
+    async def stop(self):
+        '''
+        Closes the socket connection and stops the pokerbot.
+        '''
+        if self.connection is not None:
+            try:
+                # closing before the pokerbot acks the last pushed round would break its pipe
+                while self.pending_acks:
+                    await self.receive(CONNECT_TIMEOUT)
+                    self.pending_acks -= 1
+                if self.deferred:
+                    # deliver the end of the last round along with the quit clause
+                    if self.binary:
+                        self.connection.write(self.encode([b''] + self.deferred + [b'Q']))
+                    else:
+                        self.connection.write(self.encode(['T0.'] + self.deferred + ['Q']).encode())
+                else:
+                    self.connection.write(BINARY_QUIT if self.binary else b'Q\n')
+            except asyncio.TimeoutError:
+                print('Timed out waiting for', self.name, 'to disconnect')
+            except OSError:
+                print('Could not close socket connection with', self.name)
+            self.connection.transport.close()
+        if self.process is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(self.process.exited), CONNECT_TIMEOUT)
+            except asyncio.TimeoutError:
+                print('Timed out waiting for', self.name, 'to quit')
+                self.bot_transport.kill()
+                await self.process.exited
+            try:
+                # the pipe may be held open by processes the bot started
+                await asyncio.wait_for(asyncio.shield(self.process.output_closed), CONNECT_TIMEOUT)
+            except asyncio.TimeoutError:
+                pass
+            self.bot_transport.close()
+        self.bot_log.close()
+
+    def finish(self):
+        '''
+        Ends the game without stopping the pokerbot, sending the new game clause along with
+        the end of the last round if it was held back. Its ack is read by reset.
+        '''
+        try:
+            if self.binary:
+                self.connection.write(self.encode([b''] + self.deferred + [NEW_GAME.encode()]))
+            else:
+                self.connection.write(self.encode(['T0.'] + self.deferred + [NEW_GAME]).encode())
+        except OSError:
+            return False
+        self.deferred = []
+        self.pending_acks += 1
+        return True
+
+    async def reset(self, output_dir):
+        '''
+        Starts a new game with a finished pokerbot, logging to output_dir, and returns whether it acked.
+        '''
+        clause = None
+        try:
+            while self.pending_acks:
+                clause, _ = await self.receive(CONNECT_TIMEOUT)
+                self.pending_acks -= 1
+        except (asyncio.TimeoutError, OSError):
+            return False
+        if clause != NEW_GAME:
+            return False
+        self.game_clock = STARTING_GAME_CLOCK
+        self.bankroll = 0
+        self.latencies = LatencyLog()
+        self.bot_log.close()
+        self.bot_log = engine.BotLog(os.path.join(output_dir, self.name + '.txt'))
+        return True
+
+    async def receive(self, timeout):
+        '''
+        Waits for the pokerbot to respond and returns its response clause along with its arrival time.
+        '''
+        response, arrival_time = await self.connection.receive(timeout)
+        if self.binary:
+            if len(response) < RESPONSE.size:
+                return '', arrival_time
+            code, amount = RESPONSE.unpack(response)
+            code = code.decode('latin-1')
+            return (code + str(amount) if code == 'R' else code), arrival_time
+        return response.decode().strip(), arrival_time
+
+    async def query(self, round_state, player_message, game_log):
+        '''
+        Requests one action from the pokerbot over the socket connection.
+        At the end of the round, we request a CheckAction from the pokerbot.
+        '''
+        legal_actions = round_state.legal_actions() if isinstance(round_state, RoundState) else {CheckAction}
+        if self.connection is not None and self.game_clock > 0.:
+            try:
+                message = self.encode(player_message)
+                # a response can never take longer than the game clock allows
+                timeout = min(CONNECT_TIMEOUT, self.game_clock) if ENFORCE_GAME_CLOCK else CONNECT_TIMEOUT
+                start_time = time.perf_counter()
+                self.connection.write(message if self.binary else message.encode())
+                # acks of pushed round endings arrive ahead of the response
+                while self.pending_acks:
+                    await self.receive(timeout - (time.perf_counter() - start_time))
+                    self.pending_acks -= 1
+                clause, end_time = await self.receive(timeout - (time.perf_counter() - start_time))
+                street = round_state.street if isinstance(round_state, RoundState) else 'round_over'
+                self.latencies.record(street, DECODE.get(clause[:1], InvalidAction).__name__, end_time - start_time)
+                if ENFORCE_GAME_CLOCK:
+                    self.game_clock -= end_time - start_time
+                if self.game_clock <= 0.:
+                    raise asyncio.TimeoutError
+                action = self.decode(clause, round_state, legal_actions, game_log)
+                if action is not None:
+                    return action
+            except asyncio.TimeoutError:
+                error_message = self.name + ' ran out of time'
+                game_log.append(error_message)
+                print(error_message)
+                self.game_clock = 0.
+            except OSError:
+                error_message = self.name + ' disconnected'
+                game_log.append(error_message)
+                print(error_message)
+                self.game_clock = 0.
+            except (IndexError, KeyError, ValueError):
+                game_log.append(self.name + ' response misformatted')
+        return CheckAction() if CheckAction in legal_actions else FoldAction()
+
+    async def push(self, player_message, game_log):
+        '''
+        Sends the end of the round to the pokerbot without waiting for its ack,
+        which is read before the pokerbot's next response.
+        '''
+        if self.connection is not None and self.game_clock > 0.:
+            try:
+                message = self.encode(player_message)
+                self.connection.write(message if self.binary else message.encode())
+                self.pending_acks += 1
+            except OSError:
+                error_message = self.name + ' disconnected'
+                game_log.append(error_message)
+                print(error_message)
+                self.game_clock = 0.
+
+    async def round_over(self, terminal_state, player_message, game_log):
+        '''
+        Sends the end of the round to the pokerbot as ROUND_OVER_MODE says.
+        '''
+        if ROUND_OVER_MODE == 'push':
+            await self.push(player_message, game_log)
+        elif ROUND_OVER_MODE == 'piggyback':
+            self.defer(player_message)
+        else:
+            await self.query(terminal_state, player_message, game_log)
+
+    def connected(self):
+        '''
+        Returns whether the pokerbot is still running.
+        '''
+        return self.connection is not None
+
+
+class AsyncLocalPlayer(LocalPlayer):
+    '''
+    Runs a Python pokerbot in-process behind the same coroutines as AsyncPlayer.
+    Its actions are computed on the event loop, so it holds up every other game while it thinks.
+    '''
+
+    async def run(self):
+        LocalPlayer.run(self)
+
+    async def stop(self):
+        LocalPlayer.stop(self)
+
+    async def reset(self, output_dir):
+        return LocalPlayer.reset(self, output_dir)
+
+    async def query(self, round_state, player_message, game_log):
+        return LocalPlayer.query(self, round_state, player_message, game_log)
+
+    async def round_over(self, terminal_state, player_message, game_log):
+        LocalPlayer.round_over(self, terminal_state, player_message, game_log)
+
+
+class AsyncBotPool(BotPool):
+    '''
+    Keeps pokerbots running between games on an event loop when WARM_BOTS is set.
+    Games playing at once each take their own pokerbots, so the pool grows to as many of each as play at once.
+    '''
+
+    async def take(self, output_dir, bots):
+        '''
+        Returns the warm players which start a new game in output_dir, keyed by name,
+        given the name and path of each pokerbot in the game.
+        '''
+        warm_players = {}
+        for player in self.claim(bots):
+            if await player.reset(output_dir):
+                warm_players[player.name] = player
+            else:
+                print(player.name, 'did not ack the new game, restarting it')
+                await player.stop()
+        return warm_players
+
+    async def release(self, players):
+        '''
+        Keeps the players at the end of a game for the next one, stopping any which cannot be kept.
+        '''
+        for player in players:
+            if self.keep(player) and player.finish():
+                self.idle.append(player)
+            else:
+                await player.stop()
+
+    async def close(self):
+        '''
+        Stops every idle pokerbot.
+        '''
+        for player in self.idle:
+            await player.stop()
+        self.idle = []
+
+
+class AsyncGame(engine.Game):
+    '''
+    Manages logging and the high-level game procedure of one game among many on an event loop.
+    Every round is dealt when the game is created, so games draw the same cards as they would
+    if they were created and played one after another by engine.py.
+    '''
+
+    def __init__(self, output_dir='', seed=None, swap_seats=False, bot_pool=None):
+        super().__init__(output_dir, seed, swap_seats, bot_pool)
+        if self.deals is None:
+            self.predeal(NUM_ROUNDS)
+        # set to end the game at the next round boundary
+        self.stopping = False
+
+    async def run_round(self, players):
+        '''
+        Runs one round of poker.
+        '''
+        round_state, game_log = self.start_round(players)
+        while not isinstance(round_state, TerminalState):
+            self.log_round_state(players, round_state)
+            active = round_state.button % 2
+            player = players[active]
+            action = await player.query(round_state, self.player_messages[active], game_log)
+            round_state = self.apply_action(player.name, round_state, action)
+        self.log_terminal_state(players, round_state)
+        for player, player_message, delta in zip(players, self.player_messages, round_state.deltas):
+            await player.round_over(round_state, player_message, game_log)
+            player.bankroll += delta
+        if self.record is not None:
+            self.record.end_round()
+
+    async def run(self, build=True):
+        '''
+        Runs one game of poker and returns the final bankrolls keyed by player name.
+        The pokerbots are assumed to be built already if build is False.
+        Building blocks the event loop, so games played together should be built beforehand.
+        '''
+        self.print_banner()
+        warm_players = {}
+        if self.bot_pool is not None:
+            warm_players = await self.bot_pool.take(self.output_dir, self.bots())
+        players = self.new_players(AsyncPlayer, AsyncLocalPlayer, warm_players)
+        for player in players:
+            if player.name in warm_players:
+                print(player.name, 'reused from the last game')
+                continue
+            if build:
+                player.build()
+            else:
+                player.load_commands()
+            await player.run()
+        for round_num in range(1, NUM_ROUNDS + 1):
+            if self.stopping:
+                print('Stopped after', round_num - 1, 'rounds')
+                game_log = self.log if self.record is None else gamerecord.NoteLog(self.log, self.record)
+                game_log.append('')
+                game_log.append('Stopped after {} rounds'.format(round_num - 1))
+                break
+            self.begin_round(players, round_num)
+            await self.run_round(players)
+            players = self.end_round(players, round_num)
+        self.log_final(players)
+        if self.bot_pool is not None:
+            await self.bot_pool.release(players)
+        else:
+            for player in players:
+                await player.stop()
+        return self.close(players)
+
+
+async def play_game(job, semaphore, build, bot_pool, playing, stopped):
+    '''
+    Creates and plays one game once the semaphore allows, printing to engine.txt in its directory,
+    which is only open while the game plays. The game is in the set playing while it plays.
+    Returns the game and its final bankrolls, or None if the stopped event was set before it started.
+    '''
+    output_dir, seed, swap_seats = job
+    async with semaphore:
+        if stopped.is_set():
+            return None
+        os.makedirs(output_dir, exist_ok=True)
+        with open(os.path.join(output_dir, 'engine.txt'), 'w') as output:
+            GAME_OUTPUT.set(output)
+            game = AsyncGame(output_dir, seed, swap_seats, bot_pool)
+            playing.add(game)
+            try:
+                return game, await game.run(build=build)
+            finally:
+                playing.discard(game)
+
+
+async def play_match(job, semaphore, build, bot_pool, playing, stopped):
+    '''
+    Plays one game, or both games of a duplicate match at once, and returns the final bankrolls
+    and PLAYER_1's bankroll change in each round, both netted over a duplicate match.
+    Returns None if any game was stopped before it finished.
+    '''
+    results = await asyncio.gather(*[play_game(game_job, semaphore, build, bot_pool, playing, stopped)
+                                     for game_job in job])
+    if any(result is None or len(result[0].round_deltas) < NUM_ROUNDS for result in results):
+        return None
+    bankrolls = {name: sum(result[1][name] for result in results) for name in results[0][1]}
+    return bankrolls, array('i', map(sum, zip(*[game.round_deltas for game, _ in results])))
+
+
+async def play_games(output_dirs, concurrency=0, build=False, seeds=None, duplicate=False, on_result=None):
+    '''
+    Plays one game in each output directory, at most concurrency at a time or all at once if it is 0,
+    and returns their final bankrolls in order. Each game prints to engine.txt in its directory.
+    Games are seeded by seeds if given, or by seeds drawn in order here, so that their cards do not depend
+    on scheduling. Each game is created, and its files opened, only once it starts to play.
+    If duplicate is set, each game is a duplicate match whose seat-swapped replay is played alongside it,
+    and the net bankrolls are returned.
+    If given, on_result is called in order with the number, bankrolls and round deltas of each game,
+    and every game still playing is stopped once it returns True. Stopped games return None.
+    If WARM_BOTS is set, games share an AsyncBotPool, which is closed once they are over.
+    '''
+    seeds = seeds or [None] * len(output_dirs)
+    jobs = []
+    for output_dir, seed in zip(output_dirs, seeds):
+        seed = random.randrange(engine.SEED_RANGE) if seed is None else seed
+        if duplicate:
+            jobs.append([(output_dir, seed, False), (os.path.join(output_dir, engine.SWAPPED_DIR), seed, True)])
+        else:
+            jobs.append([(output_dir, seed, False)])
+    semaphore = asyncio.Semaphore(concurrency or sum(map(len, jobs)) or 1)
+    bot_pool = AsyncBotPool() if WARM_BOTS else None
+    playing = set()
+    stopped = asyncio.Event()
+    results = []
+    with contextlib.redirect_stdout(GameOutput()):
+        tasks = [asyncio.ensure_future(play_match(job, semaphore, build, bot_pool, playing, stopped))
+                 for job in jobs]
+        for game_num, task in enumerate(tasks, 1):
+            result = await task
+            results.append(None if result is None else result[0])
+            if result is not None and not stopped.is_set() and on_result is not None and on_result(game_num, *result):
+                stopped.set()
+                for game in playing:
+                    game.stopping = True
+    if bot_pool is not None:
+        await bot_pool.close()
+    return results
+
+
+if __name__ == '__main__':
+    asyncio.run(AsyncGame(seed=GAME_SEED).run())
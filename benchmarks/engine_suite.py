@@ -0,0 +1,374 @@
+'''
+Times the engine's hot functions on their own, RoundState.proceed, legal_actions, raise_bounds and showdown
+and the Game.log_* methods, along with the throughput of Game.run_round between scripted pokerbots
+which never leave the engine process, one which always calls and one which raises at random.
+Results are written to a JSON file, which later runs can be compared against with --baseline,
+failing if any timing is slower than the baseline's by more than --threshold
+and still is when timed again in a fresh process.
+Timings are taken with the garbage collector disabled, as timeit does.
+
+Run with python3 benchmarks/engine_suite.py from the repository root.
+'''
+import functools
+import argparse
+import subprocess
+import platform
+import gc
+import tempfile
+import shutil
+import random
+import json
+import time
+import os
+import sys
+from array import array
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import engine
+from engine import RoundState, TerminalState, FoldAction, CallAction, CheckAction, RaiseAction
+from engine import STARTING_STACK, BIG_BLIND, SMALL_BLIND
+
+# version of the results file, bumped whenever its timings stop being comparable
+RESULTS_VERSION = 2
+# items timed between flushes of the game log and player messages, which would otherwise grow through a repeat
+BATCH_SIZE = 100
+
+
+class StubPlayer(engine.Player):
+    '''
+    A scripted pokerbot played inside the engine process, which encodes each message as the engine would
+    but answers without a socket, so only the engine is measured.
+    '''
+
+    def __init__(self, name, output_dir, rng):
+        super().__init__(name, '', output_dir)
+        self.rng = rng
+
+    def choose(self, round_state, legal_actions):
+        '''
+        Returns the scripted action in a round state.
+        '''
+        return CheckAction() if CheckAction in legal_actions else CallAction()
+
+    def query(self, round_state, player_message, game_log):
+        self.encode(player_message)
+        if isinstance(round_state, TerminalState):
+            return CheckAction()
+        return self.choose(round_state, round_state.legal_actions())
+
+    def push(self, player_message, game_log):
+        self.encode(player_message)
+
+
+class RandomRaisePlayer(StubPlayer):
+    '''
+    A scripted pokerbot which raises a third of the time and folds to a fifth of the bets it faces.
+    '''
+
+    def choose(self, round_state, legal_actions):
+        rng = self.rng
+        if RaiseAction in legal_actions and rng.random() < 0.33:
+            min_raise, max_raise = round_state.raise_bounds()
+            return RaiseAction(rng.randint(min_raise, max_raise))
+        if FoldAction in legal_actions and rng.random() < 0.2:
+            return FoldAction()
+        return CheckAction() if CheckAction in legal_actions else CallAction()
+
+
+def initial_state(hands, deck):
+    '''
+    Returns the state at the start of a round.
+    '''
+    pips = [SMALL_BLIND, BIG_BLIND]
+    stacks = [STARTING_STACK - SMALL_BLIND, STARTING_STACK - BIG_BLIND]
+    return RoundState(0, 0, pips, stacks, hands, deck, array('h'), 0)
+
+
+def new_game(output_dir, seed, num_rounds):
+    '''
+    Returns a seeded game, with num_rounds rounds dealt in advance if PREDEAL_ROUNDS is set.
+    '''
+    game = engine.Game(output_dir, seed)
+    if game.deals is not None:
+        game.predeal(num_rounds)
+    return game
+
+
+def random_rounds(game, num_rounds, seed):
+    '''
+    Deals random rounds from a game and plays them out at random.
+    Returns the hands, deck and actions of every round.
+    '''
+    player = RandomRaisePlayer.__new__(RandomRaisePlayer)  # skips the bot log file
+    player.rng = random.Random(seed)
+    rounds = []
+    for _ in range(num_rounds):
+        hands, deck = game.deal()
+        state = initial_state(hands, deck)
+        actions = []
+        while not isinstance(state, TerminalState):
+            action = player.choose(state, state.legal_actions())
+            actions.append(action)
+            state = state.proceed(action)
+        rounds.append((hands, deck, actions))
+    return rounds
+
+
+def round_states(rounds):
+    '''
+    Replays every round and returns the states in each, ending with its terminal state.
+    '''
+    replayed = []
+    for hands, deck, actions in rounds:
+        state = initial_state(hands, deck)
+        states = [state]
+        for action in actions:
+            state = state.proceed(action)
+            states.append(state)
+        replayed.append(states)
+    return replayed
+
+
+def stub_players(player_classes, output_dir, seed):
+    '''
+    Returns scripted players named after PLAYER_1 and PLAYER_2, as the game log expects.
+    '''
+    rng = random.Random(seed)
+    names = [engine.PLAYER_1_NAME, engine.PLAYER_2_NAME]
+    return [player_class(name, output_dir, rng) for player_class, name in zip(player_classes, names)]
+
+
+def bench_proceed(rounds, game, players):
+    '''
+    Plays every round from its first state, timing RoundState.proceed and the showdowns it reaches.
+    '''
+    for hands, deck, actions in rounds:
+        state = initial_state(hands, deck)
+        for action in actions:
+            state = state.proceed(action)
+
+
+def bench_legal_actions(states, game, players):
+    for state in states:
+        state.legal_actions()
+
+
+def bench_raise_bounds(states, game, players):
+    for state in states:
+        state.raise_bounds()
+
+
+def bench_showdown(states, game, players):
+    for state in states:
+        state.showdown()
+
+
+def bench_log_round_state(replayed, game, players):
+    for states in replayed:
+        for state in states[:-1]:
+            game.log_round_state(players, state)
+
+
+def bench_log_action(rounds, game, players):
+    for hands, deck, actions in rounds:
+        game.player_messages = [['T0.'], ['T0.']]
+        for action in actions:
+            game.log_action(players[0].name, action, False)
+
+
+def bench_log_terminal_state(terminal_states, game, players):
+    for terminal_state in terminal_states:
+        game.player_messages = [['T0.'], ['T0.']]
+        game.log_terminal_state(players, terminal_state)
+
+
+def close_game(game, players):
+    '''
+    Closes the logs of a timed game without reporting on it.
+    '''
+    game.log.close()
+    if game.record is not None:
+        game.record.close(game.straight_counts, [p.name for p in players], [p.bankroll for p in players])
+    for player in players:
+        player.bot_log.close()
+
+
+def without_gc(timer):
+    '''
+    Calls timer with the garbage collector disabled, as timeit does, so that collections
+    triggered by earlier allocations do not land in the timings, and returns its result.
+    '''
+    gc.collect()
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return timer()
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def time_function(function, items, best, output_dir, seed):
+    '''
+    Times one repeat of a benchmark function over a fresh game, lowering the best time of each batch in best.
+    Items are timed in batches of BATCH_SIZE, flushing the game log and resetting the player messages
+    between batches, as the game does between rounds.
+    '''
+    game = engine.Game(output_dir, seed)
+    players = stub_players([StubPlayer, StubPlayer], output_dir, seed)
+
+    def timer():
+        for i, start in enumerate(range(0, len(items), BATCH_SIZE)):
+            batch = items[start:start + BATCH_SIZE]
+            start_time = time.perf_counter()
+            function(batch, game, players)
+            best[i] = min(best[i], time.perf_counter() - start_time)
+            game.log.flush()
+            game.player_messages = [['T0.'], ['T0.']]
+    without_gc(timer)
+    close_game(game, players)
+
+
+def time_rounds(player_classes, num_rounds, best, output_dir, seed):
+    '''
+    Times one repeat of rounds between scripted players, played as Game.run does,
+    lowering the best time of each batch of BATCH_SIZE rounds in best. Every repeat plays the same rounds.
+    '''
+    game = new_game(output_dir, seed, num_rounds)
+    players = stub_players(player_classes, output_dir, seed)
+
+    def timer():
+        nonlocal players
+        for i, start in enumerate(range(1, num_rounds + 1, BATCH_SIZE)):
+            start_time = time.perf_counter()
+            for round_num in range(start, min(start + BATCH_SIZE, num_rounds + 1)):
+                game.begin_round(players, round_num)
+                game.run_round(players)
+                players = game.end_round(players, round_num)
+            best[i] = min(best[i], time.perf_counter() - start_time)
+    without_gc(timer)
+    close_game(game, players)
+
+
+def run_suite(num_rounds, repeats, seed, output_dir, names=None):
+    '''
+    Runs every benchmark, or those in names if given, and returns its timings in microseconds, keyed by name.
+    Each repeat runs every benchmark once, so a slow stretch of the machine costs each benchmark at most
+    a repeat, and each batch is counted at its best time over the repeats.
+    '''
+    game = new_game(output_dir, seed, num_rounds)
+    rounds = random_rounds(game, num_rounds, seed)
+    game.log.close()
+    replayed = round_states(rounds)
+    states = [state for round_replay in replayed for state in round_replay[:-1]]
+    terminal_states = [round_replay[-1] for round_replay in replayed]
+    river_states = [state for state in states if state.street == 5]
+    num_actions = sum(len(actions) for hands, deck, actions in rounds)
+    benchmarks = []
+    for name, function, items, num_calls in (
+            ('RoundState.proceed', bench_proceed, rounds, num_actions),
+            ('RoundState.legal_actions', bench_legal_actions, states, len(states)),
+            ('RoundState.raise_bounds', bench_raise_bounds, states, len(states)),
+            ('RoundState.showdown', bench_showdown, river_states, len(river_states)),
+            ('Game.log_round_state', bench_log_round_state, replayed, len(states)),
+            ('Game.log_action', bench_log_action, rounds, num_actions),
+            ('Game.log_terminal_state', bench_log_terminal_state, terminal_states, len(terminal_states))):
+        benchmarks.append((name, len(items), max(num_calls, 1), functools.partial(time_function, function, items)))
+    for name, player_classes in (('Game.run_round always-call', [StubPlayer, StubPlayer]),
+                                 ('Game.run_round random-raise', [RandomRaisePlayer, RandomRaisePlayer])):
+        benchmarks.append((name, num_rounds, num_rounds, functools.partial(time_rounds, player_classes, num_rounds)))
+    benchmarks = [benchmark for benchmark in benchmarks if names is None or benchmark[0] in names]
+    best = {name: [float('inf')] * len(range(0, num_items, BATCH_SIZE)) for name, num_items, _, _ in benchmarks}
+    for _ in range(repeats):
+        for name, _, _, time_repeat in benchmarks:
+            time_repeat(best[name], output_dir, seed)
+    return {name: sum(best[name]) * 1e6 / num_calls for name, _, num_calls, _ in benchmarks}
+
+
+def compare(results, baseline, threshold):
+    '''
+    Returns the names of the timings which are slower than the baseline's by more than threshold,
+    along with the ratio of each timing to the baseline's.
+    '''
+    ratios = {name: results[name] / baseline[name] for name in results if baseline.get(name)}
+    regressions = [name for name, ratio in ratios.items() if ratio > 1 + threshold]
+    return regressions, ratios
+
+
+def retime(names, args):
+    '''
+    Times some benchmarks again in a fresh process, where the interpreter's memory layout differs
+    from this one's, and returns their timings in microseconds, keyed by name.
+    '''
+    with tempfile.TemporaryDirectory(prefix='pokerbots') as output_dir:
+        output = os.path.join(output_dir, 'retimed.json')
+        subprocess.run([sys.executable, os.path.abspath(__file__), '-n', str(args.rounds), '-r', str(args.repeats),
+                        '-s', str(args.seed), '-o', output, '--only'] + names, check=True, stdout=subprocess.DEVNULL)
+        with open(output) as results_file:
+            return json.load(results_file)['timings']
+
+
+def parse_args():
+    '''
+    Parses benchmark arguments.
+    '''
+    parser = argparse.ArgumentParser(prog='python3 benchmarks/engine_suite.py')
+    parser.add_argument('-n', '--rounds', type=int, default=5000, help='Number of random rounds to time')
+    parser.add_argument('-r', '--repeats', type=int, default=10, help='Timing repeats, the best is reported')
+    parser.add_argument('-s', '--seed', type=int, default=0, help='Seed for the random rounds')
+    parser.add_argument('-o', '--output', type=str, default=None, help='Write the timings to this JSON file')
+    parser.add_argument('-b', '--baseline', type=str, default=None,
+                        help='Compare the timings against this JSON file written by an earlier run')
+    parser.add_argument('-t', '--threshold', type=float, default=0.1,
+                        help='Fraction by which a timing may exceed the baseline before it counts as a regression')
+    parser.add_argument('--only', type=str, nargs='+', default=None, metavar='NAME', help='Time only these benchmarks')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    ARGS = parse_args()
+    OUTPUT_DIR = tempfile.mkdtemp(prefix='pokerbots')
+    BASELINE = None
+    if ARGS.baseline is not None:
+        with open(ARGS.baseline) as baseline_file:
+            BASELINE = json.load(baseline_file)
+        if BASELINE.get('version') != RESULTS_VERSION:
+            sys.exit('{} was written by an incompatible version of the suite'.format(ARGS.baseline))
+        if (BASELINE['rounds'], BASELINE['seed']) != (ARGS.rounds, ARGS.seed):
+            print('Warning: the baseline timed {} rounds with seed {}'.format(BASELINE['rounds'], BASELINE['seed']))
+    try:
+        RESULTS = run_suite(ARGS.rounds, ARGS.repeats, ARGS.seed, OUTPUT_DIR, ARGS.only)
+    finally:
+        shutil.rmtree(OUTPUT_DIR, ignore_errors=True)
+    if BASELINE is not None:
+        REGRESSIONS, RATIOS = compare(RESULTS, BASELINE['timings'], ARGS.threshold)
+        if REGRESSIONS:
+            # a regression only counts if it reproduces, so one noisy run cannot fail the check
+            print('Timing {} again in a fresh process'.format(', '.join(REGRESSIONS)))
+            for NAME, TIMING in retime(REGRESSIONS, ARGS).items():
+                RESULTS[NAME] = min(RESULTS[NAME], TIMING)
+            REGRESSIONS, RATIOS = compare(RESULTS, BASELINE['timings'], ARGS.threshold)
+    print('{} rounds, best of {}'.format(ARGS.rounds, ARGS.repeats))
+    print('{:<32}{:>12}{:>12}'.format('benchmark', 'us/call', 'baseline' if BASELINE else ''))
+    for NAME, TIMING in RESULTS.items():
+        LINE = '{:<32}{:>12.3f}'.format(NAME, TIMING)
+        if BASELINE is not None and NAME in RATIOS:
+            LINE += '{:>+11.1%}'.format(RATIOS[NAME] - 1) + (' REGRESSION' if NAME in REGRESSIONS else '')
+        print(LINE)
+    if ARGS.output is not None:
+        with open(ARGS.output, 'w') as output_file:
+            json.dump({
+                'version': RESULTS_VERSION,
+                'python': platform.python_version(),
+                'rounds': ARGS.rounds,
+                'repeats': ARGS.repeats,
+                'seed': ARGS.seed,
+                'units': 'us',
+                'timings': RESULTS,
+            }, output_file, indent=2)
+        print('Wrote', ARGS.output)
+    if BASELINE is not None:
+        if REGRESSIONS:
+            sys.exit('{} of {} timings regressed by more than {:.0%}'.format(len(REGRESSIONS), len(RATIOS),
+                                                                             ARGS.threshold))
+        print('No timing regressed by more than {:.0%}'.format(ARGS.threshold))
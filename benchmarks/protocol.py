@@ -0,0 +1,155 @@
+'''
+Compares the CPU time spent encoding engine messages and decoding them in the python_skeleton Runner
+for the text protocol and the binary protocol offered when BOT_PROTOCOL is 'binary'.
+
+Run with python3 benchmarks/protocol.py from the repository root.
+'''
+import argparse
+import random
+import time
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'python_skeleton'))
+import engine
+from cards import CARD_STRINGS
+from skeleton.actions import FoldAction, CallAction, CheckAction, RaiseAction
+from skeleton.states import RoundState, TerminalState
+from skeleton.states import STARTING_STACK, BIG_BLIND, SMALL_BLIND
+from skeleton.runner import Runner, FRAME
+from skeleton.bot import Bot
+
+
+class CallBot(Bot):
+    '''
+    A pokerbot which spends no time deciding, so only the protocol is measured.
+    '''
+
+    def handle_new_round(self, game_state, round_state, active):
+        pass
+
+    def handle_round_over(self, game_state, terminal_state, active):
+        pass
+
+    def get_action(self, game_state, round_state, active):
+        return CheckAction() if CheckAction in round_state.legal_actions() else CallAction()
+
+
+def action_clauses(action):
+    '''
+    Returns the text and binary clauses of an action, as the engine encodes them.
+    '''
+    if isinstance(action, FoldAction):
+        return 'F', b'F'
+    if isinstance(action, CallAction):
+        return 'C', b'C'
+    if isinstance(action, CheckAction):
+        return 'K', b'K'
+    return 'R' + str(action.amount), engine.RAISE_CLAUSE.pack(b'R', action.amount)
+
+
+def random_messages(num_rounds, seed):
+    '''
+    Plays random rounds and returns the messages one bot receives, as clause lists in both protocols.
+    The first clause of each message is left for the game clock, as in the engine.
+    '''
+    rng = random.Random(seed)
+    text_messages = []
+    binary_messages = []
+    for round_num in range(num_rounds):
+        seat = round_num % 2
+        dealt = rng.sample(range(52), 9)
+        hands = [dealt[0:2], dealt[2:4]]
+        board = dealt[4:]
+        pips = [SMALL_BLIND, BIG_BLIND]
+        stacks = [STARTING_STACK - SMALL_BLIND, STARTING_STACK - BIG_BLIND]
+        state = RoundState(0, 0, pips, stacks, [[CARD_STRINGS[c] for c in hand] for hand in hands], [], None)
+        text = ['T0.', 'P' + str(seat), 'H' + engine.CCARDS(hands[seat])]
+        binary = [b'', b'P' + bytes([seat]), b'H' + bytes(hands[seat])]
+        while not isinstance(state, TerminalState):
+            if state.street > 0 and state.button == 1:
+                text.append('B' + engine.CCARDS(board[:state.street]))
+                binary.append(b'B' + bytes([state.street] + board[:state.street]))
+            if state.button % 2 == seat:
+                text_messages.append(text)
+                binary_messages.append(binary)
+                text = ['T0.']
+                binary = [b'']
+            legal_actions = state.legal_actions()
+            if RaiseAction in legal_actions and rng.random() < 0.33:
+                min_raise, max_raise = state.raise_bounds()
+                action = RaiseAction(rng.randint(min_raise, max_raise))
+            elif FoldAction in legal_actions and rng.random() < 0.2:
+                action = FoldAction()
+            else:
+                action = CheckAction() if CheckAction in legal_actions else CallAction()
+            text_clause, binary_clause = action_clauses(action)
+            text.append(text_clause)
+            binary.append(binary_clause)
+            state = state.proceed(action)
+        if not isinstance(state.previous_state, RoundState) or FoldAction not in state.previous_state.legal_actions():
+            text.append('O' + engine.CCARDS(hands[1-seat]))
+            binary.append(b'O' + bytes(hands[1-seat]))
+        delta = rng.randint(-STARTING_STACK, STARTING_STACK)
+        text.append('D' + str(delta))
+        binary.append(engine.DELTA_CLAUSE.pack(b'D', delta))
+        text_messages.append(text)
+        binary_messages.append(binary)
+    return text_messages, binary_messages
+
+
+def encoder(binary):
+    '''
+    Returns an engine Player which only encodes messages.
+    '''
+    player = engine.Player.__new__(engine.Player)  # skips the bot log file
+    player.game_clock = engine.STARTING_GAME_CLOCK
+    player.binary = binary
+    return player
+
+
+def measure(messages, binary, repeats):
+    '''
+    Returns the best engine encoding and bot decoding times in microseconds per message.
+    '''
+    player = encoder(binary)
+    best_encode = best_decode = float('inf')
+    for _ in range(repeats):
+        copies = [list(message) for message in messages]
+        start_time = time.perf_counter()
+        encoded = [player.encode(message) for message in copies]
+        best_encode = min(best_encode, time.perf_counter() - start_time)
+        runner = Runner(CallBot(), None)
+        if binary:
+            start_time = time.perf_counter()
+            for message in encoded:
+                runner.handle_binary_packet(message[FRAME.size:])
+        else:
+            start_time = time.perf_counter()
+            for message in encoded:
+                runner.handle_packet(message.strip().split(' '))
+        best_decode = min(best_decode, time.perf_counter() - start_time)
+    return best_encode * 1e6 / len(messages), best_decode * 1e6 / len(messages), encoded
+
+
+def parse_args():
+    '''
+    Parses benchmark arguments.
+    '''
+    parser = argparse.ArgumentParser(prog='python3 benchmarks/protocol.py')
+    parser.add_argument('-n', '--rounds', type=int, default=20000, help='Number of random rounds to replay')
+    parser.add_argument('-r', '--repeats', type=int, default=5, help='Timing repeats, the best is reported')
+    parser.add_argument('-s', '--seed', type=int, default=0, help='Seed for the random rounds')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    ARGS = parse_args()
+    TEXT_MESSAGES, BINARY_MESSAGES = random_messages(ARGS.rounds, ARGS.seed)
+    print('{} rounds, {} messages per bot'.format(ARGS.rounds, len(TEXT_MESSAGES)))
+    print('{:<10}{:>14}{:>14}{:>16}'.format('protocol', 'encode us', 'decode us', 'bytes/message'))
+    for NAME, MESSAGES, BINARY in (('text', TEXT_MESSAGES, False), ('binary', BINARY_MESSAGES, True)):
+        ENCODE, DECODE, ENCODED = measure(MESSAGES, BINARY, ARGS.repeats)
+        SIZE = sum(len(message) for message in ENCODED) / len(ENCODED)
+        print('{:<10}{:>14.2f}{:>14.2f}{:>16.1f}'.format(NAME, ENCODE, DECODE, SIZE))
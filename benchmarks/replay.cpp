@@ -0,0 +1,147 @@
+/**
+ * Replays a recorded engine message stream into the C++ skeleton Runner, for benchmarks/replay.py.
+ *
+ * Usage: replay time STREAM_FILE REPEATS prints the best replay time in seconds with a pokerbot which does nothing,
+ *        replay trace STREAM_FILE prints a line for every callback, in the same format as the Python TraceBot.
+ */
+#include <chrono>
+#include <cmath>
+#include <fstream>
+#include <sstream>
+#include "skeleton/runner.hpp"
+
+
+/**
+ * Reads a recorded stream from memory and discards everything written back.
+ */
+class ReplayBuffer : public std::streambuf
+{
+    public:
+        ReplayBuffer(string& data)
+        {
+            char* begin = &data[0];
+            this->setg(begin, begin, begin + data.size());
+        }
+
+    protected:
+        int overflow(int c)
+        {
+            return traits_type::not_eof(c);
+        }
+
+        std::streamsize xsputn(const char* s, std::streamsize n)
+        {
+            return n;
+        }
+};
+
+
+/**
+ * A pokerbot which spends no time at all, so only the runner is measured.
+ */
+class NoOpBot : public Bot
+{
+    public:
+        void handle_new_round(GameState* game_state, RoundState* round_state, int active) {}
+
+        void handle_round_over(GameState* game_state, TerminalState* terminal_state, int active) {}
+
+        Action get_action(GameState* game_state, RoundState* round_state, int active)
+        {
+            return CheckAction();
+        }
+};
+
+
+/**
+ * Returns cards joined by commas, or - if there are none.
+ */
+template <typename Cards>
+static string cards(const Cards& card_strings, int num_cards)
+{
+    string joined;
+    for (int i = 0; i < num_cards; i++)
+    {
+        if (!card_strings[i].empty())
+        {
+            joined += (joined.empty() ? "" : ",") + card_strings[i];
+        }
+    }
+    return joined.empty() ? "-" : joined;
+}
+
+
+/**
+ * A pokerbot which prints a line for every callback.
+ */
+class TraceBot : public Bot
+{
+    public:
+        void handle_new_round(GameState* game_state, RoundState* round_state, int active)
+        {
+            std::cout << "H " << game_state->round_num << " " << game_state->bankroll << " "
+                      << std::lround(game_state->game_clock * 1000) << " " << active << " "
+                      << cards(round_state->hands[active], 2) << "\n";
+        }
+
+        void handle_round_over(GameState* game_state, TerminalState* terminal_state, int active)
+        {
+            RoundState* previous_state = (RoundState*) terminal_state->previous_state;
+            std::cout << "D " << game_state->round_num << " " << game_state->bankroll << " "
+                      << terminal_state->deltas[0] << " " << terminal_state->deltas[1] << " "
+                      << cards(previous_state->hands[1-active], 2) << "\n";
+        }
+
+        Action get_action(GameState* game_state, RoundState* round_state, int active)
+        {
+            std::cout << "A " << game_state->round_num << " " << std::lround(game_state->game_clock * 1000) << " "
+                      << round_state->street << " " << round_state->button << " "
+                      << round_state->pips[0] << " " << round_state->pips[1] << " "
+                      << round_state->stacks[0] << " " << round_state->stacks[1] << " "
+                      << cards(round_state->deck, round_state->street) << "\n";
+            return CheckAction();
+        }
+};
+
+
+/**
+ * Replays a stream into a fresh Runner and returns the time taken in seconds.
+ */
+static double replay(Bot* pokerbot, string data)
+{
+    ReplayBuffer buffer(data);
+    std::iostream stream(&buffer);
+    Runner runner(pokerbot, &stream);
+    auto start_time = std::chrono::steady_clock::now();
+    runner.run();
+    return std::chrono::duration<double>(std::chrono::steady_clock::now() - start_time).count();
+}
+
+
+int main(int argc, char* argv[])
+{
+    if (argc < 3)
+    {
+        std::cerr << "usage: replay time STREAM_FILE REPEATS | replay trace STREAM_FILE\n";
+        return 2;
+    }
+    std::ifstream stream_file(argv[2], std::ios::binary);
+    std::stringstream contents;
+    contents << stream_file.rdbuf();
+    string data = contents.str();
+    if (string(argv[1]) == "trace")
+    {
+        TraceBot pokerbot;
+        replay(&pokerbot, data);
+        return 0;
+    }
+    int repeats = argc > 3 ? std::stoi(argv[3]) : 1;
+    double best = INFINITY;
+    for (int i = 0; i < repeats; i++)
+    {
+        NoOpBot pokerbot;
+        best = std::min(best, replay(&pokerbot, data));
+    }
+    std::cout << best << "\n";
+    return 0;
+}
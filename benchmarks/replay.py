@@ -0,0 +1,240 @@
+'''
+Replays recorded engine message streams into the skeleton runners with a pokerbot which does nothing,
+and reports how many messages per second each runner parses in each BOT_PROTOCOL.
+The C++ runner is compiled into benchmarks/replay.cpp with g++ if it is available.
+With --check, each runner also writes a trace of its pokerbot's callbacks, which must all be identical.
+
+Run with python3 benchmarks/replay.py from the repository root.
+'''
+import argparse
+import subprocess
+import tempfile
+import shutil
+import random
+import time
+import os
+import sys
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.join(BENCHMARK_DIR, '..')
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'python_skeleton'))
+import engine
+from protocol import random_messages, encoder
+from skeleton.actions import CheckAction
+from skeleton.runner import Runner, PROTOCOL_OFFER
+from skeleton.bot import Bot
+
+CPP_SKELETON_DIR = os.path.join(ROOT_DIR, 'cpp_skeleton')
+CPP_SOURCES = ['skeleton/runner.cpp', 'skeleton/states.cpp', 'skeleton/actions.cpp']
+
+
+class NoOpBot(Bot):
+    '''
+    A pokerbot which spends no time at all, so only the runner is measured.
+    '''
+
+    def handle_new_round(self, game_state, round_state, active):
+        pass
+
+    def handle_round_over(self, game_state, terminal_state, active):
+        pass
+
+    def get_action(self, game_state, round_state, active):
+        return CheckAction()
+
+
+class TraceBot(NoOpBot):
+    '''
+    A pokerbot which writes a line for every callback, in the same format as the C++ TraceBot.
+    '''
+
+    def __init__(self):
+        self.lines = []
+
+    def handle_new_round(self, game_state, round_state, active):
+        self.lines.append('H {} {} {} {} {}'.format(game_state.round_num, game_state.bankroll,
+                                                    round(game_state.game_clock * 1000), active,
+                                                    cards(round_state.hands[active])))
+
+    def handle_round_over(self, game_state, terminal_state, active):
+        previous_state = terminal_state.previous_state
+        self.lines.append('D {} {} {} {} {}'.format(game_state.round_num, game_state.bankroll,
+                                                    terminal_state.deltas[0], terminal_state.deltas[1],
+                                                    cards(previous_state.hands[1-active])))
+
+    def get_action(self, game_state, round_state, active):
+        self.lines.append('A {} {} {} {} {} {} {} {} {}'.format(game_state.round_num,
+                                                                round(game_state.game_clock * 1000),
+                                                                round_state.street, round_state.button,
+                                                                round_state.pips[0], round_state.pips[1],
+                                                                round_state.stacks[0], round_state.stacks[1],
+                                                                cards(round_state.deck[:round_state.street])))
+        return CheckAction()
+
+
+def cards(card_strings):
+    '''
+    Returns cards joined by commas, or - if there are none.
+    '''
+    return ','.join(card for card in card_strings if card) or '-'
+
+
+class ReplaySocketFile():
+    '''
+    Stands in for the socket file of a pokerbot, reading a recorded stream and discarding responses.
+    Text lines and binary frames are read from the same position, as the protocol switches mid-stream.
+    '''
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.position = 0
+        self.buffer = self
+
+    def readline(self):
+        end = self.stream.find(b'\n', self.position) + 1 or len(self.stream)
+        line = self.stream[self.position:end]
+        self.position = end
+        return line.decode()
+
+    def read(self, size):
+        data = self.stream[self.position:self.position + size]
+        self.position += len(data)
+        return data
+
+    def write(self, data):
+        return len(data)
+
+    def flush(self):
+        pass
+
+
+def record_streams(num_rounds, seed):
+    '''
+    Encodes the messages one bot receives over random rounds as the engine would send them,
+    with its game clock running down, and returns the text and binary streams and the number of messages.
+    '''
+    text_messages, binary_messages = random_messages(num_rounds, seed)
+    streams = []
+    for messages, binary in ((text_messages, False), (binary_messages, True)):
+        player = encoder(binary)
+        rng = random.Random(seed)
+        encoded = [(PROTOCOL_OFFER + '\n').encode()] if binary else []
+        for message in messages:
+            player.game_clock -= rng.random() * engine.STARTING_GAME_CLOCK / len(messages)
+            encoded.append(player.encode(list(message)) if binary else player.encode(list(message)).encode())
+        encoded.append(engine.BINARY_QUIT if binary else b'Q\n')
+        streams.append(b''.join(encoded))
+    return streams[0], streams[1], len(text_messages)
+
+
+def replay_python(stream, repeats):
+    '''
+    Returns the best time to replay a stream into the Python runner.
+    '''
+    best = float('inf')
+    for _ in range(repeats):
+        runner = Runner(NoOpBot(), ReplaySocketFile(stream))
+        start_time = time.perf_counter()
+        runner.run()
+        best = min(best, time.perf_counter() - start_time)
+    return best
+
+
+def trace_python(stream):
+    '''
+    Replays a stream into the Python runner and returns the trace of its pokerbot's callbacks.
+    '''
+    pokerbot = TraceBot()
+    Runner(pokerbot, ReplaySocketFile(stream)).run()
+    return '\n'.join(pokerbot.lines) + '\n'
+
+
+def build_cpp(build_dir):
+    '''
+    Compiles the C++ replayer against the C++ skeleton, returning its path or None if it cannot be built.
+    '''
+    if shutil.which('g++') is None:
+        return None
+    executable = os.path.join(build_dir, 'replay')
+    command = (['g++', '-O2', '-std=c++11', '-I', CPP_SKELETON_DIR, '-o', executable,
+                os.path.join(BENCHMARK_DIR, 'replay.cpp')] +
+               [os.path.join(CPP_SKELETON_DIR, source) for source in CPP_SOURCES] +
+               ['-lboost_system', '-lpthread'])
+    result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    if result.returncode != 0:
+        print(result.stdout.decode())
+        return None
+    return executable
+
+
+def replay_cpp(executable, stream_file, repeats):
+    '''
+    Returns the best time to replay a stream file into the C++ runner.
+    '''
+    output = subprocess.check_output([executable, 'time', stream_file, str(repeats)])
+    return float(output)
+
+
+def trace_cpp(executable, stream_file):
+    '''
+    Replays a stream file into the C++ runner and returns the trace of its pokerbot's callbacks.
+    '''
+    return subprocess.check_output([executable, 'trace', stream_file]).decode()
+
+
+def parse_args():
+    '''
+    Parses benchmark arguments.
+    '''
+    parser = argparse.ArgumentParser(prog='python3 benchmarks/replay.py')
+    parser.add_argument('-n', '--rounds', type=int, default=20000, help='Number of random rounds to record')
+    parser.add_argument('-r', '--repeats', type=int, default=5, help='Timing repeats, the best is reported')
+    parser.add_argument('-s', '--seed', type=int, default=0, help='Seed for the random rounds')
+    parser.add_argument('--check', action='store_true',
+                        help='Check that every runner makes identical pokerbot callbacks')
+    parser.add_argument('--save', type=str, default=None,
+                        help='Also save the recorded streams and traces to this directory')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    ARGS = parse_args()
+    TEXT_STREAM, BINARY_STREAM, NUM_MESSAGES = record_streams(ARGS.rounds, ARGS.seed)
+    print('{} rounds, {} messages per bot'.format(ARGS.rounds, NUM_MESSAGES))
+    WORK_DIR = tempfile.mkdtemp(prefix='pokerbots')
+    try:
+        SAVE_DIR = ARGS.save or WORK_DIR
+        os.makedirs(SAVE_DIR, exist_ok=True)
+        STREAM_FILES = {}
+        for PROTOCOL, STREAM in (('text', TEXT_STREAM), ('binary', BINARY_STREAM)):
+            STREAM_FILES[PROTOCOL] = os.path.join(SAVE_DIR, PROTOCOL + '.stream')
+            with open(STREAM_FILES[PROTOCOL], 'wb') as stream_file:
+                stream_file.write(STREAM)
+        EXECUTABLE = build_cpp(WORK_DIR)
+        if EXECUTABLE is None:
+            print('Could not build the C++ replayer, skipping the C++ runner')
+        print('{:<10}{:<10}{:>16}{:>14}'.format('runner', 'protocol', 'messages/sec', 'us/message'))
+        TRACES = {}
+        for PROTOCOL, STREAM in (('text', TEXT_STREAM), ('binary', BINARY_STREAM)):
+            RUNNERS = [('python', lambda: replay_python(STREAM, ARGS.repeats), lambda: trace_python(STREAM))]
+            if EXECUTABLE is not None:
+                RUNNERS.append(('cpp', lambda: replay_cpp(EXECUTABLE, STREAM_FILES[PROTOCOL], ARGS.repeats),
+                                lambda: trace_cpp(EXECUTABLE, STREAM_FILES[PROTOCOL])))
+            for NAME, REPLAY, TRACE in RUNNERS:
+                ELAPSED = REPLAY()
+                print('{:<10}{:<10}{:>16.0f}{:>14.3f}'.format(NAME, PROTOCOL, NUM_MESSAGES / ELAPSED,
+                                                            ELAPSED * 1e6 / NUM_MESSAGES))
+                if ARGS.check:
+                    TRACES[(NAME, PROTOCOL)] = TRACE()
+        if ARGS.check:
+            if ARGS.save is not None:
+                for (NAME, PROTOCOL), TRACE in TRACES.items():
+                    with open(os.path.join(ARGS.save, '{}_{}.trace'.format(NAME, PROTOCOL)), 'w') as trace_file:
+                        trace_file.write(TRACE)
+            REFERENCE = TRACES[('python', 'text')]
+            MISMATCHED = [NAME + ' ' + PROTOCOL for (NAME, PROTOCOL), TRACE in TRACES.items() if TRACE != REFERENCE]
+            print('{} callbacks, {}'.format(REFERENCE.count('\n'), 'mismatched in ' + ', '.join(MISMATCHED)
+                                            if MISMATCHED else 'identical in every runner'))
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
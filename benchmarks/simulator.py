@@ -0,0 +1,174 @@
+'''
+Measures how many rounds per minute the python_skeleton RoundBatch simulator plays between vectorized
+always-call and random-raise policies, and compares them with engine.RoundState playing the same policies
+one round and one state per action at a time.
+With --check, rounds are also replayed action by action through engine.RoundState, whose payoffs must match.
+
+Run with python3 benchmarks/simulator.py from the repository root.
+'''
+import argparse
+import time
+import os
+import sys
+from array import array
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'python_skeleton'))
+import engine
+from cards import permuted_cards
+from skeleton.simulator import RoundBatch, FOLD, CALL, CHECK, RAISE
+
+ENGINE_ACTIONS = [engine.FoldAction(), engine.CallAction(), engine.CheckAction()]
+
+
+def always_call(batch, rows):
+    '''
+    Checks, or calls when facing a bet.
+    '''
+    return np.where(batch.legal_actions()[rows, CHECK], CHECK, CALL), None
+
+
+def random_raise(seed):
+    '''
+    Returns a policy which raises a third of the time to a random legal amount and folds to a fifth of bets.
+    '''
+    rng = np.random.default_rng(seed)
+
+    def policy(batch, rows):
+        legal = batch.legal_actions()[rows]
+        min_raise, max_raise = (bound[rows] for bound in batch.raise_bounds())
+        draws = rng.random((2, len(rows)))
+        actions = np.where(legal[:, CHECK], CHECK, CALL)
+        actions = np.where(legal[:, FOLD] & (draws[1] < 0.2), FOLD, actions)
+        actions = np.where(legal[:, RAISE] & (draws[0] < 0.33), RAISE, actions)
+        return actions, rng.integers(min_raise, max_raise + 1)
+    return policy
+
+
+def recorded(policy, log):
+    '''
+    Wraps a policy to append the rows, actions and amounts of each call to log.
+    '''
+    def recording_policy(batch, rows):
+        actions, amounts = policy(batch, rows)
+        log.append((rows, np.asarray(actions), np.zeros(len(rows), dtype=np.int64) if amounts is None else amounts))
+        return actions, amounts
+    return recording_policy
+
+
+def round_actions(log, num_rounds):
+    '''
+    Splits a log of policy calls into the actions of each round, in order.
+    '''
+    actions = [[] for _ in range(num_rounds)]
+    for rows, codes, amounts in log:
+        for row, code, amount in zip(rows.tolist(), codes.tolist(), amounts.tolist()):
+            actions[row].append((code, amount))
+    return actions
+
+
+def engine_action(round_state, code, amount):
+    '''
+    Returns an action as the engine decodes it, a check or fold if it is illegal.
+    '''
+    legal_actions = round_state.legal_actions()
+    if code == RAISE:
+        min_raise, max_raise = round_state.raise_bounds()
+        if engine.RaiseAction in legal_actions and min_raise <= amount <= max_raise:
+            return engine.RaiseAction(amount)
+    elif type(ENGINE_ACTIONS[code]) in legal_actions:
+        return ENGINE_ACTIONS[code]
+    return engine.CheckAction() if engine.CheckAction in legal_actions else engine.FoldAction()
+
+
+def engine_round(batch, row):
+    '''
+    Returns the first engine.RoundState of a round of a batch, with its cards and value permutation.
+    '''
+    perm_cards = [engine.EVAL7_CARDS[card] for card in permuted_cards(batch.perms[row].tolist())]
+    deck = engine.Deck(batch.board[row].tolist(), perm_cards, [0, 0])
+    pips = [engine.SMALL_BLIND, engine.BIG_BLIND]
+    stacks = [engine.STARTING_STACK - engine.SMALL_BLIND, engine.STARTING_STACK - engine.BIG_BLIND]
+    return engine.RoundState(0, 0, pips, stacks, batch.hands[row].tolist(), deck, array('h'), 0)
+
+
+def replay(batch, actions):
+    '''
+    Replays the actions of each round through engine.RoundState and returns the rounds whose payoffs differ.
+    '''
+    mismatched = []
+    for row, round_actions in enumerate(actions):
+        state = engine_round(batch, row)
+        for code, amount in round_actions:
+            state = state.proceed(engine_action(state, code, amount))
+        if not isinstance(state, engine.TerminalState) or state.deltas != batch.deltas[row].tolist():
+            mismatched.append(row)
+    return mismatched
+
+
+def engine_policy(name, rng):
+    '''
+    Returns a policy for one engine.RoundState at a time which plays like the batch policy of the same name.
+    '''
+    def policy(round_state):
+        legal_actions = round_state.legal_actions()
+        if name == 'random-raise':
+            if engine.RaiseAction in legal_actions and rng.random() < 0.33:
+                min_raise, max_raise = round_state.raise_bounds()
+                return engine.RaiseAction(int(rng.integers(min_raise, max_raise + 1)))
+            if engine.FoldAction in legal_actions and rng.random() < 0.2:
+                return engine.FoldAction()
+        return engine.CheckAction() if engine.CheckAction in legal_actions else engine.CallAction()
+    return policy
+
+
+def play_engine(name, num_rounds, seed):
+    '''
+    Plays rounds one engine.RoundState per action and returns the elapsed time, dealing them in one batch.
+    '''
+    batch = RoundBatch(num_rounds, rng=np.random.default_rng(seed))
+    rounds = [engine_round(batch, row) for row in range(num_rounds)]
+    rng = np.random.default_rng(seed)
+    policies = [engine_policy(name, rng), engine_policy(name, rng)]
+    start_time = time.perf_counter()
+    for state in rounds:
+        while not isinstance(state, engine.TerminalState):
+            state = state.proceed(policies[state.button % 2](state))
+    return time.perf_counter() - start_time
+
+
+def parse_args():
+    '''
+    Parses benchmark arguments.
+    '''
+    parser = argparse.ArgumentParser(prog='python3 benchmarks/simulator.py')
+    parser.add_argument('-n', '--rounds', type=int, default=200000, help='Number of rounds per batch')
+    parser.add_argument('-e', '--engine-rounds', type=int, default=2000,
+                        help='Number of rounds to play one at a time through engine.RoundState')
+    parser.add_argument('-s', '--seed', type=int, default=0, help='Seed for the cards and policies')
+    parser.add_argument('--check', action='store_true',
+                        help='Check the payoffs of every round against engine.RoundState')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    ARGS = parse_args()
+    print('{:<26}{:>16}{:>14}'.format('policies', 'rounds/minute', 'us/round'))
+    for NAME, POLICIES in (('always-call', [always_call, always_call]),
+                           ('random-raise', [random_raise(ARGS.seed), random_raise(ARGS.seed + 1)])):
+        LOG = []
+        START_TIME = time.perf_counter()
+        BATCH = RoundBatch(ARGS.rounds, rng=np.random.default_rng(ARGS.seed))
+        if ARGS.check:
+            POLICIES = [recorded(POLICY, LOG) for POLICY in POLICIES]
+        BATCH.play(POLICIES)
+        ELAPSED = time.perf_counter() - START_TIME
+        print('{:<26}{:>16.0f}{:>14.3f}'.format('batch ' + NAME, ARGS.rounds * 60 / ELAPSED, ELAPSED * 1e6 / ARGS.rounds))
+        ELAPSED = play_engine(NAME, ARGS.engine_rounds, ARGS.seed)
+        print('{:<26}{:>16.0f}{:>14.3f}'.format('engine ' + NAME, ARGS.engine_rounds * 60 / ELAPSED,
+                                              ELAPSED * 1e6 / ARGS.engine_rounds))
+        if ARGS.check:
+            MISMATCHED = replay(BATCH, round_actions(LOG, ARGS.rounds))
+            print('{} rounds, {}'.format(ARGS.rounds, '{} mismatched, the first is round {}'.format(
+                len(MISMATCHED), MISMATCHED[0]) if MISMATCHED else 'payoffs identical to engine.RoundState'))
@@ -0,0 +1,105 @@
+'''
+Compares the memory use and throughput of the python_skeleton namedtuple RoundState
+against CompactRoundState, which keeps a per-round action history instead of a chain of states.
+
+Run with python3 benchmarks/states.py from the repository root.
+'''
+import argparse
+import random
+import time
+import tracemalloc
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'python_skeleton'))
+from skeleton.actions import FoldAction, CallAction, CheckAction, RaiseAction
+from skeleton.states import RoundState, CompactRoundState, TerminalState
+from skeleton.states import STARTING_STACK, BIG_BLIND, SMALL_BLIND
+
+
+def initial_state(state_class):
+    '''
+    Returns the state at the start of a round.
+    '''
+    pips = [SMALL_BLIND, BIG_BLIND]
+    stacks = [STARTING_STACK - SMALL_BLIND, STARTING_STACK - BIG_BLIND]
+    return state_class(0, 0, pips, stacks, [['As', 'Kd'], []], [], None)
+
+
+def random_rounds(num_rounds, seed):
+    '''
+    Generates the action sequences of random rounds, raising a third of the time.
+    '''
+    rng = random.Random(seed)
+    rounds = []
+    for _ in range(num_rounds):
+        state = initial_state(RoundState)
+        actions = []
+        while not isinstance(state, TerminalState):
+            legal_actions = state.legal_actions()
+            if RaiseAction in legal_actions and rng.random() < 0.33:
+                min_raise, max_raise = state.raise_bounds()
+                action = RaiseAction(rng.randint(min_raise, max_raise))
+            elif FoldAction in legal_actions and rng.random() < 0.2:
+                action = FoldAction()
+            else:
+                action = CheckAction() if CheckAction in legal_actions else CallAction()
+            actions.append(action)
+            state = state.proceed(action)
+        rounds.append(actions)
+    return rounds
+
+
+def play(state_class, rounds):
+    '''
+    Replays every round as a bot would see it and returns the terminal states.
+    '''
+    terminal_states = []
+    for actions in rounds:
+        state = initial_state(state_class)
+        for action in actions:
+            legal_actions = state.legal_actions()
+            if RaiseAction in legal_actions:
+                state.raise_bounds()
+            state = state.proceed(action)
+        terminal_states.append(state)
+    return terminal_states
+
+
+def measure(state_class, rounds, repeats):
+    '''
+    Returns the best throughput in actions per second and the bytes retained per round.
+    '''
+    num_actions = sum(len(actions) for actions in rounds)
+    best = float('inf')
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        play(state_class, rounds)
+        best = min(best, time.perf_counter() - start_time)
+    tracemalloc.start()
+    terminal_states = play(state_class, rounds)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del terminal_states
+    return num_actions / best, retained / len(rounds)
+
+
+def parse_args():
+    '''
+    Parses benchmark arguments.
+    '''
+    parser = argparse.ArgumentParser(prog='python3 benchmarks/states.py')
+    parser.add_argument('-n', '--rounds', type=int, default=20000, help='Number of random rounds to replay')
+    parser.add_argument('-r', '--repeats', type=int, default=5, help='Timing repeats, the best is reported')
+    parser.add_argument('-s', '--seed', type=int, default=0, help='Seed for the random rounds')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    ARGS = parse_args()
+    ROUNDS = random_rounds(ARGS.rounds, ARGS.seed)
+    print('{} rounds, {} actions'.format(len(ROUNDS), sum(len(actions) for actions in ROUNDS)))
+    print('{:<20}{:>16}{:>20}'.format('state class', 'actions/sec', 'bytes kept/round'))
+    for STATE_CLASS in (RoundState, CompactRoundState):
+        THROUGHPUT, RETAINED = measure(STATE_CLASS, ROUNDS, ARGS.repeats)
+        print('{:<20}{:>16,.0f}{:>20,.0f}'.format(STATE_CLASS.__name__, THROUGHPUT, RETAINED))
@@ -0,0 +1,113 @@
+'''
+Measures the round trip latency of one engine query over each BOT_TRANSPORT.
+A child process stands in for the bot, connecting the way the skeletons do and answering every line with a check.
+
+Run with python3 benchmarks/transports.py from the repository root.
+'''
+import argparse
+import subprocess
+import tempfile
+import shutil
+import socket
+import time
+import os
+import sys
+
+MESSAGE = 'T29.873 P0 Hac,7d B8h,2s,Kd,5c RAISE\n'
+RESPONSE = 'K\n'
+
+
+def echo(args):
+    '''
+    Answers engine lines until the connection closes, as a bot would.
+    '''
+    if args.fd is not None:
+        sock = socket.socket(fileno=args.fd)
+    elif args.unix is not None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(args.unix)
+    else:
+        sock = socket.create_connection(('localhost', args.port))
+    socketfile = sock.makefile('rw')
+    for _ in iter(socketfile.readline, ''):
+        socketfile.write(RESPONSE)
+        socketfile.flush()
+    socketfile.close()
+    sock.close()
+
+
+def connect(transport):
+    '''
+    Starts the echo bot over a transport and returns its process and socket file.
+    '''
+    command = [sys.executable, os.path.abspath(__file__), '--echo']
+    if transport == 'socketpair':
+        engine_socket, bot_socket = socket.socketpair()
+        with engine_socket, bot_socket:
+            proc = subprocess.Popen(command + ['--fd', str(bot_socket.fileno())], pass_fds=(bot_socket.fileno(),))
+            return proc, engine_socket.makefile('rw')
+    socket_dir = tempfile.mkdtemp(prefix='pokerbots')
+    try:
+        if transport == 'unix':
+            address = os.path.join(socket_dir, 'engine.sock')
+            server_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            address = ('', 0)
+            server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        with server_socket:
+            server_socket.bind(address)
+            server_socket.listen()
+            if transport == 'unix':
+                proc = subprocess.Popen(command + ['--unix', address])
+            else:
+                proc = subprocess.Popen(command + [str(server_socket.getsockname()[1])])
+            client_socket, _ = server_socket.accept()
+            with client_socket:
+                return proc, client_socket.makefile('rw')
+    finally:
+        shutil.rmtree(socket_dir)
+
+
+def measure(transport, num_queries):
+    '''
+    Returns the sorted round trip latencies in microseconds.
+    '''
+    proc, socketfile = connect(transport)
+    latencies = []
+    for _ in range(num_queries):
+        start_time = time.perf_counter()
+        socketfile.write(MESSAGE)
+        socketfile.flush()
+        socketfile.readline()
+        latencies.append((time.perf_counter() - start_time) * 1e6)
+    socketfile.close()
+    proc.wait()
+    return sorted(latencies)
+
+
+def parse_args():
+    '''
+    Parses benchmark arguments, and the connection arguments of the echo bot.
+    '''
+    parser = argparse.ArgumentParser(prog='python3 benchmarks/transports.py')
+    parser.add_argument('-n', '--queries', type=int, default=20000, help='Number of queries per transport')
+    parser.add_argument('--echo', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--unix', type=str, default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--fd', type=int, default=None, help=argparse.SUPPRESS)
+    parser.add_argument('port', type=int, nargs='?', default=None, help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    ARGS = parse_args()
+    if ARGS.echo:
+        echo(ARGS)
+        sys.exit()
+    TRANSPORTS = ['tcp', 'unix', 'socketpair'] if hasattr(socket, 'AF_UNIX') else ['tcp']
+    print('{} queries per transport'.format(ARGS.queries))
+    print('{:<14}{:>12}{:>12}{:>12}{:>14}'.format('transport', 'mean us', 'p50 us', 'p99 us', 'queries/sec'))
+    for TRANSPORT in TRANSPORTS:
+        LATENCIES = measure(TRANSPORT, ARGS.queries)
+        MEAN = sum(LATENCIES) / len(LATENCIES)
+        print('{:<14}{:>12.1f}{:>12.1f}{:>12.1f}{:>14,.0f}'.format(TRANSPORT, MEAN, LATENCIES[len(LATENCIES) // 2],
+                                                                   LATENCIES[int(len(LATENCIES) * 0.99)], 1e6 / MEAN))
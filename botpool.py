@@ -0,0 +1,64 @@
+'''
+6.176 MIT POKERBOTS BOT POOL
+Keeps pokerbots running between the games of a tournament when WARM_BOTS is set.
+'''
+
+
+class BotPool():
+    '''
+    Keeps pokerbots running between games when WARM_BOTS is set, so that only the first game starts them.
+    Pokerbots which do not ack the new game clause are stopped and started again by the next game.
+    '''
+
+    def __init__(self):
+        self.idle = []
+
+    def take(self, output_dir, bots):
+        '''
+        Returns the warm players which start a new game in output_dir, keyed by name,
+        given the name and path of each pokerbot in the game.
+        '''
+        warm_players = {}
+        for player in self.claim(bots):
+            if player.reset(output_dir):
+                warm_players[player.name] = player
+            else:
+                print(player.name, 'did not ack the new game, restarting it')
+                player.stop()
+        return warm_players
+
+    def claim(self, bots):
+        '''
+        Removes and returns the idle players which can play a game between the named pokerbots.
+        '''
+        claimed = []
+        for name, path in bots:
+            matches = [player for player in self.idle if (player.name, player.path) == (name, path)]
+            if matches:
+                claimed.append(matches[0])
+                self.idle.remove(matches[0])
+        return claimed
+
+    def keep(self, player):
+        '''
+        Returns whether a player at the end of a game is still running and can be kept.
+        '''
+        return player.connected() and player.game_clock > 0.
+
+    def release(self, players):
+        '''
+        Keeps the players at the end of a game for the next one, stopping any which cannot be kept.
+        '''
+        for player in players:
+            if self.keep(player) and player.finish():
+                self.idle.append(player)
+            else:
+                player.stop()
+
+    def close(self):
+        '''
+        Stops every idle pokerbot.
+        '''
+        for player in self.idle:
+            player.stop()
+        self.idle = []
@@ -0,0 +1,133 @@
+'''
+6.176 MIT POKERBOTS BUILD CACHE
+Caches pokerbot builds between games, so that only bots which changed are built again.
+'''
+import hashlib
+import json
+import os
+
+
+class BuildCache():
+    '''
+    Caches pokerbot builds in a directory, keyed on a hash of the files in the pokerbot directory,
+    including its commands.json. The files a build creates or rewrites are its outputs,
+    which are stored along with its log and left out of the hash of later builds.
+    '''
+
+    # directories which are never hashed
+    SKIPPED = {'__pycache__', '.git'}
+
+    def __init__(self, path):
+        self.path = path
+
+    def scan(self, bot_path):
+        '''
+        Returns the modification time and size of every file in the pokerbot directory, keyed by relative path.
+        '''
+        files = {}
+        for root, dirs, names in os.walk(bot_path):
+            dirs[:] = sorted(name for name in dirs if name not in BuildCache.SKIPPED and
+                             os.path.abspath(os.path.join(root, name)) != self.path)
+            for name in names:
+                full_name = os.path.join(root, name)
+                stat = os.stat(full_name)
+                files[os.path.relpath(full_name, bot_path)] = (stat.st_mtime_ns, stat.st_size)
+        return files
+
+    @staticmethod
+    def digest(name):
+        '''
+        Returns the SHA-256 hex digest of a file.
+        '''
+        sha = hashlib.sha256()
+        with open(name, 'rb') as hashed_file:
+            for block in iter(lambda: hashed_file.read(1 << 20), b''):
+                sha.update(block)
+        return sha.hexdigest()
+
+    def entry_name(self, kind, key):
+        '''
+        Returns the name of a cache file of the given kind.
+        '''
+        return os.path.join(self.path, kind, key)
+
+    def load(self, kind, key):
+        '''
+        Returns a cached JSON entry, or None if there is none.
+        '''
+        try:
+            with open(self.entry_name(kind, key) + '.json', 'r') as entry_file:
+                return json.load(entry_file)
+        except (OSError, ValueError):
+            return None
+
+    def store(self, name, data):
+        '''
+        Writes a cache file atomically, so that concurrent engines never read a partial file.
+        '''
+        os.makedirs(os.path.dirname(name), exist_ok=True)
+        temp_name = '{}.{}.tmp'.format(name, os.getpid())
+        with open(temp_name, 'wb') as temp_file:
+            temp_file.write(data)
+        os.replace(temp_name, name)
+
+    def key(self, bot_path, files, outputs):
+        '''
+        Returns the hash of the pokerbot's files, leaving out its build outputs.
+        '''
+        sha = hashlib.sha256()
+        for name in sorted(files):
+            if name not in outputs:
+                sha.update('{}\0{}\0'.format(name, BuildCache.digest(os.path.join(bot_path, name))).encode())
+        return sha.hexdigest()
+
+    def lookup(self, bot_path):
+        '''
+        Returns the files in the pokerbot directory and the cached build of them, which is None if there is none.
+        '''
+        files = self.scan(bot_path)
+        path_key = hashlib.sha256(os.path.abspath(bot_path).encode()).hexdigest()
+        outputs = set((self.load('paths', path_key) or {}).get('outputs', []))
+        return files, self.load('builds', self.key(bot_path, files, outputs))
+
+    def restore(self, bot_path, build):
+        '''
+        Restores the outputs of a cached build which differ from those in the pokerbot directory,
+        and returns its log, or None if the cached outputs are missing.
+        '''
+        for name, (digest, mode) in build['outputs'].items():
+            blob_name = self.entry_name('blobs', digest)
+            target_name = os.path.join(bot_path, name)
+            if not os.path.exists(blob_name):
+                return None
+            if os.path.exists(target_name) and BuildCache.digest(target_name) == digest:
+                continue
+            with open(blob_name, 'rb') as blob_file:
+                self.store(target_name, blob_file.read())
+            os.chmod(target_name, mode)
+        try:
+            with open(self.entry_name('blobs', build['log']), 'rb') as log_file:
+                return log_file.read()
+        except OSError:
+            return None
+
+    def save(self, bot_path, files, log):
+        '''
+        Stores the outputs of a build, which are the files created or rewritten since files was scanned, and its log.
+        '''
+        after = self.scan(bot_path)
+        outputs = {}
+        for name, stat in after.items():
+            if files.get(name) != stat:
+                full_name = os.path.join(bot_path, name)
+                digest = BuildCache.digest(full_name)
+                with open(full_name, 'rb') as output_file:
+                    self.store(self.entry_name('blobs', digest), output_file.read())
+                outputs[name] = [digest, os.stat(full_name).st_mode & 0o7777]
+        log_digest = hashlib.sha256(log).hexdigest()
+        self.store(self.entry_name('blobs', log_digest), log)
+        build = {'outputs': outputs, 'log': log_digest}
+        self.store(self.entry_name('builds', self.key(bot_path, after, outputs)) + '.json', json.dumps(build).encode())
+        path_key = hashlib.sha256(os.path.abspath(bot_path).encode()).hexdigest()
+        self.store(self.entry_name('paths', path_key) + '.json',
+                   json.dumps({'path': os.path.abspath(bot_path), 'outputs': sorted(outputs)}).encode())
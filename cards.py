@@ -0,0 +1,20 @@
+'''
+Integer card encoding shared by the engine and the skeletons.
+Card c in 0..51 has rank c // 4, from 2 to A, and suit c % 4, from c, d, h to s,
+which is the order of eval7.Deck.
+'''
+
+RANK_CHARS = '23456789TJQKA'
+SUIT_CHARS = 'cdhs'
+CARD_STRINGS = [rank + suit for rank in RANK_CHARS for suit in SUIT_CHARS]
+CARD_INDEX = {string: card for card, string in enumerate(CARD_STRINGS)}
+RANKS = [card // 4 for card in range(52)]
+SUITS = [card % 4 for card in range(52)]
+
+
+def permuted_cards(perm):
+    '''
+    Returns the card each card is worth under a value permutation,
+    where perm[rank] is the rank that rank is worth.
+    '''
+    return [4 * perm[RANKS[card]] + SUITS[card] for card in range(52)]
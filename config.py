@@ -5,18 +5,72 @@ PLAYER_1_PATH = './python_skeleton'
 # NO TRAILING SLASHES ARE ALLOWED IN PATHS
 PLAYER_2_NAME = 'B'
 PLAYER_2_PATH = './python_skeleton'
+# IN-PROCESS PLAYERS MUST BE PYTHON BOTS BUILT ON python_skeleton
+# THEIR player.py IS IMPORTED INTO THE ENGINE INSTEAD OF RUN AS A SUBPROCESS
+PLAYER_1_IN_PROCESS = False
+PLAYER_2_IN_PROCESS = False
 # GAME PROGRESS IS RECORDED HERE
 GAME_LOG_FILENAME = 'gamelog'
+# THE GAME LOG IS WRITTEN TO DISK EVERY GAME_LOG_FLUSH_ROUNDS ROUNDS
+GAME_LOG_FLUSH_ROUNDS = 10
+# GAME_LOG_COMPRESSION IS None, 'gz', 'bz2', 'xz' OR 'zst' (PYTHON>=3.14)
+GAME_LOG_COMPRESSION = None
+# A BINARY GAME RECORD IS ALSO WRITTEN TO GAME_LOG_FILENAME.pbr, READ IT WITH gamerecord.py
+GAME_RECORD = False
+# PER-DECISION LATENCY PERCENTILES AND HISTOGRAMS ARE WRITTEN TO GAME_LOG_FILENAME_latency.json
+LATENCY_REPORT = True
 # PLAYER_LOG_SIZE_LIMIT IS IN BYTES
 PLAYER_LOG_SIZE_LIMIT = 524288
+# THE LAST PLAYER_LOG_TAIL_SIZE BYTES OF OUTPUT PAST THE LIMIT ARE ALSO KEPT
+PLAYER_LOG_TAIL_SIZE = 16384
+# PREDEALING DEALS EVERY ROUND AND EVALUATES ALL SHOWDOWNS BEFORE THE FIRST ROUND
+PREDEAL_ROUNDS = False
+# GAME_SEED FIXES THE VALUE PERMUTATION AND EVERY ROUND'S CARDS, None DRAWS FRESH ONES EVERY GAME
+GAME_SEED = None
+# A DUPLICATE MATCH REPLAYS THE GAME'S CARDS WITH THE PLAYERS' SEATS SWAPPED AND REPORTS THE NET RESULT
+DUPLICATE_MATCH = False
 # STARTING_GAME_CLOCK AND TIMEOUTS ARE IN SECONDS
 ENFORCE_GAME_CLOCK = True
 STARTING_GAME_CLOCK = 30.
 BUILD_TIMEOUT = 10.
+# BUILDS ARE CACHED IN BUILD_CACHE_DIR, KEYED ON A HASH OF THE FILES IN THE BOT DIRECTORY AND ITS commands.json
+# AN UNCHANGED BOT IS NOT REBUILT, ITS BUILD OUTPUT AND LOG ARE RESTORED FROM THE CACHE INSTEAD
+# None DISABLES THE CACHE, SO EVERY GAME REBUILDS ITS BOTS
+BUILD_CACHE_DIR = None
 CONNECT_TIMEOUT = 10.
+# BOT_TRANSPORT IS 'tcp', 'unix' FOR A UNIX DOMAIN SOCKET OR 'socketpair' FOR AN INHERITED SOCKET
+# THE LOCAL TRANSPORTS NEED AF_UNIX AND FALL BACK TO 'tcp' WITHOUT IT
+BOT_TRANSPORT = 'tcp'
+# BOT_PROTOCOL IS 'text' OR 'binary' TO OFFER BOTS THE LENGTH-PREFIXED BINARY PROTOCOL
+# BOTS WHICH DO NOT ACCEPT THE OFFER KEEP THE TEXT PROTOCOL
+BOT_PROTOCOL = 'text'
+# ROUND_OVER_MODE IS 'ack' TO WAIT FOR EACH BOT TO ACK THE END OF EVERY ROUND IN TURN,
+# 'push' TO SEND THE END OF THE ROUND TO BOTH BOTS AT ONCE AND READ THEIR ACKS WITH THEIR NEXT RESPONSES,
+# OR 'piggyback' TO SEND IT AT THE START OF EACH BOT'S NEXT MESSAGE WITH NO ACK AT ALL
+# 'push' LOSES MESSAGES TO BOTS WHICH WRITE THROUGH THE TEXT LAYER THEY READ FROM, AS THE ORIGINAL PYTHON SKELETON DID
+ROUND_OVER_MODE = 'ack'
+# WARM_BOTS KEEPS POKERBOTS RUNNING BETWEEN THE GAMES OF A DUPLICATE MATCH OR TOURNAMENT
+# EACH LATER GAME STARTS WITH A NEW GAME CLAUSE, AND BOTS WHICH DO NOT ACK IT ARE RESTARTED
+WARM_BOTS = False
 # THE GAME VARIANT FIXES THE PARAMETERS BELOW
 # CHANGE ONLY FOR TRAINING OR EXPERIMENTATION
 NUM_ROUNDS = 1000
 STARTING_STACK = 200
 BIG_BLIND = 2
 SMALL_BLIND = 1
+# TOURNAMENT SETTINGS USED BY tournament.py
+# EACH GAME IS PLAYED IN ITS OWN SUBDIRECTORY OF TOURNAMENT_DIR
+NUM_GAMES = 100
+TOURNAMENT_DIR = 'tournament'
+# TOURNAMENT_WORKERS = 0 USES EVERY AVAILABLE CORE
+TOURNAMENT_WORKERS = 0
+# TOURNAMENTS CACHE BUILDS IN TOURNAMENT_BUILD_CACHE_DIR UNLESS BUILD_CACHE_DIR IS SET, None ALWAYS REBUILDS
+TOURNAMENT_BUILD_CACHE_DIR = '.build_cache'
+# EARLY_STOPPING ENDS A TOURNAMENT ONCE A SEQUENTIAL PROBABILITY RATIO TEST DECIDES BETWEEN PLAYER_1
+# WINNING AND LOSING SPRT_MIN_EFFECT CHIPS PER ROUND, WITH ERROR RATES SPRT_ALPHA AND SPRT_BETA
+EARLY_STOPPING = False
+SPRT_MIN_EFFECT = 1.
+SPRT_ALPHA = 0.05
+SPRT_BETA = 0.05
+# THE TEST WAITS FOR SPRT_MIN_ROUNDS ROUNDS, SINCE IT ESTIMATES THE VARIANCE OF A ROUND FROM THEM
+SPRT_MIN_ROUNDS = 500
@@ -10,6 +10,12 @@
 class Bot
 {
     public:
+        /**
+         * Called when the engine keeps your bot running to play another game. Optional.
+         * Reset anything which should not carry over, keeping anything slow to set up.
+         */
+        virtual void handle_new_game() {}
+
         /**
          * Called when a new round starts. Called NUM_ROUNDS times.
          *
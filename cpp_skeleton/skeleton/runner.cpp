@@ -3,22 +3,201 @@
  */
 #include "runner.hpp"
 
-Runner::Runner(Bot* pokerbot, tcp::iostream* stream)
+Runner::Runner(Bot* pokerbot, std::iostream* stream)
 {
     this->pokerbot = pokerbot;
     this->stream = stream;
+    this->binary = false;
 }
 
 /**
- * Returns an incoming message from the engine.
+ * Returns the common format of an integer card, such as "As" for 51.
  */
-vector<string> Runner::receive()
+static string card_string(int card)
 {
-    string line;
-    std::getline(*(this->stream), line);
-    boost::algorithm::trim(line);
-    vector<string> packet;
-    boost::split(packet, line, boost::is_any_of(" "));
+    static const string RANK_CHARS = "23456789TJQKA";
+    static const string SUIT_CHARS = "cdhs";
+    return string({ RANK_CHARS[card / 4], SUIT_CHARS[card % 4] });
+}
+
+/**
+ * Returns an incoming message from the engine, which is overwritten by the next one.
+ */
+vector<Clause>& Runner::receive()
+{
+    return this->binary ? this->receive_binary() : this->receive_text();
+}
+
+/**
+ * Copies the comma-separated cards from begin to end into a clause.
+ */
+static void parse_cards(Clause& clause, const char* begin, const char* end)
+{
+    clause.num_cards = 0;
+    while (begin < end && clause.num_cards < 5)
+    {
+        const char* card_end = std::find(begin, end, ',');
+        clause.cards[clause.num_cards++].assign(begin, card_end);
+        begin = card_end + 1;
+    }
+}
+
+/**
+ * Returns an incoming text message from the engine.
+ * Clauses are decoded in place, without splitting the line into strings.
+ */
+vector<Clause>& Runner::receive_text()
+{
+    std::getline(*(this->stream), this->line);
+    const char* cursor = this->line.data();
+    const char* end = cursor + this->line.size();
+    while (cursor < end && std::isspace((unsigned char) *cursor))
+    {
+        cursor++;
+    }
+    while (end > cursor && std::isspace((unsigned char) end[-1]))
+    {
+        end--;
+    }
+    vector<Clause>& packet = this->packet;
+    unsigned int num_clauses = 0;
+    while (cursor < end)
+    {
+        const char* clause_end = std::find(cursor, end, ' ');
+        if (clause_end > cursor)
+        {
+            if (num_clauses == packet.size())
+            {
+                packet.emplace_back();
+            }
+            Clause& clause = packet[num_clauses++];
+            clause.code = *cursor;
+            const char* field = cursor + 1;
+            switch (clause.code)
+            {
+                case 'T':
+                {
+                    clause.game_clock = std::strtof(field, NULL);
+                    break;
+                }
+                case 'P':
+                case 'R':
+                case 'D':
+                case 'V':
+                {
+                    clause.value = (int) std::strtol(field, NULL, 10);
+                    break;
+                }
+                case 'H':
+                case 'B':
+                case 'O':
+                {
+                    parse_cards(clause, field, clause_end);
+                    break;
+                }
+                default:
+                {
+                    break;
+                }
+            }
+        }
+        cursor = clause_end + 1;
+    }
+    if (num_clauses == 0)  // the engine disconnected
+    {
+        packet.resize(1);
+        packet[0].code = 'Q';
+        return packet;
+    }
+    packet.resize(num_clauses);
+    return packet;
+}
+
+/**
+ * Returns an incoming binary message from the engine.
+ * Messages are a big-endian u16 length followed by clauses of a code byte and fixed-width fields.
+ */
+vector<Clause>& Runner::receive_binary()
+{
+    unsigned char header[2];
+    this->stream->read((char*) header, 2);
+    vector<unsigned char>& payload = this->payload;
+    payload.resize(header[0] << 8 | header[1]);
+    if (this->stream->good())
+    {
+        this->stream->read((char*) payload.data(), payload.size());
+    }
+    vector<Clause>& packet = this->packet;
+    if (!this->stream->good())  // the engine disconnected
+    {
+        packet.resize(1);
+        packet[0].code = 'Q';
+        return packet;
+    }
+    unsigned int num_clauses = 0;
+    unsigned int i = 0;
+    while (i < payload.size())
+    {
+        if (num_clauses == packet.size())
+        {
+            packet.emplace_back();
+        }
+        Clause& clause = packet[num_clauses++];
+        clause.code = payload[i];
+        switch (clause.code)
+        {
+            case 'T':
+            {
+                clause.game_clock = (payload[i+1] << 24 | payload[i+2] << 16 | payload[i+3] << 8 | payload[i+4]) / 1000.;
+                i += 5;
+                break;
+            }
+            case 'P':
+            {
+                clause.value = payload[i+1];
+                i += 2;
+                break;
+            }
+            case 'H':
+            case 'O':
+            {
+                clause.cards[0] = card_string(payload[i+1]);
+                clause.cards[1] = card_string(payload[i+2]);
+                clause.num_cards = 2;
+                i += 3;
+                break;
+            }
+            case 'R':
+            {
+                clause.value = payload[i+1] << 8 | payload[i+2];
+                i += 3;
+                break;
+            }
+            case 'D':
+            {
+                clause.value = (int16_t) (payload[i+1] << 8 | payload[i+2]);
+                i += 3;
+                break;
+            }
+            case 'B':
+            {
+                int num_cards = std::min((int) payload[i+1], 5);
+                for (int j = 0; j < num_cards; j++)
+                {
+                    clause.cards[j] = card_string(payload[i+2+j]);
+                }
+                clause.num_cards = num_cards;
+                i += 2 + payload[i+1];
+                break;
+            }
+            default:  // F, C, K, N or Q
+            {
+                i += 1;
+                break;
+            }
+        }
+    }
+    packet.resize(num_clauses);
     return packet;
 }
 
@@ -51,42 +230,67 @@ void Runner::send(Action action)
             break;
         }
     }
+    if (this->binary)
+    {
+        // a code byte followed by a big-endian u16 raise amount
+        int amount = action.action_type == RAISE_ACTION_TYPE ? std::min(std::max(action.amount, 0), 0xffff) : 0;
+        char response[3] = { code[0], (char) (amount >> 8), (char) (amount & 0xff) };
+        this->stream->write(response, 3);
+        this->stream->flush();
+        return;
+    }
     *(this->stream) << code << "\n";
 }
 
+/**
+ * Acks the engine's new game clause.
+ */
+void Runner::send_new_game()
+{
+    if (this->binary)
+    {
+        char response[3] = { 'N', 0, 0 };
+        this->stream->write(response, 3);
+        this->stream->flush();
+        return;
+    }
+    *(this->stream) << "N\n";
+}
+
 /**
  * Reconstructs the game tree based on the action history received from the engine.
  */
 void Runner::run()
 {
-    GameState* game_state = new GameState(0, 0., 1);
+    // the game state is built on the stack for each callback rather than allocated for each message
+    int bankroll = 0;
+    float game_clock = 0.;
+    int round_num = 1;
     State* round_state;
     int active = 0;
     bool round_flag = true;
     while (true)
     {
-        vector<string> packet = this->receive();
-        for (string clause : packet)
+        vector<Clause>& packet = this->receive();
+        bool negotiated = false;
+        bool new_game = false;
+        for (Clause& clause : packet)
         {
-            string leftover = clause.substr(1, clause.size() - 1);
-            switch (clause.at(0))
+            switch (clause.code)
             {
                 case 'T':
                 {
-                    GameState* freed_game_state = game_state;
-                    game_state = new GameState(game_state->bankroll, std::stof(leftover), game_state->round_num);
-                    delete freed_game_state;
+                    game_clock = clause.game_clock;
                     break;
                 }
                 case 'P':
                 {
-                    active = std::stoi(leftover);
+                    active = clause.value;
                     break;
                 }
                 case 'H':
                 {
-                    vector<string> cards;
-                    boost::split(cards, leftover, boost::is_any_of(","));
+                    array<string, 5>& cards = clause.cards;
                     array< array<string, 2>, 2> hands = { "" };
                     hands[active] = (array<string, 2>) { cards[0], cards[1] };
                     array<string, 5> deck = { "" };
@@ -95,7 +299,8 @@ void Runner::run()
                     round_state = new RoundState(0, 0, pips, stacks, hands, deck, NULL);
                     if (round_flag)
                     {
-                        this->pokerbot->handle_new_round(game_state, (RoundState*) round_state, active);
+                        GameState game_state(bankroll, game_clock, round_num);
+                        this->pokerbot->handle_new_round(&game_state, (RoundState*) round_state, active);
                         round_flag = false;
                     }
                     break;
@@ -117,17 +322,15 @@ void Runner::run()
                 }
                 case 'R':
                 {
-                    round_state = ((RoundState*) round_state)->proceed(RaiseAction(std::stoi(leftover)));
+                    round_state = ((RoundState*) round_state)->proceed(RaiseAction(clause.value));
                     break;
                 }
                 case 'B':
                 {
-                    vector<string> cards;
-                    boost::split(cards, leftover, boost::is_any_of(","));
                     array<string, 5> revised_deck = { "" };
-                    for (unsigned int i = 0; i < cards.size(); i++)
+                    for (int i = 0; i < clause.num_cards; i++)
                     {
-                        revised_deck[i] = cards[i];
+                        revised_deck[i] = clause.cards[i];
                     }
                     RoundState* maker = (RoundState*) round_state;
                     round_state = new RoundState(maker->button, maker->street, maker->pips, maker->stacks,
@@ -138,8 +341,7 @@ void Runner::run()
                 case 'O':
                 {
                     // backtrack
-                    vector<string> cards;
-                    boost::split(cards, leftover, boost::is_any_of(","));
+                    array<string, 5>& cards = clause.cards;
                     TerminalState* freed_terminal_state = (TerminalState*) round_state;
                     round_state = freed_terminal_state->previous_state;
                     delete freed_terminal_state;
@@ -155,19 +357,16 @@ void Runner::run()
                 }
                 case 'D':
                 {
-                    int delta = std::stoi(leftover);
+                    int delta = clause.value;
                     array<int, 2> deltas = { -1 * delta, -1 * delta };
                     deltas[active] = delta;
                     TerminalState* freed_terminal_state = (TerminalState*) round_state;
                     round_state = new TerminalState(deltas, freed_terminal_state->previous_state);
                     delete freed_terminal_state;
-                    GameState* freed_game_state = game_state;
-                    game_state = new GameState(game_state->bankroll + delta, game_state->game_clock, game_state->round_num);
-                    delete freed_game_state;
-                    this->pokerbot->handle_round_over(game_state, (TerminalState*) round_state, active);
-                    freed_game_state = game_state;
-                    game_state = new GameState(game_state->bankroll, game_state->game_clock, game_state->round_num + 1);
-                    delete freed_game_state;
+                    bankroll += delta;
+                    GameState game_state(bankroll, game_clock, round_num);
+                    this->pokerbot->handle_round_over(&game_state, (TerminalState*) round_state, active);
+                    round_num++;
                     freed_terminal_state = (TerminalState*) round_state;
                     round_state = freed_terminal_state->previous_state;
                     delete freed_terminal_state;
@@ -181,24 +380,55 @@ void Runner::run()
                     round_flag = true;
                     break;
                 }
+                case 'N':
+                {
+                    // the engine starts another game instead of quitting
+                    std::cout << std::flush;  // whatever we printed belongs in the last game's log
+                    this->pokerbot->handle_new_game();
+                    bankroll = 0;
+                    game_clock = 0.;
+                    round_num = 1;
+                    round_flag = true;
+                    new_game = true;
+                    break;
+                }
                 case 'Q':
                 {
-                    delete game_state;
                     return;
                 }
+                case 'V':
+                {
+                    // accept the binary protocol, which takes over the connection
+                    if (clause.value == 1)
+                    {
+                        *(this->stream) << "V1\n" << std::flush;
+                        this->binary = true;
+                        negotiated = true;
+                    }
+                    break;
+                }
                 default:
                 {
                     break;
                 }
             }
         }
-        if (round_flag)  // ack the engine
+        if (negotiated)
+        {
+            continue;
+        }
+        if (new_game)
+        {
+            this->send_new_game();
+        }
+        else if (round_flag)  // ack the engine
         {
             this->send(CheckAction());
         }
         else
         {
-            Action action = this->pokerbot->get_action(game_state, (RoundState*) round_state, active);
+            GameState game_state(bankroll, game_clock, round_num);
+            Action action = this->pokerbot->get_action(&game_state, (RoundState*) round_state, active);
             this->send(action);
         }
     }
@@ -210,9 +440,13 @@ void Runner::run()
 vector<string> parse_args(int argc, char* argv[])
 {
     string host = "localhost";
-    int port;
+    string port;
+    string unix_path;
+    string fd;
 
     bool host_flag = false;
+    bool unix_flag = false;
+    bool fd_flag = false;
     for (int i = 1; i < argc; i++)
     {
         string arg(argv[i]);
@@ -220,6 +454,14 @@ vector<string> parse_args(int argc, char* argv[])
         {
             host_flag = true;
         }
+        else if (arg == "--unix")
+        {
+            unix_flag = true;
+        }
+        else if (arg == "--fd")
+        {
+            fd_flag = true;
+        }
         else if (arg == "--port")
         {
             // nothing to do
@@ -229,13 +471,23 @@ vector<string> parse_args(int argc, char* argv[])
             host = arg;
             host_flag = false;
         }
+        else if (unix_flag)
+        {
+            unix_path = arg;
+            unix_flag = false;
+        }
+        else if (fd_flag)
+        {
+            fd = std::to_string(std::stoi(arg));
+            fd_flag = false;
+        }
         else
         {
-            port = std::stoi(arg);
+            port = std::to_string(std::stoi(arg));
         }
     }
 
-    return (vector<string>) { host, std::to_string(port) };
+    return (vector<string>) { host, port, unix_path, fd };
 }
 
 /**
@@ -245,6 +497,36 @@ void run_bot(Bot* pokerbot, vector<string> args)
 {
     string host = args[0];
     string port = args[1];
+    string unix_path = args[2];
+    string fd = args[3];
+    if (!fd.empty() || !unix_path.empty())
+    {
+        // connect to the engine over a Unix domain socket
+        stream_protocol::iostream stream;
+        if (!fd.empty())
+        {
+            boost::system::error_code error;
+            stream.socket().assign(stream_protocol(), std::stoi(fd), error);
+            if (error)
+            {
+                std::cout << "Could not use socket file descriptor " << fd << "\n";
+                return;
+            }
+        }
+        else
+        {
+            stream.connect(stream_protocol::endpoint(unix_path));
+        }
+        if (!stream)
+        {
+            std::cout << "Could not connect to " << unix_path << "\n";
+            return;
+        }
+        Runner runner(pokerbot, &stream);
+        runner.run();
+        stream.close();
+        return;
+    }
     // connect to the engine
     tcp::iostream stream;
     stream.connect(host, port);
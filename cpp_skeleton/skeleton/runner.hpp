@@ -2,11 +2,15 @@
 #define __SKELETON_RUNNER_HPP__
 
 #include <iostream>
+#include <cctype>
+#include <cstdlib>
 #include <vector>
 #include <array>
+#include <algorithm>
 #include <string>
 #include <boost/algorithm/string.hpp>
 #include <boost/asio/ip/tcp.hpp>
+#include <boost/asio/local/stream_protocol.hpp>
 #include "actions.hpp"
 #include "states.hpp"
 #include "bot.hpp"
@@ -15,6 +19,21 @@ using std::vector;
 using std::array;
 using std::string;
 using boost::asio::ip::tcp;
+using boost::asio::local::stream_protocol;
+
+
+/**
+ * One clause of a message from the engine, decoded from either protocol.
+ * Clauses are reused from message to message, so decoding them allocates nothing.
+ */
+struct Clause
+{
+    char code;
+    int value;  // player index, raise amount, delta or protocol version
+    float game_clock;
+    array<string, 5> cards;
+    int num_cards;
+};
 
 
 /**
@@ -24,21 +43,41 @@ class Runner
 {
     private:
         Bot* pokerbot;
-        tcp::iostream* stream;
+        std::iostream* stream;
+        bool binary;
+        // buffers reused for every message
+        string line;
+        vector<unsigned char> payload;
+        vector<Clause> packet;
+
+        /**
+         * Returns an incoming text message from the engine.
+         */
+        vector<Clause>& receive_text();
+
+        /**
+         * Returns an incoming binary message from the engine.
+         */
+        vector<Clause>& receive_binary();
 
     public:
-        Runner(Bot* pokerbot, tcp::iostream* stream);
+        Runner(Bot* pokerbot, std::iostream* stream);
 
         /**
-         * Returns an incoming message from the engine.
+         * Returns an incoming message from the engine, which is overwritten by the next one.
          */
-        vector<string> receive();
+        vector<Clause>& receive();
 
         /**
          * Encodes an action and sends it to the engine.
          */
         void send(Action action);
 
+        /**
+         * Acks the engine's new game clause.
+         */
+        void send_new_game();
+
         /**
          * Reconstructs the game tree based on the action history received from the engine.
          */
@@ -48,6 +87,8 @@ class Runner
 
 /**
  * Parses arguments corresponding to socket connection information.
+ * Returns the host, port, Unix domain socket path and inherited socket file descriptor,
+ * where an unused path or file descriptor is empty.
  */
 vector<string> parse_args(int argc, char* argv[]);
 
@@ -3,6 +3,7 @@
 
 #include <array>
 #include <string>
+#include <new>
 #include "actions.hpp"
 
 using std::array;
@@ -32,6 +33,39 @@ class GameState
 };
 
 
+/**
+ * Recycles the memory of deleted states of one type, so that once the first rounds have been played
+ * the runner builds every state in memory freed by an earlier round rather than allocating it.
+ */
+template <typename T>
+class StatePool
+{
+    public:
+        static void* allocate()
+        {
+            if (free_list == NULL)
+            {
+                return ::operator new(sizeof(T));
+            }
+            void* memory = free_list;
+            free_list = *(void**) memory;
+            return memory;
+        }
+
+        static void release(void* memory)
+        {
+            *(void**) memory = free_list;
+            free_list = memory;
+        }
+
+    private:
+        static void* free_list;
+};
+
+template <typename T>
+void* StatePool<T>::free_list = NULL;
+
+
 /**
  * The base class for the current state of one round of poker.
  */
@@ -53,6 +87,16 @@ class TerminalState : public State
             deltas(deltas),
             previous_state(previous_state)
         {}
+
+        static void* operator new(std::size_t size)
+        {
+            return StatePool<TerminalState>::allocate();
+        }
+
+        static void operator delete(void* memory)
+        {
+            StatePool<TerminalState>::release(memory);
+        }
 };
 
 
@@ -86,6 +130,16 @@ class RoundState : public State
             previous_state(previous_state)
         {}
 
+        static void* operator new(std::size_t size)
+        {
+            return StatePool<RoundState>::allocate();
+        }
+
+        static void operator delete(void* memory)
+        {
+            StatePool<RoundState>::release(memory);
+        }
+
         /**
          * Compares the players' hands and computes payoffs.
          */
@@ -2,20 +2,33 @@
 6.176 MIT POKERBOTS GAME ENGINE
 DO NOT REMOVE, RENAME, OR EDIT THIS FILE
 '''
-from numpy.random import geometric
+from numpy.random import geometric, RandomState
 from collections import namedtuple
-from threading import Thread
-from queue import Queue
+from threading import Thread, Lock
+from array import array
+import contextlib
+import random
+import argparse
+import cProfile
 import time
 import json
 import subprocess
+import tempfile
+import shutil
 import socket
+import struct
 import eval7
 import sys
 import os
 
 sys.path.append(os.getcwd())
 from config import *
+from cards import RANK_CHARS, CARD_STRINGS, permuted_cards
+import gamerecord
+from buildcache import BuildCache
+from botpool import BotPool
+from latencylog import LatencyLog
+from textlog import GameLog
 
 FoldAction = namedtuple('FoldAction', [])
 CallAction = namedtuple('CallAction', [])
@@ -25,9 +38,30 @@ RaiseAction = namedtuple('RaiseAction', ['amount'])
 TerminalState = namedtuple('TerminalState', ['deltas', 'previous_state'])
 
 STREET_NAMES = ['Flop', 'Turn', 'River']
+# stands in for responses which do not decode to an action
+InvalidAction = namedtuple('InvalidAction', [])
 DECODE = {'F': FoldAction, 'C': CallAction, 'K': CheckAction, 'R': RaiseAction}
-CCARDS = lambda cards: ','.join(map(str, cards))
-PCARDS = lambda cards: '{} [{}]'.format(' '.join(map(str, cards)), ' '.join(map(str, map(PERM.get, cards))))
+# the binary protocol is offered at connect time when BOT_PROTOCOL is 'binary'
+# messages are a big-endian u16 length followed by clauses of a code byte and fixed-width fields
+# and responses are a code byte followed by a u16 raise amount
+PROTOCOL_OFFER = 'V1'
+FRAME = struct.Struct('!H')
+# the frame length and game clock clause of a message are packed together
+MESSAGE_HEADER = struct.Struct('!HcI')
+CLOCK_SIZE = MESSAGE_HEADER.size - FRAME.size
+RAISE_CLAUSE = struct.Struct('!cH')
+DELTA_CLAUSE = struct.Struct('!ch')
+RESPONSE = struct.Struct('!cH')
+BINARY_QUIT = FRAME.pack(1) + b'Q'
+# warm pokerbots are sent the new game clause instead of the quit clause, and ack it in kind
+NEW_GAME = 'N'
+# builds are cached relative to the directory the engine was started in, tournament.py sets its own
+BUILD_CACHE_PATH = os.path.abspath(BUILD_CACHE_DIR) if BUILD_CACHE_DIR is not None else None
+CCARDS = lambda cards: ','.join([CARD_STRINGS[card] for card in cards])
+PCARDS = lambda cards, perm: '{} [{}]'.format(' '.join([CARD_STRINGS[card] for card in cards]),
+                                              ' '.join([CARD_STRINGS[perm[card]] for card in cards]))
+# eval7 cards by integer card, see cards.py
+EVAL7_CARDS = eval7.Deck().cards
 PVALUE = lambda name, value: ', {} ({})'.format(name, value)
 STATUS = lambda players: ''.join([PVALUE(p.name, p.bankroll) for p in players])
 
@@ -51,31 +85,79 @@ STATUS = lambda players: ''.join([PVALUE(p.name, p.bankroll) for p in players])
 # otherwise a response which encodes the player's action
 # Action history is sent once, including the player's actions
 
-STRAIGHTS = [0, 0]
+# Round history encoding:
+#
+# Each action is stored as one signed 16-bit code, the amount raised to for a RaiseAction
+# and a negative code otherwise.
+FOLD_CODE = -1
+CALL_CODE = -2
+CHECK_CODE = -3
+
+# seeds drawn for games which are not seeded, so that duplicate matches can replay their cards
+SEED_RANGE = 2 ** 32
+# the seat-swapped replay of a duplicate match is played in this subdirectory
+SWAPPED_DIR = 'swapped'
 
 
-class RoundState(namedtuple('_RoundState', ['button', 'street', 'pips', 'stacks', 'hands', 'deck', 'previous_state'])):
+class Deck():
+    '''
+    The board cards of one round as integer cards, along with the permuted eval7 cards
+    of its game and the game's counts of pots won with a straight, which showdowns update.
+    When the round was dealt in advance by Game.predeal, its showdown scores are known too.
+    '''
+
+    def __init__(self, board, perm_cards, straight_counts, scores=None, straights=None):
+        self.board = board
+        self.perm_cards = perm_cards
+        self.straight_counts = straight_counts
+        self.scores = scores
+        self.straights = straights
+
+    def peek(self, num):
+        '''
+        Returns the first num board cards.
+        '''
+        return self.board[:num]
+
+
+class RoundState():
     '''
     Encodes the game tree for one round of poker.
+    Rather than each state referring to the state before it, the actions of the round are
+    appended to one history array shared by all of its states.
     '''
 
+    __slots__ = ['button', 'street', 'pips', 'stacks', 'hands', 'deck', 'history', 'num_actions']
+
+    def __init__(self, button, street, pips, stacks, hands, deck, history, num_actions):
+        self.button = button
+        self.street = street
+        self.pips = pips
+        self.stacks = stacks
+        self.hands = hands
+        self.deck = deck
+        self.history = history
+        self.num_actions = num_actions
+
     def showdown(self):
         '''
         Compares the players' hands and computes payoffs.
         '''
-
-        global STRAIGHTS
-
-        score0 = eval7.evaluate(list(map(PERM.get, self.deck.peek(5) + self.hands[0])))
-        score1 = eval7.evaluate(list(map(PERM.get, self.deck.peek(5) + self.hands[1])))
+        deck = self.deck
+        if deck.scores is not None:
+            (score0, score1), straights = deck.scores, deck.straights
+        else:
+            score0 = eval7.evaluate([deck.perm_cards[card] for card in deck.board + self.hands[0]])
+            score1 = eval7.evaluate([deck.perm_cards[card] for card in deck.board + self.hands[1]])
+            straights = None
         if score0 > score1:
             delta = STARTING_STACK - self.stacks[1]
-            if eval7.hand_type(score0) == 'Straight':
-                STRAIGHTS[0] += 1
+            if straights[0] if straights else eval7.hand_type(score0) == 'Straight':
+                deck.straight_counts[0] += 1
         elif score0 < score1:
             delta = self.stacks[0] - STARTING_STACK
-            if eval7.hand_type(score1) == 'Straight':
-                STRAIGHTS[1] += 1
+            if straights[1] if straights else eval7.hand_type(score1) == 'Straight':
+                deck.straight_counts[1] += 1
         else:  # split the pot
             delta = (self.stacks[0] - self.stacks[1]) // 2
         return TerminalState([delta, -delta], self)
@@ -105,6 +187,16 @@ class RoundState(namedtuple('_RoundState', ['button', 'street', 'pips', 'stacks'
         min_contribution = min(max_contribution, continue_cost + max(continue_cost, BIG_BLIND))
         return (self.pips[active] + min_contribution, self.pips[active] + max_contribution)
 
+    def record(self, code):
+        '''
+        Appends an action code to the history and returns the history of the next state.
+        '''
+        history = self.history
+        if len(history) > self.num_actions:  # branching from an earlier state
+            history = history[:self.num_actions]
+        history.append(code)
+        return history
+
     def proceed_street(self):
         '''
         Resets the players' pips and advances the game tree to the next round of betting.
@@ -112,7 +204,7 @@ class RoundState(namedtuple('_RoundState', ['button', 'street', 'pips', 'stacks'
         if self.street == 5:
             return self.showdown()
         new_street = 3 if self.street == 0 else self.street + 1
-        return RoundState(1, new_street, [0, 0], self.stacks, self.hands, self.deck, self)
+        return RoundState(1, new_street, [0, 0], self.stacks, self.hands, self.deck, self.history, self.num_actions)
 
     def proceed(self, action):
         '''
@@ -121,30 +213,85 @@ class RoundState(namedtuple('_RoundState', ['button', 'street', 'pips', 'stacks'
         active = self.button % 2
         if isinstance(action, FoldAction):
             delta = self.stacks[0] - STARTING_STACK if active == 0 else STARTING_STACK - self.stacks[1]
-            return TerminalState([delta, -delta], self)
+            # the round ends where it stood, with the fold recorded like any other action
+            state = RoundState(self.button, self.street, self.pips, self.stacks, self.hands, self.deck,
+                               self.record(FOLD_CODE), self.num_actions + 1)
+            return TerminalState([delta, -delta], state)
+        num_actions = self.num_actions + 1
         if isinstance(action, CallAction):
+            history = self.record(CALL_CODE)
             if self.button == 0:  # sb calls bb
-                return RoundState(1, 0, [BIG_BLIND] * 2, [STARTING_STACK - BIG_BLIND] * 2, self.hands, self.deck, self)
+                return RoundState(1, 0, [BIG_BLIND] * 2, [STARTING_STACK - BIG_BLIND] * 2,
+                                  self.hands, self.deck, history, num_actions)
             # both players acted
             new_pips = list(self.pips)
             new_stacks = list(self.stacks)
             contribution = new_pips[1-active] - new_pips[active]
             new_stacks[active] -= contribution
             new_pips[active] += contribution
-            state = RoundState(self.button + 1, self.street, new_pips, new_stacks, self.hands, self.deck, self)
+            state = RoundState(self.button + 1, self.street, new_pips, new_stacks, self.hands, self.deck, history, num_actions)
             return state.proceed_street()
         if isinstance(action, CheckAction):
+            history = self.record(CHECK_CODE)
+            state = RoundState(self.button + 1, self.street, self.pips, self.stacks, self.hands, self.deck, history, num_actions)
             if (self.street == 0 and self.button > 0) or self.button > 1:  # both players acted
-                return self.proceed_street()
+                return state.proceed_street()
             # let opponent act
-            return RoundState(self.button + 1, self.street, self.pips, self.stacks, self.hands, self.deck, self)
+            return state
         # isinstance(action, RaiseAction)
+        history = self.record(action.amount)
         new_pips = list(self.pips)
         new_stacks = list(self.stacks)
         contribution = action.amount - new_pips[active]
         new_stacks[active] -= contribution
         new_pips[active] += contribution
-        return RoundState(self.button + 1, self.street, new_pips, new_stacks, self.hands, self.deck, self)
+        return RoundState(self.button + 1, self.street, new_pips, new_stacks, self.hands, self.deck, history, num_actions)
+
+
+class BotLog():
+    '''
+    Streams a pokerbot's output to its log file as it arrives, up to PLAYER_LOG_SIZE_LIMIT bytes.
+    Later output is discarded, except for the last PLAYER_LOG_TAIL_SIZE bytes which are
+    appended when the log is closed, so that crash tracebacks are kept.
+    '''
+
+    def __init__(self, name):
+        self.log_file = open(name, 'wb')
+        self.bytes_written = 0
+        self.bytes_dropped = 0
+        self.tail = bytearray()
+        self.lock = Lock()
+
+    def write(self, data):
+        '''
+        Adds output to the log. Safe to call from the bot listening thread.
+        '''
+        with self.lock:
+            if self.log_file is None:
+                return
+            room = PLAYER_LOG_SIZE_LIMIT - self.bytes_written
+            if room > 0:
+                self.bytes_written += self.log_file.write(data[:room])
+                data = data[room:]
+            if data:
+                self.bytes_dropped += len(data)
+                if PLAYER_LOG_TAIL_SIZE > 0:  # data[-0:] would be all of it
+                    self.tail += data[-PLAYER_LOG_TAIL_SIZE:]
+                    del self.tail[:max(0, len(self.tail) - PLAYER_LOG_TAIL_SIZE)]
+
+    def close(self):
+        '''
+        Appends the tail of any discarded output and closes the log.
+        '''
+        with self.lock:
+            if self.log_file is None:
+                return
+            if self.bytes_dropped > 0:
+                omitted = self.bytes_dropped - len(self.tail)
+                self.log_file.write('\n[{} bytes omitted]\n'.format(omitted).encode())
+                self.log_file.write(self.tail)
+            self.log_file.close()
+            self.log_file = None
 
 
 class Player():
@@ -152,7 +299,7 @@ class Player():
     Handles subprocess and socket interactions with one player's pokerbot.
     '''
 
-    def __init__(self, name, path):
+    def __init__(self, name, path, output_dir=''):
         self.name = name
         self.path = path
         self.game_clock = STARTING_GAME_CLOCK
@@ -160,18 +307,26 @@ class Player():
         self.commands = None
         self.bot_subprocess = None
         self.socketfile = None
-        self.bytes_queue = Queue()
+        self.binary = False
+        self.pending_acks = 0
+        self.deferred = []
+        self.bot_log = BotLog(os.path.join(output_dir, name + '.txt'))
+        self.latencies = LatencyLog()
+        self.output_thread = None
+        # the seat the player sits in this round
+        self.seat = 0
 
-    def build(self):
+    def load_commands(self):
         '''
-        Loads the commands file and builds the pokerbot.
+        Loads the commands file.
         '''
         try:
             with open(self.path + '/commands.json', 'r') as json_file:
                 commands = json.load(json_file)
             if ('build' in commands and 'run' in commands and
                     isinstance(commands['build'], list) and
-                    isinstance(commands['run'], list)):
+                    isinstance(commands['run'], list) and
+                    isinstance(commands.get('transports', []), list)):
                 self.commands = commands
             else:
                 print(self.name, 'commands.json missing command')
@@ -179,60 +334,156 @@ class Player():
             print(self.name, 'commands.json not found - check PLAYER_PATH')
         except json.decoder.JSONDecodeError:
             print(self.name, 'commands.json misformatted')
+
+    def build(self):
+        '''
+        Loads the commands file and builds the pokerbot.
+        '''
+        self.load_commands()
         if self.commands is not None and len(self.commands['build']) > 0:
+            cache = None
+            if BUILD_CACHE_PATH is not None:
+                cache = BuildCache(BUILD_CACHE_PATH)
+                try:
+                    files, build = cache.lookup(self.path)
+                    log = None if build is None else cache.restore(self.path, build)
+                    if log is not None:
+                        print(self.name, 'build restored from cache')
+                        self.bot_log.write(log)
+                        return
+                except OSError:
+                    cache = None
             try:
                 proc = subprocess.run(self.commands['build'],
                                       stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
                                       cwd=self.path, timeout=BUILD_TIMEOUT, check=False)
-                self.bytes_queue.put(proc.stdout)
+                self.bot_log.write(proc.stdout)
+                if cache is not None and proc.returncode == 0:
+                    try:
+                        cache.save(self.path, files, proc.stdout)
+                    except OSError:
+                        print(self.name, 'build could not be cached')
             except subprocess.TimeoutExpired as timeout_expired:
                 error_message = 'Timed out waiting for ' + self.name + ' to build'
                 print(error_message)
-                self.bytes_queue.put(timeout_expired.stdout)
-                self.bytes_queue.put(error_message.encode())
+                self.bot_log.write(timeout_expired.stdout or b'')
+                self.bot_log.write(error_message.encode())
             except (TypeError, ValueError):
                 print(self.name, 'build command misformatted')
             except OSError:
                 print(self.name, 'build failed - check "build" in commands.json')
 
+    def start(self, args, pass_fds=()):
+        '''
+        Starts the pokerbot with its connection arguments and drains its output into the bot log.
+        '''
+        proc = subprocess.Popen(self.commands['run'] + args,
+                                stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                cwd=self.path, pass_fds=pass_fds)
+        self.bot_subprocess = proc
+        # function for bot listening, which keeps draining the pipe so the bot never blocks
+        # the bot log is looked up on each write, since a warm pokerbot moves on to another game's log
+        def stream_output(out, player):
+            try:
+                for data in iter(lambda: out.read1(65536), b''):
+                    player.bot_log.write(data)
+            except (ValueError, OSError):
+                pass
+        # start a separate bot listening thread which dies with the program
+        self.output_thread = Thread(target=stream_output, args=(proc.stdout, self), daemon=True)
+        self.output_thread.start()
+
+    def negotiate(self, sock):
+        '''
+        Opens the socket file, first offering the binary protocol if BOT_PROTOCOL is 'binary'.
+        Bots which do not know the offer acknowledge it with a check and keep the text protocol.
+        '''
+        socketfile = sock.makefile('rw')
+        if BOT_PROTOCOL == 'binary':
+            socketfile.write(PROTOCOL_OFFER + '\n')
+            socketfile.flush()
+            if socketfile.readline().strip() == PROTOCOL_OFFER:
+                socketfile.close()
+                self.binary = True
+                return sock.makefile('rwb')
+        return socketfile
+
+    def connect_socketpair(self):
+        '''
+        Hands the pokerbot one end of a connected socket pair as an inherited file descriptor.
+        '''
+        engine_socket, bot_socket = socket.socketpair()
+        with engine_socket, bot_socket:
+            self.start(['--fd', str(bot_socket.fileno())], pass_fds=(bot_socket.fileno(),))
+            engine_socket.settimeout(CONNECT_TIMEOUT)
+            self.socketfile = self.negotiate(engine_socket)
+        print(self.name, 'connected successfully')
+
+    def connect_server(self, transport):
+        '''
+        Listens on a loopback TCP port or a Unix domain socket until the pokerbot connects.
+        '''
+        socket_dir = None
+        try:
+            if transport == 'unix':
+                socket_dir = tempfile.mkdtemp(prefix='pokerbots')
+                address = os.path.join(socket_dir, 'engine.sock')
+                server_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            else:
+                address = ('', 0)
+                server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            with server_socket:
+                server_socket.bind(address)
+                server_socket.settimeout(CONNECT_TIMEOUT)
+                server_socket.listen()
+                if transport == 'unix':
+                    self.start(['--unix', address])
+                else:
+                    self.start([str(server_socket.getsockname()[1])])
+                # block until we timeout or the player connects
+                client_socket, _ = server_socket.accept()
+                with client_socket:
+                    client_socket.settimeout(CONNECT_TIMEOUT)
+                    if transport != 'unix':
+                        # messages may be written back to back, which Nagle's algorithm would delay
+                        client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                    self.socketfile = self.negotiate(client_socket)
+                    print(self.name, 'connected successfully')
+        finally:
+            if socket_dir is not None:
+                shutil.rmtree(socket_dir, ignore_errors=True)
+
+    def transport(self):
+        '''
+        Returns BOT_TRANSPORT, or 'tcp' if the platform or the pokerbot does not support it.
+        '''
+        transport = BOT_TRANSPORT
+        if transport in ('unix', 'socketpair') and not hasattr(socket, 'AF_UNIX'):
+            print(transport, 'transport is not supported on this platform, using tcp')
+            transport = 'tcp'
+        # commands.json may list the transports the pokerbot accepts, e.g. the Java skeleton only takes tcp
+        if transport not in self.commands.get('transports', [transport]):
+            print(self.name, 'does not support the', transport, 'transport, using tcp')
+            transport = 'tcp'
+        return transport
+
     def run(self):
         '''
-        Runs the pokerbot and establishes the socket connection.
+        Runs the pokerbot and establishes the socket connection over BOT_TRANSPORT.
         '''
         if self.commands is not None and len(self.commands['run']) > 0:
+            transport = self.transport()
             try:
-                server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                with server_socket:
-                    server_socket.bind(('', 0))
-                    server_socket.settimeout(CONNECT_TIMEOUT)
-                    server_socket.listen()
-                    port = server_socket.getsockname()[1]
-                    proc = subprocess.Popen(self.commands['run'] + [str(port)],
-                                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
-                                            cwd=self.path)
-                    self.bot_subprocess = proc
-                    # function for bot listening
-                    def enqueue_output(out, queue):
-                        try:
-                            for line in out:
-                                queue.put(line)
-                        except ValueError:
-                            pass
-                    # start a separate bot listening thread which dies with the program
-                    Thread(target=enqueue_output, args=(proc.stdout, self.bytes_queue), daemon=True).start()
-                    # block until we timeout or the player connects
-                    client_socket, _ = server_socket.accept()
-                    with client_socket:
-                        client_socket.settimeout(CONNECT_TIMEOUT)
-                        sock = client_socket.makefile('rw')
-                        self.socketfile = sock
-                        print(self.name, 'connected successfully')
+                if transport == 'socketpair':
+                    self.connect_socketpair()
+                else:
+                    self.connect_server(transport)
             except (TypeError, ValueError):
                 print(self.name, 'run command misformatted')
-            except OSError:
-                print(self.name, 'run failed - check "run" in commands.json')
             except socket.timeout:
                 print('Timed out waiting for', self.name, 'to connect')
+            except OSError:
+                print(self.name, 'run failed - check "run" in commands.json')
 
     def stop(self):
         '''
@@ -240,7 +491,18 @@ class Player():
         '''
         if self.socketfile is not None:
             try:
-                self.socketfile.write('Q\n')
+                # closing before the pokerbot acks the last pushed round would break its pipe
+                while self.pending_acks:
+                    self.receive()
+                    self.pending_acks -= 1
+                if self.deferred:
+                    # deliver the end of the last round along with the quit clause
+                    if self.binary:
+                        self.socketfile.write(self.encode([b''] + self.deferred + [b'Q']))
+                    else:
+                        self.socketfile.write(self.encode(['T0.'] + self.deferred + ['Q']))
+                else:
+                    self.socketfile.write(BINARY_QUIT if self.binary else 'Q\n')
                 self.socketfile.close()
             except socket.timeout:
                 print('Timed out waiting for', self.name, 'to disconnect')
@@ -248,22 +510,105 @@ class Player():
                 print('Could not close socket connection with', self.name)
         if self.bot_subprocess is not None:
             try:
-                outs, _ = self.bot_subprocess.communicate(timeout=CONNECT_TIMEOUT)
-                self.bytes_queue.put(outs)
+                self.bot_subprocess.wait(timeout=CONNECT_TIMEOUT)
             except subprocess.TimeoutExpired:
                 print('Timed out waiting for', self.name, 'to quit')
                 self.bot_subprocess.kill()
-                outs, _ = self.bot_subprocess.communicate()
-                self.bytes_queue.put(outs)
-        with open(self.name + '.txt', 'wb') as log_file:
-            bytes_written = 0
-            for output in self.bytes_queue.queue:
-                try:
-                    bytes_written += log_file.write(output)
-                    if bytes_written >= PLAYER_LOG_SIZE_LIMIT:
-                        break
-                except TypeError:
-                    pass
+                self.bot_subprocess.wait()
+        if self.output_thread is not None:
+            # the pipe may be held open by processes the bot started
+            self.output_thread.join(timeout=CONNECT_TIMEOUT)
+        self.bot_log.close()
+
+    def finish(self):
+        '''
+        Ends the game without stopping the pokerbot, sending the new game clause along with
+        the end of the last round if it was held back. Its ack is read by reset.
+        '''
+        try:
+            if self.binary:
+                self.send(self.encode([b''] + self.deferred + [NEW_GAME.encode()]))
+            else:
+                self.send(self.encode(['T0.'] + self.deferred + [NEW_GAME]))
+        except OSError:
+            return False
+        self.deferred = []
+        self.pending_acks += 1
+        return True
+
+    def reset(self, output_dir):
+        '''
+        Starts a new game with a finished pokerbot, logging to output_dir, and returns whether it acked.
+        '''
+        clause = None
+        try:
+            while self.pending_acks:
+                clause = self.receive()
+                self.pending_acks -= 1
+        except OSError:
+            return False
+        if clause != NEW_GAME:
+            return False
+        self.game_clock = STARTING_GAME_CLOCK
+        self.bankroll = 0
+        self.latencies = LatencyLog()
+        self.bot_log.close()
+        self.bot_log = BotLog(os.path.join(output_dir, self.name + '.txt'))
+        return True
+
+    def encode(self, player_message):
+        '''
+        Stamps the game clock on a player message and encodes it for the socket.
+        '''
+        if self.binary:
+            payload = b''.join(player_message)
+            message = MESSAGE_HEADER.pack(len(payload) + CLOCK_SIZE, b'T', int(self.game_clock * 1000 + 0.5)) + payload
+        else:
+            player_message[0] = 'T{:.3f}'.format(self.game_clock)
+            message = ' '.join(player_message) + '\n'
+        del player_message[1:]  # do not send redundant action history
+        return message
+
+    def send(self, message):
+        '''
+        Writes an encoded message to the socket.
+        '''
+        self.socketfile.write(message)
+        self.socketfile.flush()
+
+    def receive(self):
+        '''
+        Blocks until the pokerbot responds and returns its response clause.
+        '''
+        if self.binary:
+            response = self.socketfile.read(RESPONSE.size)
+            if len(response) < RESPONSE.size:
+                return ''
+            code, amount = RESPONSE.unpack(response)
+            code = code.decode('latin-1')
+            return code + str(amount) if code == 'R' else code
+        return self.socketfile.readline().strip()
+
+    def decode(self, clause, round_state, legal_actions, game_log):
+        '''
+        Decodes a response clause into an action, or returns None if the action is illegal.
+        '''
+        return self.validate(DECODE[clause[0]], clause[1:], round_state, legal_actions, game_log)
+
+    def validate(self, action, amount, round_state, legal_actions, game_log):
+        '''
+        Returns the action, raising to amount if it is a RaiseAction, or None if it is illegal.
+        '''
+        if action in legal_actions:
+            if action is RaiseAction:
+                amount = int(amount)
+                min_raise, max_raise = round_state.raise_bounds()
+                if min_raise <= amount <= max_raise:
+                    return action(amount)
+            else:
+                return action()
+        game_log.append(self.name + ' attempted illegal ' + action.__name__)
+        return None
 
     def query(self, round_state, player_message, game_log):
         '''
@@ -273,28 +618,24 @@ class Player():
         legal_actions = round_state.legal_actions() if isinstance(round_state, RoundState) else {CheckAction}
         if self.socketfile is not None and self.game_clock > 0.:
             try:
-                player_message[0] = 'T{:.3f}'.format(self.game_clock)
-                message = ' '.join(player_message) + '\n'
-                del player_message[1:]  # do not send redundant action history
+                message = self.encode(player_message)
                 start_time = time.perf_counter()
-                self.socketfile.write(message)
-                self.socketfile.flush()
-                clause = self.socketfile.readline().strip()
+                self.send(message)
+                # acks of pushed round endings arrive ahead of the response
+                while self.pending_acks:
+                    self.receive()
+                    self.pending_acks -= 1
+                clause = self.receive()
                 end_time = time.perf_counter()
+                street = round_state.street if isinstance(round_state, RoundState) else 'round_over'
+                self.latencies.record(street, DECODE.get(clause[:1], InvalidAction).__name__, end_time - start_time)
                 if ENFORCE_GAME_CLOCK:
                     self.game_clock -= end_time - start_time
                 if self.game_clock <= 0.:
                     raise socket.timeout
-                action = DECODE[clause[0]]
-                if action in legal_actions:
-                    if clause[0] == 'R':
-                        amount = int(clause[1:])
-                        min_raise, max_raise = round_state.raise_bounds()
-                        if min_raise <= amount <= max_raise:
-                            return action(amount)
-                    else:
-                        return action()
-                game_log.append(self.name + ' attempted illegal ' + action.__name__)
+                action = self.decode(clause, round_state, legal_actions, game_log)
+                if action is not None:
+                    return action
             except socket.timeout:
                 error_message = self.name + ' ran out of time'
                 game_log.append(error_message)
@@ -309,27 +650,91 @@ class Player():
                 game_log.append(self.name + ' response misformatted')
         return CheckAction() if CheckAction in legal_actions else FoldAction()
 
+    def push(self, player_message, game_log):
+        '''
+        Sends the end of the round to the pokerbot without waiting for its ack,
+        which is read before the pokerbot's next response.
+        '''
+        if self.socketfile is not None and self.game_clock > 0.:
+            try:
+                self.send(self.encode(player_message))
+                self.pending_acks += 1
+            except OSError:
+                error_message = self.name + ' disconnected'
+                game_log.append(error_message)
+                print(error_message)
+                self.game_clock = 0.
+
+    def defer(self, player_message):
+        '''
+        Holds the end of the round back to be sent at the start of the pokerbot's next message.
+        '''
+        self.deferred = player_message[1:]
+        del player_message[1:]
+
+    def round_over(self, terminal_state, player_message, game_log):
+        '''
+        Sends the end of the round to the pokerbot as ROUND_OVER_MODE says.
+        '''
+        if ROUND_OVER_MODE == 'push':
+            self.push(player_message, game_log)
+        elif ROUND_OVER_MODE == 'piggyback':
+            self.defer(player_message)
+        else:
+            self.query(terminal_state, player_message, game_log)
+
+    def connected(self):
+        '''
+        Returns whether the pokerbot is still running.
+        '''
+        return self.socketfile is not None
+
 
 class Game():
     '''
     Manages logging and the high-level game procedure.
+    A seeded game draws its value permutation and every round's cards from its own generators,
+    so games with the same seed are dealt the same cards whatever the bots do.
+    If swap_seats is set, PLAYER_2 sits where PLAYER_1 would have and is dealt PLAYER_1's cards.
+    Pokerbots are taken from and released to bot_pool, if given, instead of being started and stopped.
     '''
 
-    def __init__(self):
-        suits = ['c', 'd', 'h', 's']
-        values = ['2', '3', '4', '5', '6', '7', '8', '9', 'T', 'J', 'Q', 'K', 'A']
-        perm = [values[i] for i in self.permute_values()]
-        # create global permutation dictionary
-        global PERM
-        PERM = {eval7.Card(values[i % 13] + suits[i // 13]) :
-                eval7.Card(perm[i % 13] + suits[i // 13])
-                for i in range(52)}
-        self.log = ['6.176 MIT Pokerbots - ' + PLAYER_1_NAME + ' vs ' + PLAYER_2_NAME,
-                    '---------------------------',
-                    ' ' + ' '.join(values) + ' ',
-                    '[' + ' '.join(perm) + ']',
-                    '---------------------------',]
+    def __init__(self, output_dir='', seed=None, swap_seats=False, bot_pool=None):
+        if seed is None:
+            self.random, self.geometric = random, geometric
+        else:
+            self.random, self.geometric = random.Random(seed), RandomState(seed).geometric
+        self.seed = seed
+        self.swap_seats = swap_seats
+        self.bot_pool = bot_pool
+        values = list(RANK_CHARS)
+        perm_indices = self.permute_values()
+        perm = [values[i] for i in perm_indices]
+        # permutation lookups by integer card
+        self.perm = permuted_cards(perm_indices)
+        self.perm_cards = [EVAL7_CARDS[card] for card in self.perm]
+        self.output_dir = output_dir
+        self.log = GameLog(os.path.join(output_dir, GAME_LOG_FILENAME + '.txt'), GAME_LOG_COMPRESSION)
+        self.log.append('6.176 MIT Pokerbots - ' + PLAYER_1_NAME + ' vs ' + PLAYER_2_NAME)
+        self.log.append('---------------------------')
+        self.log.append(' ' + ' '.join(values) + ' ')
+        self.log.append('[' + ' '.join(perm) + ']')
+        self.log.append('---------------------------')
+        self.record = None
+        if GAME_RECORD:
+            self.record = gamerecord.GameRecordWriter(os.path.join(output_dir, GAME_LOG_FILENAME + '.pbr'),
+                                                      [PLAYER_1_NAME, PLAYER_2_NAME],
+                                                      perm_indices, [SMALL_BLIND, BIG_BLIND, STARTING_STACK])
         self.player_messages = [[], []]
+        self.binary = [False, False]
+        self.straight_counts = [0, 0]
+        # PLAYER_1's bankroll change in each round, for sequential tests of which player is better
+        self.round_deltas = array('i')
+        self.player_1_bankroll = 0
+        self.deals = None
+        self.round_index = 0
+        if PREDEAL_ROUNDS:
+            self.predeal(NUM_ROUNDS)
 
     def permute_values(self):
         '''
@@ -337,12 +742,50 @@ class Game():
         '''
         orig_perm = list(range(13))[::-1]
         prop_perm = []
-        seed = geometric(p=0.25, size=13) - 1
+        seed = self.geometric(p=0.25, size=13) - 1
         for s in seed:
             pop_i = len(orig_perm) - 1 - (s % len(orig_perm))
             prop_perm.append(orig_perm.pop(pop_i))
         return prop_perm
 
+    def predeal(self, num_rounds):
+        '''
+        Deals the cards of every round in advance and evaluates all showdowns in one pass.
+        Cards are stored as bytes, and the permuted scores of both players' hands,
+        along with whether each is a straight, are stored per round.
+        '''
+        self.deals = bytearray()
+        self.scores = array('i')
+        self.straights = bytearray()
+        for _ in range(num_rounds):
+            # same shuffle as eval7.Deck.shuffle, so the cards dealt match a live deck
+            deck = bytearray(range(52))
+            self.random.shuffle(deck)
+            dealt = deck[:9]
+            self.deals += dealt
+            board = [self.perm_cards[card] for card in dealt[4:]]
+            for hand in (dealt[0:2], dealt[2:4]):
+                score = eval7.evaluate(board + [self.perm_cards[card] for card in hand])
+                self.scores.append(score)
+                self.straights.append(eval7.hand_type(score) == 'Straight')
+
+    def deal(self):
+        '''
+        Returns the hands and deck of the next round, which may have been dealt in advance.
+        '''
+        if self.deals is None:
+            # same shuffle as eval7.Deck.shuffle
+            dealt = list(range(52))
+            self.random.shuffle(dealt)
+            return [dealt[0:2], dealt[2:4]], Deck(dealt[4:9], self.perm_cards, self.straight_counts)
+        i = self.round_index
+        self.round_index += 1
+        dealt = list(self.deals[9*i:9*i+9])
+        hands = [dealt[0:2], dealt[2:4]]
+        deck = Deck(dealt[4:], self.perm_cards, self.straight_counts,
+                    self.scores[2*i:2*i+2], self.straights[2*i:2*i+2])
+        return hands, deck
+
     def log_round_state(self, players, round_state):
         '''
         Incorporates RoundState information into the game log and player messages.
@@ -350,18 +793,29 @@ class Game():
         if round_state.street == 0 and round_state.button == 0:
             self.log.append('{} posts the blind of {}'.format(players[0].name, SMALL_BLIND))
             self.log.append('{} posts the blind of {}'.format(players[1].name, BIG_BLIND))
-            self.log.append('{} dealt {}'.format(players[0].name, PCARDS(round_state.hands[0])))
-            self.log.append('{} dealt {}'.format(players[1].name, PCARDS(round_state.hands[1])))
-            self.player_messages[0] = ['T0.', 'P0', 'H' + CCARDS(round_state.hands[0])]
-            self.player_messages[1] = ['T0.', 'P1', 'H' + CCARDS(round_state.hands[1])]
+            self.log.append('{} dealt {}'.format(players[0].name, PCARDS(round_state.hands[0], self.perm)))
+            self.log.append('{} dealt {}'.format(players[1].name, PCARDS(round_state.hands[1], self.perm)))
+            for seat in (0, 1):
+                # the end of the previous round may have been held back for this message
+                deferred = players[seat].deferred
+                players[seat].deferred = []
+                if self.binary[seat]:
+                    self.player_messages[seat] = [b''] + deferred + [b'P' + bytes([seat]),
+                                                                     b'H' + bytes(round_state.hands[seat])]
+                else:
+                    self.player_messages[seat] = ['T0.'] + deferred + ['P' + str(seat),
+                                                                       'H' + CCARDS(round_state.hands[seat])]
+            if self.record is not None:
+                self.record.deal(round_state.hands, round_state.deck.peek(5))
         elif round_state.street > 0 and round_state.button == 1:
             board = round_state.deck.peek(round_state.street)
-            self.log.append(STREET_NAMES[round_state.street - 3] + ' ' + PCARDS(board) +
+            self.log.append(STREET_NAMES[round_state.street - 3] + ' ' + PCARDS(board, self.perm) +
                             PVALUE(players[0].name, STARTING_STACK-round_state.stacks[0]) +
                             PVALUE(players[1].name, STARTING_STACK-round_state.stacks[1]))
-            compressed_board = 'B' + CCARDS(board)
-            self.player_messages[0].append(compressed_board)
-            self.player_messages[1].append(compressed_board)
+            if self.record is not None:
+                self.record.street(round_state.street, [STARTING_STACK-round_state.stacks[0],
+                                                        STARTING_STACK-round_state.stacks[1]])
+            self.append_clause('B' + CCARDS(board), b'B' + bytes([len(board)] + board))
 
     def log_action(self, name, action, bet_override):
         '''
@@ -370,18 +824,23 @@ class Game():
         if isinstance(action, FoldAction):
             phrasing = ' folds'
             code = 'F'
+            binary_code = b'F'
         elif isinstance(action, CallAction):
             phrasing = ' calls'
             code = 'C'
+            binary_code = b'C'
         elif isinstance(action, CheckAction):
             phrasing = ' checks'
             code = 'K'
+            binary_code = b'K'
         else:  # isinstance(action, RaiseAction)
             phrasing = (' bets ' if bet_override else ' raises to ') + str(action.amount)
             code = 'R' + str(action.amount)
+            binary_code = RAISE_CLAUSE.pack(b'R', action.amount)
         self.log.append(name + phrasing)
-        self.player_messages[0].append(code)
-        self.player_messages[1].append(code)
+        if self.record is not None:
+            self.record.action(name, code, bet_override)
+        self.append_clause(code, binary_code)
 
     def log_terminal_state(self, players, round_state):
         '''
@@ -389,74 +848,255 @@ class Game():
         '''
         previous_state = round_state.previous_state
         if FoldAction not in previous_state.legal_actions():
-            self.log.append('{} shows {}'.format(players[0].name, PCARDS(previous_state.hands[0])))
-            self.log.append('{} shows {}'.format(players[1].name, PCARDS(previous_state.hands[1])))
-            self.player_messages[0].append('O' + CCARDS(previous_state.hands[1]))
-            self.player_messages[1].append('O' + CCARDS(previous_state.hands[0]))
+            self.log.append('{} shows {}'.format(players[0].name, PCARDS(previous_state.hands[0], self.perm)))
+            self.log.append('{} shows {}'.format(players[1].name, PCARDS(previous_state.hands[1], self.perm)))
+            if self.record is not None:
+                self.record.show()
+            for seat in (0, 1):
+                if self.binary[seat]:
+                    self.player_messages[seat].append(b'O' + bytes(previous_state.hands[1-seat]))
+                else:
+                    self.player_messages[seat].append('O' + CCARDS(previous_state.hands[1-seat]))
         self.log.append('{} awarded {}'.format(players[0].name, round_state.deltas[0]))
         self.log.append('{} awarded {}'.format(players[1].name, round_state.deltas[1]))
-        self.player_messages[0].append('D' + str(round_state.deltas[0]))
-        self.player_messages[1].append('D' + str(round_state.deltas[1]))
+        if self.record is not None:
+            self.record.award(round_state.deltas)
+        for seat in (0, 1):
+            if self.binary[seat]:
+                self.player_messages[seat].append(DELTA_CLAUSE.pack(b'D', round_state.deltas[seat]))
+            else:
+                self.player_messages[seat].append('D' + str(round_state.deltas[seat]))
 
-    def run_round(self, players):
+    def append_clause(self, clause, binary_clause):
         '''
-        Runs one round of poker.
+        Appends a clause sent to both players, in the protocol each player negotiated.
+        '''
+        for message, binary in zip(self.player_messages, self.binary):
+            message.append(binary_clause if binary else clause)
+
+    def start_round(self, players):
         '''
-        deck = eval7.Deck()
-        deck.shuffle()
-        hands = [deck.deal(2), deck.deal(2)]
+        Deals a round and returns its first state along with the log which player errors are noted in.
+        '''
+        hands, deck = self.deal()
+        for seat, player in enumerate(players):
+            player.seat = seat
+        self.binary = [player.binary for player in players]
         pips = [SMALL_BLIND, BIG_BLIND]
         stacks = [STARTING_STACK - SMALL_BLIND, STARTING_STACK - BIG_BLIND]
-        round_state = RoundState(0, 0, pips, stacks, hands, deck, None)
+        round_state = RoundState(0, 0, pips, stacks, hands, deck, array('h'), 0)
+        game_log = self.log if self.record is None else gamerecord.NoteLog(self.log, self.record)
+        return round_state, game_log
+
+    def apply_action(self, name, round_state, action):
+        '''
+        Logs the action of the active player and returns the next state.
+        '''
+        bet_override = (round_state.pips == [0, 0])
+        self.log_action(name, action, bet_override)
+        return round_state.proceed(action)
+
+    def run_round(self, players):
+        '''
+        Runs one round of poker.
+        '''
+        round_state, game_log = self.start_round(players)
         while not isinstance(round_state, TerminalState):
             self.log_round_state(players, round_state)
             active = round_state.button % 2
             player = players[active]
-            action = player.query(round_state, self.player_messages[active], self.log)
-            bet_override = (round_state.pips == [0, 0])
-            self.log_action(player.name, action, bet_override)
-            round_state = round_state.proceed(action)
+            action = player.query(round_state, self.player_messages[active], game_log)
+            round_state = self.apply_action(player.name, round_state, action)
         self.log_terminal_state(players, round_state)
         for player, player_message, delta in zip(players, self.player_messages, round_state.deltas):
-            player.query(round_state, player_message, self.log)
+            player.round_over(round_state, player_message, game_log)
             player.bankroll += delta
+        if self.record is not None:
+            self.record.end_round()
 
-    def run(self):
+    def print_banner(self):
         '''
-        Runs one game of poker.
+        Prints the engine banner.
         '''
-
-        global STRAIGHTS
         print('   __  _____________  ___       __           __        __    ')
         print('  /  |/  /  _/_  __/ / _ \\___  / /_____ ____/ /  ___  / /____')
         print(' / /|_/ // /  / /   / ___/ _ \\/  \'_/ -_) __/ _ \\/ _ \\/ __(_-<')
         print('/_/  /_/___/ /_/   /_/   \\___/_/\\_\\\\__/_/ /_.__/\\___/\\__/___/')
         print()
         print('Starting the Pokerbots engine...')
+
+    def bots(self):
+        '''
+        Returns the name and path of each pokerbot, PLAYER_1 first.
+        '''
+        return [(PLAYER_1_NAME, PLAYER_1_PATH), (PLAYER_2_NAME, PLAYER_2_PATH)]
+
+    def new_players(self, player_class=Player, local_class=None, warm_players=None):
+        '''
+        Returns the players in their seats for the first round, reusing any warm players keyed by name.
+        Players set to run in-process are local_class, which defaults to LocalPlayer.
+        '''
+        if local_class is None:
+            # localplayer subclasses Player, so it is only imported once the engine is
+            from localplayer import LocalPlayer as local_class
+        warm_players = warm_players or {}
         players = [
-            Player(PLAYER_1_NAME, PLAYER_1_PATH),
-            Player(PLAYER_2_NAME, PLAYER_2_PATH)
+            warm_players.get(PLAYER_1_NAME) or
+            (local_class if PLAYER_1_IN_PROCESS else player_class)(PLAYER_1_NAME, PLAYER_1_PATH, self.output_dir),
+            warm_players.get(PLAYER_2_NAME) or
+            (local_class if PLAYER_2_IN_PROCESS else player_class)(PLAYER_2_NAME, PLAYER_2_PATH, self.output_dir)
         ]
-        for player in players:
-            player.build()
-            player.run()
-        for round_num in range(1, NUM_ROUNDS + 1):
-            self.log.append('')
-            self.log.append('Round #' + str(round_num) + STATUS(players))
-            self.run_round(players)
-            players = players[::-1]
-            STRAIGHTS = STRAIGHTS[::-1]
+        return players[::-1] if self.swap_seats else players
+
+    def begin_round(self, players, round_num):
+        '''
+        Logs the start of a round.
+        '''
         self.log.append('')
-        self.log.append('Straights ' + str(STRAIGHTS[0]) + ' ' + str(STRAIGHTS[1]))
+        self.log.append('Round #' + str(round_num) + STATUS(players))
+        if self.record is not None:
+            self.record.begin_round(round_num, [p.name for p in players], [p.bankroll for p in players])
+
+    def end_round(self, players, round_num):
+        '''
+        Flushes the logs every GAME_LOG_FLUSH_ROUNDS rounds and returns the players in the next round's seats.
+        '''
+        if round_num % GAME_LOG_FLUSH_ROUNDS == 0:
+            self.log.flush()
+            if self.record is not None:
+                self.record.flush()
+        bankroll = players[0].bankroll if players[0].name == PLAYER_1_NAME else players[1].bankroll
+        self.round_deltas.append(bankroll - self.player_1_bankroll)
+        self.player_1_bankroll = bankroll
+        self.straight_counts = self.straight_counts[::-1]
+        return players[::-1]
+
+    def log_final(self, players):
+        '''
+        Logs the straight counts and final bankrolls.
+        '''
+        self.log.append('')
+        self.log.append('Straights ' + str(self.straight_counts[0]) + ' ' + str(self.straight_counts[1]))
         self.log.append('')
         self.log.append('Final' + STATUS(players))
+
+    def close(self, players):
+        '''
+        Writes the game log, latency report and game record, and returns the final bankrolls keyed by player name.
+        '''
+        print('Writing', self.log.name)
+        self.log.close()
+        if LATENCY_REPORT:
+            name = os.path.join(self.output_dir, GAME_LOG_FILENAME + '_latency.json')
+            print('Writing', name)
+            with open(name, 'w') as report_file:
+                json.dump({
+                    'units': 'ms',
+                    'histogram_bins': LatencyLog.BINS,
+                    'players': {player.name: dict(player.latencies.report(),
+                                                  game_clock_remaining=player.game_clock)
+                                for player in players},
+                }, report_file, indent=2)
+        if self.record is not None:
+            print('Writing', self.record.name)
+            self.record.close(self.straight_counts, [p.name for p in players], [p.bankroll for p in players])
+        return {player.name: player.bankroll for player in players}
+
+    def run(self, build=True):
+        '''
+        Runs one game of poker and returns the final bankrolls keyed by player name.
+        The pokerbots are assumed to be built already if build is False.
+        '''
+        self.print_banner()
+        warm_players = {}
+        if self.bot_pool is not None:
+            warm_players = self.bot_pool.take(self.output_dir, self.bots())
+        players = self.new_players(warm_players=warm_players)
         for player in players:
-            player.stop()
-        name = GAME_LOG_FILENAME + '.txt'
-        print('Writing', name)
-        with open(name, 'w') as log_file:
-            log_file.write('\n'.join(self.log))
+            if player.name in warm_players:
+                print(player.name, 'reused from the last game')
+                continue
+            if build:
+                player.build()
+            else:
+                player.load_commands()
+            player.run()
+        for round_num in range(1, NUM_ROUNDS + 1):
+            self.begin_round(players, round_num)
+            self.run_round(players)
+            players = self.end_round(players, round_num)
+        self.log_final(players)
+        if self.bot_pool is not None:
+            self.bot_pool.release(players)
+        else:
+            for player in players:
+                player.stop()
+        return self.close(players)
+
+
+def play_duplicate(output_dir='', seed=None, build=True, bot_pool=None):
+    '''
+    Plays a game, then replays its cards with the players' seats swapped in the SWAPPED_DIR subdirectory,
+    so that the luck of the cards cancels. Returns each player's net bankroll over both games,
+    along with PLAYER_1's net bankroll change in each round over both seatings.
+    Both games share bot_pool, or a pool of their own if WARM_BOTS is set.
+    '''
+    if seed is None:
+        seed = random.randrange(SEED_RANGE)
+    if bot_pool is None and WARM_BOTS:
+        with contextlib.closing(BotPool()) as bot_pool:
+            return play_duplicate(output_dir, seed, build, bot_pool)
+    print('Duplicate match with seed', seed)
+    game = Game(output_dir, seed, bot_pool=bot_pool)
+    bankrolls = game.run(build=build)
+    swapped_dir = os.path.join(output_dir, SWAPPED_DIR)
+    os.makedirs(swapped_dir, exist_ok=True)
+    swapped_game = Game(swapped_dir, seed, swap_seats=True, bot_pool=bot_pool)
+    swapped_bankrolls = swapped_game.run(build=False)
+    net = {name: bankrolls[name] + swapped_bankrolls[name] for name in bankrolls}
+    print('Duplicate net' + ''.join(PVALUE(name, net[name]) for name in (PLAYER_1_NAME, PLAYER_2_NAME)))
+    return net, array('i', map(sum, zip(game.round_deltas, swapped_game.round_deltas)))
+
+
+def parse_args():
+    '''
+    Parses engine arguments. The game itself is configured in config.py.
+    '''
+    parser = argparse.ArgumentParser(prog='python3 engine.py')
+    parser.add_argument('--profile', action='store_true',
+                        help='Time each phase of the engine and print a breakdown at the end')
+    parser.add_argument('--profile-output', type=str, default=None,
+                        help='Also run under cProfile and dump pstats to this file')
+    parser.add_argument('--seed', type=int, default=GAME_SEED,
+                        help='Seed fixing the value permutation and every round\'s cards, defaults to GAME_SEED')
+    parser.add_argument('--duplicate', action='store_true', default=DUPLICATE_MATCH,
+                        help='Replay the game\'s cards with the seats swapped and report the net result')
+    return parser.parse_args()
+
+
+def main(args):
+    '''
+    Plays one game, or a duplicate match if args.duplicate is set.
+    '''
+    if args.duplicate:
+        return play_duplicate(seed=args.seed)
+    return Game(seed=args.seed).run()
 
 
 if __name__ == '__main__':
-    Game().run()
+    # the modules split out of the engine import it by name, so the game is played in that module
+    import engine
+    from profiler import PhaseProfiler
+    ARGS = engine.parse_args()
+    PROFILER = None
+    if ARGS.profile:
+        PROFILER = PhaseProfiler()
+        PROFILER.instrument_engine()
+    START_TIME = time.perf_counter()
+    if ARGS.profile_output is not None:
+        cProfile.run('engine.main(ARGS)', ARGS.profile_output)
+        print('Writing', ARGS.profile_output)
+    else:
+        engine.main(ARGS)
+    if PROFILER is not None:
+        PROFILER.print_breakdown(time.perf_counter() - START_TIME)
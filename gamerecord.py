@@ -0,0 +1,377 @@
+'''
+6.176 MIT POKERBOTS BINARY GAME RECORD
+Compact structured record of a game, written alongside the text game log,
+with an index for random access to any round.
+'''
+from collections import namedtuple
+from array import array
+import argparse
+import struct
+import sys
+from cards import RANK_CHARS, SUIT_CHARS, CARD_STRINGS
+
+# Record layout (little-endian):
+#
+# header   magic 'PBGR', version, both player names, value permutation,
+#          small blind, big blind, starting stack
+# rounds   u32 payload size followed by the payload:
+#          round number, player index in seat 0, seat bankrolls, seat deltas,
+#          hands (4 cards), board (5 cards), event count, events
+# index    u64 file offset of every round
+# notes    lines the engine added to the game log after the last round,
+#          each a u16 length followed by the line
+# footer   straights, player index in seat 0, seat bankrolls at the end,
+#          round count, index offset, magic 'PBGI'
+#
+# Cards are the integer cards of cards.py.
+# Events follow the order of the text log lines of the round.
+
+MAGIC = b'PBGR'
+INDEX_MAGIC = b'PBGI'
+VERSION = 1
+STREET_NAMES = ['Flop', 'Turn', 'River']
+
+HEADER = struct.Struct('<4sB')
+BLINDS = struct.Struct('<HHH')
+SIZE = struct.Struct('<I')
+ROUND = struct.Struct('<IBiiii4s5sH')
+FOOTER = struct.Struct('<iiBiiIQ4s')
+ACTION_EVENT = struct.Struct('<BBH')
+STREET_EVENT = struct.Struct('<BHH')
+NOTE_EVENT = struct.Struct('<H')
+
+# event types
+ACTION = 0
+STREET = 1
+SHOW = 2
+AWARD = 3
+NOTE = 4
+
+# action codes
+FOLD = 0
+CALL = 1
+CHECK = 2
+RAISE = 3
+BET = 4
+ACTION_CODES = 'FCK'
+PHRASINGS = [' folds', ' calls', ' checks', ' raises to ', ' bets ']
+
+RoundRecord = namedtuple('RoundRecord', ['round_num', 'names', 'bankrolls', 'deltas', 'hands', 'board', 'events'])
+
+
+class GameRecordWriter():
+    '''
+    Writes the binary record of one game as it is played.
+    Each round is kept in memory only until it is over.
+    '''
+
+    def __init__(self, name, names, perm, blinds):
+        self.name = name
+        self.names = list(names)
+        self.record_file = open(name, 'wb')
+        self.record_file.write(HEADER.pack(MAGIC, VERSION))
+        for player_name in self.names:
+            encoded = player_name.encode()
+            self.record_file.write(bytes([len(encoded)]) + encoded)
+        self.record_file.write(bytes(perm))
+        self.record_file.write(BLINDS.pack(*blinds))
+        self.offsets = array('Q')
+        self.round = None
+        self.notes = bytearray()
+
+    def begin_round(self, round_num, names, bankrolls):
+        '''
+        Starts the record of a round, given the players' names and bankrolls in seat order.
+        '''
+        self.round = [round_num, self.names.index(names[0]), bankrolls, None, None, None]
+        self.round_names = list(names)
+        self.events = bytearray()
+        self.num_events = 0
+
+    def deal(self, hands, board):
+        '''
+        Records both players' hands and the board in seat order.
+        '''
+        self.round[4] = bytes(hands[0] + hands[1])
+        self.round[5] = bytes(board)
+
+    def action(self, name, code, bet_override):
+        '''
+        Records an action performed by the named player, given its socket encoding.
+        '''
+        if code[0] == 'R':
+            kind, amount = (BET if bet_override else RAISE), int(code[1:])
+        else:
+            kind, amount = ACTION_CODES.index(code), 0
+        self.events += bytes([ACTION]) + ACTION_EVENT.pack(self.round_names.index(name), kind, amount)
+        self.num_events += 1
+
+    def street(self, street, contributions):
+        '''
+        Records the start of a street along with both players' contributions to the pot.
+        '''
+        self.events += bytes([STREET]) + STREET_EVENT.pack(street, *contributions)
+        self.num_events += 1
+
+    def show(self):
+        '''
+        Records that both hands were shown.
+        '''
+        self.events.append(SHOW)
+        self.num_events += 1
+
+    def award(self, deltas):
+        '''
+        Records the players' bankroll deltas in seat order.
+        '''
+        self.round[3] = deltas
+        self.events.append(AWARD)
+        self.num_events += 1
+
+    def note(self, line):
+        '''
+        Records a line the engine added to the game log, such as an illegal action.
+        Lines added between rounds are kept until the record is closed.
+        '''
+        encoded = line.encode()
+        if self.round is None:
+            self.notes += NOTE_EVENT.pack(len(encoded)) + encoded
+            return
+        self.events += bytes([NOTE]) + NOTE_EVENT.pack(len(encoded)) + encoded
+        self.num_events += 1
+
+    def end_round(self):
+        '''
+        Writes the record of the current round.
+        '''
+        round_num, first, bankrolls, deltas, hands, board = self.round
+        payload = ROUND.pack(round_num, first, bankrolls[0], bankrolls[1], deltas[0], deltas[1],
+                             hands, board, self.num_events) + self.events
+        self.offsets.append(self.record_file.tell())
+        self.record_file.write(SIZE.pack(len(payload)) + payload)
+        self.round = None
+
+    def flush(self):
+        '''
+        Writes the completed rounds to disk.
+        '''
+        self.record_file.flush()
+
+    def close(self, straights, names, bankrolls):
+        '''
+        Writes the round index, the notes after the last round and the final results in seat order,
+        then closes the record.
+        '''
+        index_offset = self.record_file.tell()
+        if sys.byteorder == 'big':
+            self.offsets.byteswap()
+        self.offsets.tofile(self.record_file)
+        self.record_file.write(self.notes)
+        self.record_file.write(FOOTER.pack(straights[0], straights[1], self.names.index(names[0]),
+                                           bankrolls[0], bankrolls[1], len(self.offsets),
+                                           index_offset, INDEX_MAGIC))
+        self.record_file.close()
+
+
+class NoteLog():
+    '''
+    Passes lines added to the game log during a query on to the game record as notes.
+    '''
+
+    def __init__(self, log, record):
+        self.log = log
+        self.record = record
+
+    def append(self, line):
+        self.log.append(line)
+        self.record.note(line)
+
+
+class GameRecord():
+    '''
+    Reads a binary game record, giving random access to its rounds.
+    '''
+
+    def __init__(self, name):
+        self.record_file = open(name, 'rb')
+        magic, version = HEADER.unpack(self.record_file.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(name + ' is not a version ' + str(VERSION) + ' game record')
+        self.names = []
+        for _ in range(2):
+            length = self.record_file.read(1)[0]
+            self.names.append(self.record_file.read(length).decode())
+        self.perm = list(self.record_file.read(13))
+        self.small_blind, self.big_blind, self.starting_stack = BLINDS.unpack(self.record_file.read(BLINDS.size))
+        self.rounds_offset = self.record_file.tell()
+        self.final = None
+        self.notes = []
+        self.record_file.seek(0, 2)
+        end = self.record_file.tell()
+        if end - self.rounds_offset >= FOOTER.size:
+            self.record_file.seek(end - FOOTER.size)
+            footer = FOOTER.unpack(self.record_file.read(FOOTER.size))
+            if footer[-1] == INDEX_MAGIC:
+                straights0, straights1, first, bankroll0, bankroll1, num_rounds, index_offset, _ = footer
+                self.record_file.seek(index_offset)
+                self.offsets = array('Q')
+                self.offsets.fromfile(self.record_file, num_rounds)
+                if sys.byteorder == 'big':
+                    self.offsets.byteswap()
+                self.final = ([straights0, straights1], self.seat_names(first), [bankroll0, bankroll1])
+                notes = self.record_file.read(end - FOOTER.size - self.record_file.tell())
+                position = 0
+                while position < len(notes):
+                    length = NOTE_EVENT.unpack_from(notes, position)[0]
+                    position += NOTE_EVENT.size
+                    self.notes.append(notes[position:position+length].decode())
+                    position += length
+                return
+        # the game did not finish, so the index is rebuilt by scanning the rounds
+        self.offsets = array('Q')
+        offset = self.rounds_offset
+        while offset + SIZE.size <= end:
+            self.record_file.seek(offset)
+            size = SIZE.unpack(self.record_file.read(SIZE.size))[0]
+            if offset + SIZE.size + size > end:
+                break
+            self.offsets.append(offset)
+            offset += SIZE.size + size
+
+    def seat_names(self, first):
+        '''
+        Returns the players' names in seat order.
+        '''
+        return [self.names[first], self.names[1-first]]
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, index):
+        '''
+        Reads the record of one round without scanning the rounds before it.
+        '''
+        self.record_file.seek(self.offsets[index])
+        size = SIZE.unpack(self.record_file.read(SIZE.size))[0]
+        payload = self.record_file.read(size)
+        (round_num, first, bankroll0, bankroll1, delta0, delta1,
+         hands, board, num_events) = ROUND.unpack_from(payload)
+        events = []
+        position = ROUND.size
+        for _ in range(num_events):
+            event_type = payload[position]
+            position += 1
+            if event_type == ACTION:
+                events.append((ACTION,) + ACTION_EVENT.unpack_from(payload, position))
+                position += ACTION_EVENT.size
+            elif event_type == STREET:
+                street, contribution0, contribution1 = STREET_EVENT.unpack_from(payload, position)
+                events.append((STREET, street, [contribution0, contribution1]))
+                position += STREET_EVENT.size
+            elif event_type == NOTE:
+                length = NOTE_EVENT.unpack_from(payload, position)[0]
+                position += NOTE_EVENT.size
+                events.append((NOTE, payload[position:position+length].decode()))
+                position += length
+            else:  # SHOW or AWARD
+                events.append((event_type,))
+        return RoundRecord(round_num, self.seat_names(first), [bankroll0, bankroll1], [delta0, delta1],
+                           [list(hands[0:2]), list(hands[2:4])], list(board), events)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def close(self):
+        self.record_file.close()
+
+    def pcards(self, cards):
+        '''
+        Formats cards along with their permuted values, as in the text game log.
+        '''
+        return '{} [{}]'.format(' '.join(CARD_STRINGS[card] for card in cards),
+                                ' '.join(RANK_CHARS[self.perm[card // 4]] + SUIT_CHARS[card % 4] for card in cards))
+
+    def round_lines(self, record):
+        '''
+        Generates the text game log lines of one round.
+        '''
+        names = record.names
+        yield ''
+        yield 'Round #{}, {} ({}), {} ({})'.format(record.round_num, names[0], record.bankrolls[0],
+                                                   names[1], record.bankrolls[1])
+        yield '{} posts the blind of {}'.format(names[0], self.small_blind)
+        yield '{} posts the blind of {}'.format(names[1], self.big_blind)
+        yield '{} dealt {}'.format(names[0], self.pcards(record.hands[0]))
+        yield '{} dealt {}'.format(names[1], self.pcards(record.hands[1]))
+        for event in record.events:
+            if event[0] == ACTION:
+                _, seat, code, amount = event
+                yield names[seat] + PHRASINGS[code] + (str(amount) if code >= RAISE else '')
+            elif event[0] == STREET:
+                _, street, contributions = event
+                yield '{} {}, {} ({}), {} ({})'.format(STREET_NAMES[street - 3], self.pcards(record.board[:street]),
+                                                       names[0], contributions[0], names[1], contributions[1])
+            elif event[0] == SHOW:
+                yield '{} shows {}'.format(names[0], self.pcards(record.hands[0]))
+                yield '{} shows {}'.format(names[1], self.pcards(record.hands[1]))
+            elif event[0] == AWARD:
+                yield '{} awarded {}'.format(names[0], record.deltas[0])
+                yield '{} awarded {}'.format(names[1], record.deltas[1])
+            else:  # NOTE
+                yield event[1]
+
+    def text_lines(self):
+        '''
+        Generates the lines of the text game log, exactly as the engine wrote them.
+        '''
+        yield '6.176 MIT Pokerbots - ' + self.names[0] + ' vs ' + self.names[1]
+        yield '---------------------------'
+        yield ' ' + ' '.join(RANK_CHARS) + ' '
+        yield '[' + ' '.join(RANK_CHARS[i] for i in self.perm) + ']'
+        yield '---------------------------'
+        for record in self:
+            for line in self.round_lines(record):
+                yield line
+        for line in self.notes:
+            yield line
+        if self.final is not None:
+            straights, names, bankrolls = self.final
+            yield ''
+            yield 'Straights ' + str(straights[0]) + ' ' + str(straights[1])
+            yield ''
+            yield 'Final, {} ({}), {} ({})'.format(names[0], bankrolls[0], names[1], bankrolls[1])
+
+    def write_text(self, name):
+        '''
+        Regenerates the text game log.
+        '''
+        with open(name, 'w') as log_file:
+            separator = ''
+            for line in self.text_lines():
+                log_file.write(separator + line)
+                separator = '\n'
+
+
+def parse_args():
+    '''
+    Parses arguments for converting a game record back to text.
+    '''
+    parser = argparse.ArgumentParser(prog='python3 gamerecord.py')
+    parser.add_argument('record', type=str, help='Binary game record to read')
+    parser.add_argument('-o', '--output', type=str, default=None,
+                        help='Text game log to regenerate, defaults to stdout')
+    parser.add_argument('-r', '--round', type=int, default=None, help='Only print this round number')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    ARGS = parse_args()
+    RECORD = GameRecord(ARGS.record)
+    if ARGS.round is not None:
+        print('\n'.join(RECORD.round_lines(RECORD[ARGS.round - 1])))
+    elif ARGS.output is not None:
+        RECORD.write_text(ARGS.output)
+    else:
+        sys.stdout.write('\n'.join(RECORD.text_lines()))
+    RECORD.close()
@@ -0,0 +1,59 @@
+'''
+6.176 MIT POKERBOTS LATENCY LOG
+Records how long each pokerbot takes to decide, for the latency report written next to the game log.
+'''
+from array import array
+import bisect
+import math
+
+
+class LatencyLog():
+    '''
+    Records how long a pokerbot takes over each decision, by street and by the action it responds with.
+    Acks of the end of a round are recorded under the street 'round_over'.
+    '''
+
+    # upper edges of the histogram bins in milliseconds, followed by an overflow bin
+    BINS = [0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+
+    def __init__(self):
+        self.latencies = {}
+
+    def record(self, street, action_name, latency):
+        '''
+        Records the latency of one decision in seconds.
+        '''
+        key = (street, action_name)
+        if key not in self.latencies:
+            self.latencies[key] = array('d')
+        self.latencies[key].append(latency)
+
+    @staticmethod
+    def summarize(latencies):
+        '''
+        Returns the percentiles and histogram of some latencies in milliseconds.
+        '''
+        latencies = sorted(1000. * latency for latency in latencies)
+        count = len(latencies)
+        percentile = lambda q: latencies[max(0, math.ceil(q * count) - 1)]
+        histogram = [0] * (len(LatencyLog.BINS) + 1)
+        for latency in latencies:
+            histogram[bisect.bisect_left(LatencyLog.BINS, latency)] += 1
+        return {'count': count, 'total': sum(latencies), 'mean': sum(latencies) / count,
+                'p50': percentile(0.5), 'p90': percentile(0.9), 'p99': percentile(0.99),
+                'max': latencies[-1], 'histogram': histogram}
+
+    def report(self):
+        '''
+        Summarizes all latencies, by street and by action.
+        '''
+        streets, actions = {}, {}
+        for (street, action_name), latencies in self.latencies.items():
+            streets.setdefault(str(street), []).extend(latencies)
+            actions.setdefault(action_name, []).extend(latencies)
+        every = [latency for latencies in self.latencies.values() for latency in latencies]
+        return {
+            'all': LatencyLog.summarize(every) if every else None,
+            'streets': {street: LatencyLog.summarize(latencies) for street, latencies in sorted(streets.items())},
+            'actions': {name: LatencyLog.summarize(latencies) for name, latencies in sorted(actions.items())},
+        }
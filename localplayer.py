@@ -0,0 +1,287 @@
+'''
+6.176 MIT POKERBOTS IN-PROCESS PLAYER
+Runs Python pokerbots built on python_skeleton inside the engine process.
+'''
+import importlib.util
+import importlib
+import contextlib
+import traceback
+import time
+import sys
+import os
+
+sys.path.append(os.getcwd())
+from config import *
+from engine import Player, BotLog, TerminalState, FoldAction, CheckAction, InvalidAction, DECODE
+from engine import FOLD_CODE, CALL_CODE, CHECK_CODE
+from latencylog import LatencyLog
+
+# the actions of in-process pokerbots are their own skeleton's classes, which are matched by name
+ACTION_CLASSES = {action.__name__: action for action in DECODE.values()}
+
+
+class BotOutput():
+    '''
+    Stands in for sys.stdout while an in-process pokerbot runs, so its prints reach its log.
+    '''
+
+    def __init__(self, bot_log):
+        self.bot_log = bot_log
+
+    def write(self, text):
+        self.bot_log.write(text.encode())
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+class LocalPlayer(Player):
+    '''
+    Runs a Python pokerbot built on python_skeleton inside the engine process.
+    Its callbacks are called directly with round states of its own skeleton, which are built
+    from the engine's states without a subprocess, socket or message encoding.
+    Each call is timed against the game clock, but it cannot be cut off: a pokerbot which
+    hangs in a callback hangs the engine with it.
+    '''
+
+    def __init__(self, name, path, output_dir=''):
+        super().__init__(name, path, output_dir)
+        self.pokerbot = None
+        self.output = BotOutput(self.bot_log)
+        # the pokerbot's own skeleton modules
+        self.states = None
+        self.cards = None
+        self.bot_class = None
+        self.action_codes = None
+        self.raise_action = None
+        # the pokerbot's view of the game and of the round so far, and how many actions it has seen
+        self.game_state = None
+        self.round_state = None
+        self.num_actions = 0
+
+    def run(self):
+        '''
+        Imports player.py from the pokerbot directory and instantiates its Player.
+        '''
+        saved_path = list(sys.path)
+        saved_skeleton = {name: module for name, module in sys.modules.items()
+                          if name == 'skeleton' or name.startswith('skeleton.')}
+        for name in saved_skeleton:
+            del sys.modules[name]
+        cwd = os.getcwd()
+        try:
+            path = os.path.abspath(self.path)
+            sys.path.insert(0, path)
+            spec = importlib.util.spec_from_file_location('_pokerbot_' + self.name, os.path.join(path, 'player.py'))
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            actions = importlib.import_module('skeleton.actions')
+            self.states = importlib.import_module('skeleton.states')
+            self.cards = importlib.import_module('skeleton.cards')
+            self.bot_class = importlib.import_module('skeleton.bot').Bot
+            self.action_codes = {FOLD_CODE: actions.FoldAction(), CALL_CODE: actions.CallAction(),
+                                 CHECK_CODE: actions.CheckAction()}
+            self.raise_action = actions.RaiseAction
+            os.chdir(path)
+            with contextlib.redirect_stdout(self.output):
+                self.pokerbot = module.Player()
+            self.game_state = self.states.GameState(0, 0., 1)
+            print(self.name, 'loaded in-process')
+        except Exception:
+            self.bot_log.write(traceback.format_exc().encode())
+            print(self.name, 'failed to load in-process - check player.py')
+        finally:
+            os.chdir(cwd)
+            sys.path[:] = saved_path
+            # each pokerbot keeps references to its own skeleton modules
+            for name in [name for name in sys.modules if name == 'skeleton' or name.startswith('skeleton.')]:
+                del sys.modules[name]
+            sys.modules.update(saved_skeleton)
+
+    def connected(self):
+        '''
+        Returns whether the pokerbot is still running.
+        '''
+        return self.pokerbot is not None
+
+    def stop(self):
+        '''
+        Drops the pokerbot.
+        '''
+        self.pokerbot = None
+        self.bot_log.close()
+
+    def finish(self):
+        '''
+        Ends the game without dropping the pokerbot, which starts its next game in reset.
+        '''
+        return True
+
+    def reset(self, output_dir):
+        '''
+        Starts a new game with the in-process pokerbot, logging to output_dir, and returns whether it started.
+        A pokerbot which does not handle new games itself is replaced by a new instance, as the skeleton does.
+        '''
+        self.game_clock = STARTING_GAME_CLOCK
+        self.bankroll = 0
+        self.latencies = LatencyLog()
+        self.bot_log.close()
+        self.bot_log = BotLog(os.path.join(output_dir, self.name + '.txt'))
+        self.output.bot_log = self.bot_log
+        try:
+            with contextlib.redirect_stdout(self.output):
+                if type(self.pokerbot).handle_new_game is self.bot_class.handle_new_game:
+                    self.pokerbot = type(self.pokerbot)()
+                else:
+                    self.pokerbot.handle_new_game()
+        except Exception:
+            self.bot_log.write(traceback.format_exc().encode())
+            self.pokerbot = None
+            return False
+        self.game_state = self.states.GameState(0, 0., 1)
+        self.round_state = None
+        return True
+
+    def update(self, round_state):
+        '''
+        Brings the pokerbot's view of the round up to the engine's round_state, starting the round
+        if the pokerbot has not seen it yet. The pokerbot's opponent stats see every action, as they
+        would through the skeleton's Runner.
+        '''
+        states, cards = self.states, self.cards
+        seat = self.seat
+        game_state = self.game_state
+        self.game_state = states.GameState(game_state.bankroll, self.game_clock, game_state.round_num)
+        if isinstance(round_state, TerminalState):
+            round_state = round_state.previous_state
+        if self.round_state is None:
+            hands = [[], []]
+            hands[seat] = cards.cards_from_ints(round_state.hands[seat])
+            pips = [SMALL_BLIND, BIG_BLIND]
+            stacks = [STARTING_STACK - SMALL_BLIND, STARTING_STACK - BIG_BLIND]
+            self.round_state = states.RoundState(0, 0, pips, stacks, hands, [], None)
+            self.num_actions = 0
+            self.pokerbot.handle_new_round(self.game_state, self.round_state, seat)
+        stats = self.pokerbot.opponent_stats
+        bot_state = self.round_state
+        for code in round_state.history[self.num_actions:round_state.num_actions]:
+            action = self.action_codes[code] if code < 0 else self.raise_action(code)
+            if stats is not None:
+                stats.action(bot_state, action, seat)
+            next_state = bot_state.proceed(action)
+            if isinstance(next_state, states.RoundState) and next_state.street != bot_state.street:
+                next_state = next_state._replace(deck=cards.cards_from_ints(round_state.deck.peek(next_state.street)))
+            bot_state = next_state
+        self.round_state = bot_state
+        self.num_actions = round_state.num_actions
+
+    def end_round(self, terminal_state):
+        '''
+        Reveals the opponent's hand if the round went to showdown and hands the pokerbot its result.
+        '''
+        states = self.states
+        seat = self.seat
+        stats = self.pokerbot.opponent_stats
+        previous_state = self.round_state.previous_state
+        if FoldAction not in terminal_state.previous_state.legal_actions():
+            revised_hands = list(previous_state.hands)
+            revised_hands[1-seat] = self.cards.cards_from_ints(terminal_state.previous_state.hands[1-seat])
+            previous_state = previous_state._replace(hands=revised_hands)
+            if stats is not None:
+                stats.reveal()
+        delta = terminal_state.deltas[seat]
+        deltas = [-delta, -delta]
+        deltas[seat] = delta
+        if stats is not None:
+            stats.round_over(delta)
+        game_state = self.game_state
+        game_state = states.GameState(game_state.bankroll + delta, game_state.game_clock, game_state.round_num)
+        self.pokerbot.handle_round_over(game_state, states.TerminalState(deltas, previous_state), seat)
+        self.game_state = states.GameState(game_state.bankroll, game_state.game_clock, game_state.round_num + 1)
+        self.round_state = None
+
+    def call(self, callback, *args):
+        '''
+        Calls back into the pokerbot with its prints going to its bot log, and returns the result along
+        with how long it took. A pokerbot which raises is dropped, as if it had disconnected.
+        '''
+        start_time = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(self.output):
+                result = callback(*args)
+        except Exception:
+            self.bot_log.write(traceback.format_exc().encode())
+            self.pokerbot = None
+            raise OSError('pokerbot raised an exception')
+        return result, time.perf_counter() - start_time
+
+    def charge(self, street, action_name, latency, game_log):
+        '''
+        Charges a callback to the game clock, and returns whether the pokerbot still has time left.
+        '''
+        self.latencies.record(street, action_name, latency)
+        if ENFORCE_GAME_CLOCK:
+            self.game_clock -= latency
+        if self.game_clock <= 0.:
+            self.fail(self.name + ' ran out of time', game_log)
+            return False
+        return True
+
+    def fail(self, error_message, game_log):
+        '''
+        Notes an error which ends the pokerbot's game.
+        '''
+        game_log.append(error_message)
+        print(error_message)
+        self.game_clock = 0.
+
+    def get_action(self, round_state):
+        '''
+        Updates the pokerbot's view of the round and returns the action it chooses.
+        '''
+        self.update(round_state)
+        return self.pokerbot.get_action(self.game_state, self.round_state, self.seat)
+
+    def finish_round(self, terminal_state):
+        '''
+        Updates the pokerbot's view of the round and hands it the result.
+        '''
+        self.update(terminal_state)
+        self.end_round(terminal_state)
+
+    def query(self, round_state, player_message, game_log):
+        '''
+        Requests one action from the pokerbot by calling its get_action.
+        '''
+        del player_message[1:]  # the pokerbot reads the engine's states instead
+        legal_actions = round_state.legal_actions()
+        if self.pokerbot is not None and self.game_clock > 0.:
+            try:
+                action, latency = self.call(self.get_action, round_state)
+                action_class = ACTION_CLASSES.get(type(action).__name__, InvalidAction)
+                if self.charge(round_state.street, action_class.__name__, latency, game_log):
+                    if action_class is InvalidAction:
+                        game_log.append(self.name + ' response misformatted')
+                    else:
+                        action = self.validate(action_class, getattr(action, 'amount', None),
+                                               round_state, legal_actions, game_log)
+                        if action is not None:
+                            return action
+            except OSError:
+                self.fail(self.name + ' disconnected', game_log)
+            except (TypeError, ValueError):
+                game_log.append(self.name + ' response misformatted')
+        return CheckAction() if CheckAction in legal_actions else FoldAction()
+
+    def round_over(self, terminal_state, player_message, game_log):
+        '''
+        Hands the end of the round to the pokerbot by calling its handle_round_over, whatever ROUND_OVER_MODE is.
+        '''
+        del player_message[1:]
+        if self.pokerbot is not None and self.game_clock > 0.:
+            try:
+                _, latency = self.call(self.finish_round, terminal_state)
+                self.charge('round_over', 'CheckAction', latency, game_log)
+            except OSError:
+                self.fail(self.name + ' disconnected', game_log)
@@ -0,0 +1,82 @@
+'''
+6.176 MIT POKERBOTS ENGINE PROFILER
+Times each phase of the engine for python3 engine.py --profile.
+'''
+import functools
+import time
+
+from engine import Game, RoundState, Player
+from textlog import GameLog
+from localplayer import LocalPlayer
+
+
+class PhaseProfiler():
+    '''
+    Accumulates the time the engine spends in each phase of a game.
+    Phases may nest, in which case time is only counted towards the innermost phase.
+    '''
+
+    # phase of each instrumented function, by class, which this module imports from where it lives
+    PHASES = {
+        'Game': {'predeal': 'deal', 'deal': 'deal',
+                 'log_round_state': 'logging', 'log_action': 'logging', 'log_terminal_state': 'logging'},
+        'GameLog': {'flush': 'logging'},
+        'RoundState': {'proceed': 'state transition', 'proceed_street': 'state transition',
+                       'legal_actions': 'legal actions', 'raise_bounds': 'legal actions', 'showdown': 'showdown'},
+        'Player': {'build': 'bot startup', 'run': 'bot startup', 'stop': 'bot shutdown',
+                   'encode': 'encode', 'send': 'wire write', 'receive': 'wait for bot', 'decode': 'decode'},
+        'LocalPlayer': {'run': 'bot startup', 'stop': 'bot shutdown', 'call': 'wait for bot'},
+    }
+
+    def __init__(self):
+        self.totals = {}
+        self.calls = {}
+        self.stack = []
+
+    def instrument(self, cls, method_name, phase):
+        '''
+        Replaces a method with one which times itself under the given phase.
+        '''
+        method = getattr(cls, method_name)
+        totals, calls, stack = self.totals, self.calls, self.stack
+        totals.setdefault(phase, 0.)
+        calls.setdefault(phase, 0)
+        perf_counter = time.perf_counter
+
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            stack.append(0.)
+            start_time = perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                elapsed = perf_counter() - start_time
+                nested = stack.pop()
+                totals[phase] += elapsed - nested
+                calls[phase] += 1
+                if stack:
+                    stack[-1] += elapsed
+        setattr(cls, method_name, timed)
+
+    def instrument_engine(self):
+        '''
+        Instruments every engine phase listed in PHASES.
+        '''
+        for class_name, phases in PhaseProfiler.PHASES.items():
+            for method_name, phase in phases.items():
+                self.instrument(globals()[class_name], method_name, phase)
+
+    def print_breakdown(self, wall_time):
+        '''
+        Prints the time spent in each phase.
+        '''
+        print()
+        print('{:<20}{:>10}{:>12}{:>12}{:>8}'.format('phase', 'calls', 'total (s)', 'per call', '%'))
+        other = wall_time - sum(self.totals.values())
+        rows = sorted(self.totals.items(), key=lambda item: -item[1]) + [('other', other)]
+        for phase, total in rows:
+            calls = self.calls.get(phase, 0)
+            per_call = '{:.1f}us'.format(1e6 * total / calls) if calls else ''
+            print('{:<20}{:>10}{:>12.4f}{:>12}{:>7.1f}%'.format(phase, calls or '', total, per_call,
+                                                               100. * total / wall_time))
+        print('{:<20}{:>10}{:>12.4f}'.format('wall', '', wall_time))
@@ -80,6 +80,7 @@ class Player(Bot):
         #street = round_state.street  # 0, 3, 4, or 5 representing pre-flop, flop, turn, or river respectively
         #my_cards = round_state.hands[active]  # your cards
         #board_cards = round_state.deck[:street]  # the board cards
+        #my_card_ints = round_state.int_hands[active]  # your cards as integers 0..51, see skeleton/cards.py
         #my_pip = round_state.pips[active]  # the number of chips you have contributed to the pot this round of betting
         #opp_pip = round_state.pips[1-active]  # the number of chips your opponent has contributed to the pot this round of betting
         #my_stack = round_state.stacks[active]  # the number of chips you have remaining
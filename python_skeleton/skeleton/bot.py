@@ -8,6 +8,23 @@ class Bot():
     The base class for a pokerbot.
     '''
 
+    # set to a skeleton.stats.OpponentStats for the runner to count the opponent's actions into it
+    opponent_stats = None
+
+    def handle_new_game(self):
+        '''
+        Called when the engine keeps your bot running to play another game. Optional.
+        If you do not override it, your bot is replaced by a new instance of its class instead.
+        Override it to keep anything slow to set up and reset the rest.
+
+        Arguments:
+        Nothing.
+
+        Returns:
+        Nothing.
+        '''
+        pass
+
     def handle_new_round(self, game_state, round_state, active):
         '''
         Called when a new round starts. Called NUM_ROUNDS times.
@@ -0,0 +1,60 @@
+'''
+Integer card encoding shared with the engine.
+Card c in 0..51 has rank c // 4, from 2 to A, and suit c % 4, from c, d, h to s.
+The lookup tables are plain lists, so they can also index numpy arrays directly.
+'''
+
+RANK_CHARS = '23456789TJQKA'
+SUIT_CHARS = 'cdhs'
+CARD_STRINGS = [rank + suit for rank in RANK_CHARS for suit in SUIT_CHARS]
+CARD_INDEX = {string: card for card, string in enumerate(CARD_STRINGS)}
+RANKS = [card // 4 for card in range(52)]
+SUITS = [card % 4 for card in range(52)]
+
+
+def to_ints(cards):
+    '''
+    Converts cards in common format, such as 'As', to integer cards.
+    '''
+    return [CARD_INDEX[card] for card in cards]
+
+
+class Cards(list):
+    '''
+    Cards in common format which carry their integer cards, so that they are converted only once.
+    '''
+
+    __slots__ = ['ints']
+
+    def __init__(self, strings, ints):
+        super().__init__(strings)
+        self.ints = ints
+
+
+def cards_from_strings(strings):
+    '''
+    Returns Cards for cards in common format.
+    '''
+    return Cards(strings, to_ints(strings))
+
+
+def cards_from_ints(ints):
+    '''
+    Returns Cards for integer cards.
+    '''
+    return Cards([CARD_STRINGS[card] for card in ints], list(ints))
+
+
+def card_ints(cards):
+    '''
+    Returns the integer cards of cards in common format, without converting Cards again.
+    '''
+    return cards.ints if type(cards) is Cards else to_ints(cards)
+
+
+def permuted_cards(perm):
+    '''
+    Returns the card each card is worth under a value permutation,
+    where perm[rank] is the rank that rank is worth.
+    '''
+    return [4 * perm[RANKS[card]] + SUITS[card] for card in range(52)]
@@ -0,0 +1,262 @@
+'''
+Hand equity in the permuted-value game, estimated by sampling and evaluating hands in numpy batches.
+A distribution over value permutations is an array of permutations, one per row, where perm[rank] is
+the rank that rank is worth as in cards.py, along with optional weights. Without one, permutations are
+drawn from the engine's prior. Hands and boards are integer cards, see cards.py.
+'''
+import os
+import numpy as np
+
+NUM_RANKS = 13
+RANKS = np.arange(NUM_RANKS)
+RANK_BITS = 1 << RANKS
+NUM_MASKS = 1 << NUM_RANKS
+# hand categories, the first digit of a score in base NUM_RANKS, above five digits of ranks
+HIGH_CARD, PAIR, TWO_PAIR, TRIPS, STRAIGHT, FLUSH, FULL_HOUSE, QUADS, STRAIGHT_FLUSH = range(9)
+CATEGORY_SCALE = NUM_RANKS ** 5
+# every pair of distinct cards, with the index of each in COMBO_INDEX, so opponent ranges are arrays of 1326 weights
+COMBOS = np.array([(card1, card2) for card1 in range(52) for card2 in range(card1 + 1, 52)])
+COMBO_INDEX = np.full((52, 52), -1)
+COMBO_INDEX[COMBOS[:, 0], COMBOS[:, 1]] = COMBO_INDEX[COMBOS[:, 1], COMBOS[:, 0]] = np.arange(len(COMBOS))
+# the preflop table is computed offline by running this module and cached next to this file, see preflop_table
+PREFLOP_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'preflop_equity.npy')
+PREFLOP_SAMPLES = 20000
+PRIOR_SAMPLES = 4096
+# deals per preflop_equity call when the table has not been built
+PREFLOP_FALLBACK_SAMPLES = 2000
+
+
+def build_rank_tables():
+    '''
+    Returns lookup tables over 13-bit rank masks: the top rank of the highest straight or -1,
+    and the top k ranks as k digits in base NUM_RANKS for k from 0 to 5, whose k = 1 entry is the highest rank.
+    '''
+    masks = np.arange(NUM_MASKS)
+    straight_tops = np.full(NUM_MASKS, -1)
+    for top in range(4, NUM_RANKS):  # later straights are higher
+        window = sum(1 << rank for rank in range(top - 4, top + 1))
+        straight_tops[masks & window == window] = top
+    wheel = (1 << 12) | 0b1111
+    straight_tops[(masks & wheel == wheel) & (straight_tops < 0)] = 3
+    top_ranks = np.zeros((6, NUM_MASKS), dtype=np.int64)
+    taken = np.zeros(NUM_MASKS, dtype=np.int64)
+    highest = np.full(NUM_MASKS, -1)
+    for rank in range(NUM_RANKS - 1, -1, -1):
+        present = (masks >> rank) & 1 == 1
+        highest[present & (highest < 0)] = rank
+        for k in range(1, 6):
+            top_ranks[k] += np.where(present & (taken < k), rank * NUM_RANKS ** np.maximum(k - 1 - taken, 0), 0)
+        taken += present
+    return straight_tops, top_ranks, highest
+
+
+STRAIGHT_TOPS, TOP_RANKS, HIGHEST = build_rank_tables()
+
+
+def rank_masks(counts, count):
+    '''
+    Returns the masks of ranks held exactly count times, given counts per rank.
+    '''
+    return (counts == count) @ RANK_BITS
+
+
+def without(mask, rank):
+    '''
+    Clears a rank from masks, where rank may be -1 for none.
+    '''
+    return mask & ~np.where(rank >= 0, 1 << np.maximum(rank, 0), 0)
+
+
+def evaluate(cards):
+    '''
+    Scores hands of seven integer cards, one per row, so that better hands score higher.
+    Cards are scored as they are, so permute them first.
+    '''
+    cards = np.asarray(cards)
+    ranks = cards >> 2
+    suits = cards & 3
+    counts = (ranks[:, :, None] == RANKS).sum(axis=1)
+    held = (counts > 0) @ RANK_BITS
+    pairs, trips, quads = (rank_masks(counts, count) for count in (2, 3, 4))
+    suit_counts = (suits[:, :, None] == np.arange(4)).sum(axis=1)
+    flush_suit = suit_counts.argmax(axis=1)
+    has_flush = suit_counts.max(axis=1) >= 5
+    flush_held = np.where(suits == flush_suit[:, None], 1 << ranks, 0).sum(axis=1)
+    straight_top = STRAIGHT_TOPS[held]
+    straight_flush_top = np.where(has_flush, STRAIGHT_TOPS[flush_held], -1)
+    quad = HIGHEST[quads]
+    trip = HIGHEST[trips]
+    full_pair = HIGHEST[without(trips, trip) | pairs]
+    pair = HIGHEST[pairs]
+    second_pair = HIGHEST[without(pairs, pair)]
+    conditions = [straight_flush_top >= 0, quad >= 0, (trip >= 0) & (full_pair >= 0), has_flush,
+                  straight_top >= 0, trip >= 0, second_pair >= 0, pair >= 0]
+    values = [straight_flush_top,
+              quad * NUM_RANKS + HIGHEST[without(held, quad)],
+              trip * NUM_RANKS + full_pair,
+              TOP_RANKS[5][flush_held],
+              straight_top,
+              trip * NUM_RANKS ** 2 + TOP_RANKS[2][without(held, trip)],
+              (pair * NUM_RANKS + second_pair) * NUM_RANKS + HIGHEST[without(without(held, pair), second_pair)],
+              pair * NUM_RANKS ** 3 + TOP_RANKS[3][without(held, pair)]]
+    categories = [STRAIGHT_FLUSH, QUADS, FULL_HOUSE, FLUSH, STRAIGHT, TRIPS, TWO_PAIR, PAIR]
+    category = np.select(conditions, categories, HIGH_CARD)
+    return category * CATEGORY_SCALE + np.select(conditions, values, TOP_RANKS[5][held])
+
+
+def sample_perms(num, rng=None):
+    '''
+    Draws value permutations from the engine's prior, as Game.permute_values does, one per row.
+    '''
+    rng = np.random.default_rng() if rng is None else rng
+    rows = np.arange(num)
+    remaining = np.tile(RANKS[::-1], (num, 1))
+    seeds = rng.geometric(p=0.25, size=(num, NUM_RANKS)) - 1
+    perms = np.empty((num, NUM_RANKS), dtype=np.int64)
+    for i in range(NUM_RANKS):
+        length = NUM_RANKS - i
+        picks = length - 1 - seeds[:, i] % length
+        perms[:, i] = remaining[rows, picks]
+        kept = np.ones(remaining.shape, dtype=bool)
+        kept[rows, picks] = False
+        remaining = remaining[kept].reshape(num, length - 1)
+    return perms
+
+
+def permute(cards, perms):
+    '''
+    Returns the cards each row of cards is worth under the permutation in the same row of perms.
+    '''
+    return np.take_along_axis(perms, cards >> 2, axis=1) * 4 + (cards & 3)
+
+
+def draw_perms(num, perms, weights, rng):
+    '''
+    Draws num permutations from a distribution over them, or from the prior if perms is None.
+    '''
+    if perms is None:
+        return sample_perms(num, rng)
+    perms = np.asarray(perms)
+    if weights is None:
+        return perms[rng.integers(len(perms), size=num)]
+    weights = np.asarray(weights, dtype=float)
+    return perms[rng.choice(len(perms), size=num, p=weights / weights.sum())]
+
+
+def draw_cards(num, excluded, num_cards, rng):
+    '''
+    Draws num_cards distinct cards per row from the cards not excluded in that row, given as a (num, 52) mask.
+    '''
+    keys = rng.random((num, 52))
+    keys[excluded] = 2.
+    return np.argsort(keys, axis=1)[:, :num_cards]
+
+
+def estimate_equity(hand, board=(), perms=None, weights=None, opponent_range=None, num_samples=2000, rng=None):
+    '''
+    Estimates the share of the pot that hand wins at showdown against one opponent, counting ties as half.
+    The opponent's hand is dealt at random, or weighted by opponent_range, an array of a weight for each
+    hand in COMBOS. The value permutation is drawn from perms with weights, or from the prior if perms is None.
+    '''
+    rng = np.random.default_rng() if rng is None else rng
+    known = list(hand) + list(board)
+    num_board_cards = 5 - len(board)
+    excluded = np.zeros((num_samples, 52), dtype=bool)
+    excluded[:, known] = True
+    if opponent_range is None:
+        drawn = draw_cards(num_samples, excluded, 2 + num_board_cards, rng)
+        opponent_hands, board_cards = drawn[:, :2], drawn[:, 2:]
+    else:
+        combo_weights = np.array(opponent_range, dtype=float)
+        combo_weights[np.isin(COMBOS, known).any(axis=1)] = 0.
+        if combo_weights.sum() <= 0.:
+            raise ValueError('opponent_range has no weight on hands which do not share known cards')
+        opponent_hands = COMBOS[rng.choice(len(COMBOS), size=num_samples, p=combo_weights / combo_weights.sum())]
+        excluded[np.arange(num_samples)[:, None], opponent_hands] = True
+        board_cards = draw_cards(num_samples, excluded, num_board_cards, rng)
+    boards = np.hstack([np.tile(np.asarray(board, dtype=np.int64), (num_samples, 1)), board_cards])
+    drawn_perms = draw_perms(num_samples, perms, weights, rng)
+    hands = np.tile(np.asarray(hand, dtype=np.int64), (num_samples, 1))
+    scores = evaluate(permute(np.hstack([hands, boards]), drawn_perms))
+    opponent_scores = evaluate(permute(np.hstack([opponent_hands, boards]), drawn_perms))
+    return ((scores > opponent_scores).sum() + 0.5 * (scores == opponent_scores).sum()) / num_samples
+
+
+def preflop_classes(hand, perms):
+    '''
+    Returns the preflop class each permutation makes of a hand, as an index into the flattened preflop table,
+    in which suited hands are above the diagonal, pairs on it and offsuit hands below it.
+    '''
+    (rank1, rank2), suited = np.asarray(hand) >> 2, hand[0] % 4 == hand[1] % 4
+    high = np.maximum(perms[:, rank1], perms[:, rank2])
+    low = np.minimum(perms[:, rank1], perms[:, rank2])
+    return low * NUM_RANKS + high if suited else high * NUM_RANKS + low
+
+
+def compute_preflop_table(num_samples=PREFLOP_SAMPLES, rng=None):
+    '''
+    Estimates the equity of every preflop class against a random hand with num_samples deals each.
+    Since every card is permuted alike and the deck is shuffled uniformly, a hand's equity under
+    a permutation is the equity of the class that permutation makes of it, so one table serves all permutations.
+    '''
+    rng = np.random.default_rng(0) if rng is None else rng
+    identity = RANKS[None, :]
+    table = np.zeros(NUM_RANKS * NUM_RANKS)
+    for high in range(NUM_RANKS):
+        for low in range(high + 1):
+            for suited in ((False, True) if high > low else (False,)):
+                hand = (4 * high, 4 * low + (0 if suited else 1))
+                index = preflop_classes(hand, identity)[0]
+                table[index] = estimate_equity(hand, perms=identity, num_samples=num_samples, rng=rng)
+    return table.reshape(NUM_RANKS, NUM_RANKS)
+
+
+_preflop_table = None
+_preflop_table_loaded = False
+_prior_preflop_table = None
+
+
+def preflop_table(path=PREFLOP_CACHE):
+    '''
+    Returns the preflop table, loading it from path on first use, or None if it has not been built.
+    Computing it takes far longer than a game clock allows, so build it with python3 -m skeleton.equity
+    in the bot directory before playing.
+    '''
+    global _preflop_table, _preflop_table_loaded
+    if not _preflop_table_loaded:
+        _preflop_table_loaded = True
+        try:
+            _preflop_table = np.load(path)
+        except (OSError, ValueError):
+            print('No preflop table at {}, run python3 -m skeleton.equity to build it'.format(path))
+    return _preflop_table
+
+
+def preflop_equity(hand, perms=None, weights=None):
+    '''
+    Returns the preflop equity of hand against a random hand, averaged over a distribution over permutations,
+    or over the prior if perms is None. Without the preflop table, it is estimated with estimate_equity instead.
+    '''
+    global _prior_preflop_table
+    table = preflop_table()
+    if table is None:
+        return estimate_equity(hand, perms=perms, weights=weights, num_samples=PREFLOP_FALLBACK_SAMPLES)
+    table = table.ravel()
+    if perms is None:
+        if _prior_preflop_table is None:
+            prior_perms = sample_perms(PRIOR_SAMPLES, np.random.default_rng(0))
+            # the mean over the prior of the classes each class is permuted into
+            _prior_preflop_table = np.zeros(NUM_RANKS * NUM_RANKS)
+            for row in range(NUM_RANKS):
+                for column in range(NUM_RANKS):
+                    hand = (4 * row, 4 * column + (row >= column))
+                    _prior_preflop_table[row * NUM_RANKS + column] = table[preflop_classes(hand, prior_perms)].mean()
+        return _prior_preflop_table[preflop_classes(hand, RANKS[None, :])[0]]
+    classes = preflop_classes(hand, np.asarray(perms))
+    return np.average(table[classes], weights=weights)
+
+
+if __name__ == '__main__':
+    print('Computing the preflop table, which takes a while')
+    np.save(PREFLOP_CACHE, compute_preflop_table())
+    print('Wrote', PREFLOP_CACHE)
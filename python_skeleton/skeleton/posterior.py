@@ -0,0 +1,136 @@
+'''
+A particle posterior over the game's value permutation, updated from the hands shown down in each round.
+'''
+import numpy as np
+from .equity import NUM_RANKS, evaluate, permute, sample_perms
+from .states import NUM_ROUNDS
+
+# the engine draws each value with a geometric(PRIOR_P) offset, see Game.permute_values
+PRIOR_P = 0.25
+
+
+def log_prior(perms):
+    '''
+    Returns the log probability of each permutation, one per row, under the engine's prior.
+    The value of rank i is the j-th lowest of the values left for ranks i to 12 with probability
+    proportional to (1 - PRIOR_P) ** j, as the geometric offset wraps around those left.
+    '''
+    lower_later = np.triu(perms[:, None, :] < perms[:, :, None], k=1).sum(axis=2)
+    remaining = NUM_RANKS - np.arange(NUM_RANKS)
+    return (lower_later * np.log1p(-PRIOR_P) + np.log(PRIOR_P) - np.log1p(-(1 - PRIOR_P) ** remaining)).sum(axis=1)
+
+
+def outcomes(perms, shown):
+    '''
+    Returns the sign of the showdown of each row of shown, our hand, the opponent's hand and the board,
+    under the permutation in the same row of perms.
+    '''
+    boards = shown[:, 4:]
+    scores = evaluate(permute(np.hstack([shown[:, :2], boards]), perms))
+    opponent_scores = evaluate(permute(np.hstack([shown[:, 2:4], boards]), perms))
+    return np.sign(scores - opponent_scores)
+
+
+class PermutationPosterior():
+    '''
+    Weighted particles drawn from the engine's prior over value permutations.
+    After each showdown, particles under which the winner would have lost are dropped, in O(particles).
+    When the effective sample size falls below resample_threshold of the particles, they are resampled,
+    and each is moved by swapping the values of two ranks, keeping the move if it is consistent with
+    the latest showdown and with check_showdowns earlier ones drawn at random, so each update evaluates
+    at most 2 * (check_showdowns + 1) hands per particle whatever the number of rounds played.
+    Pass particles and weights to the functions of equity.py as perms and weights.
+    '''
+
+    def __init__(self, num_particles=1000, check_showdowns=4, resample_threshold=0.5, rng=None):
+        self.rng = np.random.default_rng() if rng is None else rng
+        self.num_particles = num_particles
+        self.check_showdowns = check_showdowns
+        self.resample_threshold = resample_threshold
+        self.particles = sample_perms(num_particles, self.rng)
+        self.weights = np.full(num_particles, 1. / num_particles)
+        # showdowns as our two cards, the opponent's two cards and five board cards, with their signs
+        self.shown = np.zeros((NUM_ROUNDS, 9), dtype=np.int64)
+        self.signs = np.zeros(NUM_ROUNDS, dtype=np.int64)
+        self.num_showdowns = 0
+
+    def effective_sample_size(self):
+        '''
+        Returns the number of equally weighted particles the current weights are worth.
+        '''
+        return 1. / np.square(self.weights).sum()
+
+    def update(self, hand, opponent_hand, board, delta):
+        '''
+        Conditions on a showdown of integer cards which we won if delta > 0, lost if delta < 0 or split.
+        '''
+        shown = np.array(list(hand) + list(opponent_hand) + list(board), dtype=np.int64)
+        sign = int(np.sign(delta))
+        index = self.num_showdowns % len(self.shown)  # the oldest showdowns are forgotten after NUM_ROUNDS
+        self.shown[index] = shown
+        self.signs[index] = sign
+        self.num_showdowns += 1
+        consistent = outcomes(self.particles, np.tile(shown, (self.num_particles, 1))) == sign
+        weights = self.weights * consistent
+        total = weights.sum()
+        if total <= 0.:  # no particle explains what we saw, so start again from the prior
+            self.particles = sample_perms(self.num_particles, self.rng)
+            consistent = outcomes(self.particles, np.tile(shown, (self.num_particles, 1))) == sign
+            weights = np.where(consistent, 1., 0.) if consistent.any() else np.ones(self.num_particles)
+            total = weights.sum()
+        self.weights = weights / total
+        if self.effective_sample_size() < self.resample_threshold * self.num_particles:
+            self.resample()
+            self.move(index)
+
+    def update_round(self, terminal_state, active):
+        '''
+        Conditions on the end of a round, passed to handle_round_over, if the hands were shown down.
+        '''
+        previous_state = terminal_state.previous_state
+        if previous_state.street == 5 and previous_state.hands[1-active]:
+            int_hands = previous_state.int_hands
+            self.update(int_hands[active], int_hands[1-active], previous_state.int_deck, terminal_state.deltas[active])
+
+    def resample(self):
+        '''
+        Draws equally weighted particles in proportion to their weights, by systematic resampling.
+        '''
+        positions = (self.rng.random() + np.arange(self.num_particles)) / self.num_particles
+        cumulative = np.cumsum(self.weights)
+        cumulative[-1] = 1.
+        self.particles = self.particles[np.searchsorted(cumulative, positions)]
+        self.weights = np.full(self.num_particles, 1. / self.num_particles)
+
+    def move(self, latest):
+        '''
+        Proposes swapping the values of two ranks in every particle, accepting with the ratio of the prior
+        if the swap is consistent with the latest showdown and a random sample of earlier ones.
+        '''
+        rows = np.arange(self.num_particles)
+        first = self.rng.integers(NUM_RANKS, size=self.num_particles)
+        second = (first + self.rng.integers(1, NUM_RANKS, size=self.num_particles)) % NUM_RANKS
+        proposals = self.particles.copy()
+        proposals[rows, first] = self.particles[rows, second]
+        proposals[rows, second] = self.particles[rows, first]
+        accepted = np.log(self.rng.random(self.num_particles)) < log_prior(proposals) - log_prior(self.particles)
+        num_stored = min(self.num_showdowns, len(self.shown))
+        checked = [np.full(self.num_particles, latest)]
+        if num_stored > 1:
+            checked += [self.rng.integers(num_stored, size=self.num_particles) for _ in range(self.check_showdowns)]
+        for showdowns in checked:
+            candidates = np.flatnonzero(accepted)
+            if len(candidates) == 0:
+                break
+            signs = outcomes(proposals[candidates], self.shown[showdowns[candidates]])
+            accepted[candidates] = signs == self.signs[showdowns[candidates]]
+        self.particles[accepted] = proposals[accepted]
+
+    def marginals(self):
+        '''
+        Returns the posterior probability that each rank is worth each value, indexed by rank then value.
+        '''
+        marginals = np.zeros((NUM_RANKS, NUM_RANKS))
+        for rank in range(NUM_RANKS):
+            marginals[rank] = np.bincount(self.particles[:, rank], weights=self.weights, minlength=NUM_RANKS)
+        return marginals
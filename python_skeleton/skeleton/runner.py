@@ -3,10 +3,33 @@ The infrastructure for interacting with the engine.
 '''
 import argparse
 import socket
+import struct
+import sys
+from collections import namedtuple
 from .actions import FoldAction, CallAction, CheckAction, RaiseAction
-from .states import GameState, TerminalState, RoundState
+from .states import GameState, TerminalState, RoundState, tuple_new
 from .states import STARTING_STACK, BIG_BLIND, SMALL_BLIND
 from .bot import Bot
+from .cards import cards_from_strings, cards_from_ints
+
+# the engine may offer the binary protocol before the first round
+# messages are a big-endian u16 length followed by clauses of a code byte and fixed-width fields
+# and responses are a code byte followed by a u16 raise amount
+PROTOCOL_OFFER = 'V1'
+FRAME = struct.Struct('!H')
+CLOCK = struct.Struct('!I')
+AMOUNT = struct.Struct('!H')
+DELTA = struct.Struct('!h')
+RESPONSE = struct.Struct('!cH')
+# a warm engine starts another game with the new game clause instead of quitting, and we ack it in kind
+NewGameAction = namedtuple('NewGameAction', [])
+# actions are immutable, so clauses without fields share theirs
+CLAUSE_ACTIONS = {'F': FoldAction(), 'C': CallAction(), 'K': CheckAction()}
+BINARY_CLAUSE_ACTIONS = {ord(code): action for code, action in CLAUSE_ACTIONS.items()}
+ACTION_CODES = {FoldAction: 'F', CallAction: 'C', CheckAction: 'K', NewGameAction: 'N'}
+# responses of actions without an amount are encoded once
+TEXT_RESPONSES = {action: (code + '\n').encode() for action, code in ACTION_CODES.items()}
+BINARY_RESPONSES = {action: RESPONSE.pack(code.encode(), 0) for action, code in ACTION_CODES.items()}
 
 
 class Runner():
@@ -14,96 +37,279 @@ class Runner():
     Interacts with the engine.
     '''
 
-    def __init__(self, pokerbot, socketfile):
+    def __init__(self, pokerbot, socketfile, state_class=RoundState):
         self.pokerbot = pokerbot
         self.socketfile = socketfile
+        self.state_class = state_class
+        self.game_state = GameState(0, 0., 1)
+        self.round_state = None
+        self.active = 0
+        self.round_flag = True
+        self.new_game_flag = False
+        self.binary = False
+        self.stats = pokerbot.opponent_stats
+        # clauses are dispatched on their code, except for actions without fields, which are looked up directly
+        self.text_handlers = {'T': self.text_clock, 'P': self.text_seat, 'H': self.text_hand, 'R': self.text_raise,
+                              'B': self.text_board, 'O': self.text_reveal, 'D': self.text_delta,
+                              'N': self.text_new_game}
+        self.binary_handlers = {84: self.binary_clock, 80: self.binary_seat, 72: self.binary_hand,
+                                82: self.binary_raise, 66: self.binary_board, 79: self.binary_reveal,
+                                68: self.binary_delta, 78: self.binary_new_game}
 
     def receive(self):
         '''
         Generator for incoming messages from the engine.
         '''
+        readline = self.socketfile.readline
         while True:
-            packet = self.socketfile.readline().strip().split(' ')
+            packet = readline().strip().split(' ')
             if not packet:
                 break
             yield packet
 
+    def receive_binary(self):
+        '''
+        Generator for incoming binary messages from the engine.
+        '''
+        read = self.socketfile.buffer.read
+        unpack = FRAME.unpack
+        while True:
+            header = read(2)
+            if len(header) < 2:
+                break
+            yield read(unpack(header)[0])
+
     def send(self, action):
         '''
         Encodes an action and sends it to the engine.
         '''
-        if isinstance(action, FoldAction):
-            code = 'F'
-        elif isinstance(action, CallAction):
-            code = 'C'
-        elif isinstance(action, CheckAction):
-            code = 'K'
-        else:  # isinstance(action, RaiseAction)
-            code = 'R' + str(action.amount)
-        self.socketfile.write(code + '\n')
-        self.socketfile.flush()
+        if self.binary:
+            response = BINARY_RESPONSES.get(type(action))
+            if response is None:
+                response = RESPONSE.pack(b'R', min(max(action.amount, 0), 0xffff))
+        else:
+            response = TEXT_RESPONSES.get(type(action))
+            if response is None:
+                response = ('R' + str(action.amount) + '\n').encode()
+        # writing through the text layer would drop any later message it has already read ahead
+        self.socketfile.buffer.write(response)
+        self.socketfile.buffer.flush()
+
+    def new_round(self, hand):
+        '''
+        Starts a round in which we are dealt hand.
+        '''
+        hands = [[], []]
+        hands[self.active] = hand
+        pips = [SMALL_BLIND, BIG_BLIND]
+        stacks = [STARTING_STACK - SMALL_BLIND, STARTING_STACK - BIG_BLIND]
+        self.round_state = self.state_class(0, 0, pips, stacks, hands, [], None)
+        if self.round_flag:
+            self.pokerbot.handle_new_round(self.game_state, self.round_state, self.active)
+            self.round_flag = False
+
+    def reveal(self, opponent_hand):
+        '''
+        Reveals the opponent's hand at showdown.
+        '''
+        # backtrack
+        round_state = self.round_state.previous_state
+        revised_hands = list(round_state.hands)
+        revised_hands[1-self.active] = opponent_hand
+        # rebuild history
+        self.round_state = TerminalState([0, 0], round_state._replace(hands=revised_hands))
+        if self.stats is not None:
+            self.stats.reveal()
+
+    def round_over(self, delta):
+        '''
+        Ends the round with our bankroll changed by delta.
+        '''
+        assert isinstance(self.round_state, TerminalState)
+        deltas = [-delta, -delta]
+        deltas[self.active] = delta
+        self.round_state = TerminalState(deltas, self.round_state.previous_state)
+        if self.stats is not None:
+            self.stats.round_over(delta)
+        game_state = self.game_state
+        self.game_state = GameState(game_state.bankroll + delta, game_state.game_clock, game_state.round_num)
+        self.pokerbot.handle_round_over(self.game_state, self.round_state, self.active)
+        game_state = self.game_state
+        self.game_state = GameState(game_state.bankroll, game_state.game_clock, game_state.round_num + 1)
+        self.round_flag = True
+
+    def new_game(self):
+        '''
+        Starts another game, with a new instance of the pokerbot unless it handles new games itself.
+        '''
+        sys.stdout.flush()  # whatever we printed belongs in the last game's log
+        if type(self.pokerbot).handle_new_game is Bot.handle_new_game:
+            self.pokerbot = type(self.pokerbot)()
+        else:
+            self.pokerbot.handle_new_game()
+        self.stats = self.pokerbot.opponent_stats
+        self.game_state = GameState(0, 0., 1)
+        self.round_state = None
+        self.round_flag = True
+        self.new_game_flag = True
+
+    def respond(self):
+        '''
+        Returns the action to send back once a message has been applied.
+        '''
+        if self.new_game_flag:  # ack the new game
+            self.new_game_flag = False
+            return NewGameAction()
+        if self.round_flag:  # ack the engine
+            return CheckAction()
+        assert self.active == self.round_state.button % 2
+        return self.pokerbot.get_action(self.game_state, self.round_state, self.active)
+
+    def text_clock(self, clause):
+        game_state = self.game_state
+        self.game_state = tuple_new(GameState, (game_state.bankroll, float(clause[1:]), game_state.round_num))
+
+    def text_seat(self, clause):
+        self.active = int(clause[1:])
+
+    def text_hand(self, clause):
+        self.new_round(cards_from_strings(clause[1:].split(',')))
+
+    def text_raise(self, clause):
+        action = RaiseAction(int(clause[1:]))
+        if self.stats is not None:
+            self.stats.action(self.round_state, action, self.active)
+        self.round_state = self.round_state.proceed(action)
+
+    def text_board(self, clause):
+        self.round_state = self.round_state._replace(deck=cards_from_strings(clause[1:].split(',')))
+
+    def text_reveal(self, clause):
+        self.reveal(cards_from_strings(clause[1:].split(',')))
+
+    def text_delta(self, clause):
+        self.round_over(int(clause[1:]))
+
+    def text_new_game(self, clause):
+        self.new_game()
+
+    def handle_packet(self, packet):
+        '''
+        Updates the game tree with one message from the engine.
+        Returns the action to send back, or None once the game is over.
+        '''
+        handlers = self.text_handlers
+        for clause in packet:
+            code = clause[0]
+            action = CLAUSE_ACTIONS.get(code)
+            if action is not None:
+                if self.stats is not None:
+                    self.stats.action(self.round_state, action, self.active)
+                self.round_state = self.round_state.proceed(action)
+            elif code == 'Q':
+                return None
+            else:
+                handler = handlers.get(code)
+                if handler is not None:
+                    handler(clause)
+        return self.respond()
+
+    # binary clause handlers return the position of the next clause
+    def binary_clock(self, payload, i):
+        clock = CLOCK.unpack_from(payload, i + 1)[0] / 1000
+        game_state = self.game_state
+        self.game_state = tuple_new(GameState, (game_state.bankroll, clock, game_state.round_num))
+        return i + 5
+
+    def binary_seat(self, payload, i):
+        self.active = payload[i+1]
+        return i + 2
+
+    def binary_hand(self, payload, i):
+        self.new_round(cards_from_ints(payload[i+1:i+3]))
+        return i + 3
+
+    def binary_raise(self, payload, i):
+        action = RaiseAction(AMOUNT.unpack_from(payload, i + 1)[0])
+        if self.stats is not None:
+            self.stats.action(self.round_state, action, self.active)
+        self.round_state = self.round_state.proceed(action)
+        return i + 3
+
+    def binary_board(self, payload, i):
+        num_cards = payload[i+1]
+        self.round_state = self.round_state._replace(deck=cards_from_ints(payload[i+2:i+2+num_cards]))
+        return i + 2 + num_cards
+
+    def binary_reveal(self, payload, i):
+        self.reveal(cards_from_ints(payload[i+1:i+3]))
+        return i + 3
+
+    def binary_delta(self, payload, i):
+        self.round_over(DELTA.unpack_from(payload, i + 1)[0])
+        return i + 3
+
+    def binary_new_game(self, payload, i):
+        self.new_game()
+        return i + 1
+
+    def handle_binary_packet(self, payload):
+        '''
+        Updates the game tree with one binary message from the engine.
+        Returns the action to send back, or None once the game is over.
+        '''
+        handlers = self.binary_handlers
+        i = 0
+        end = len(payload)
+        while i < end:
+            code = payload[i]
+            action = BINARY_CLAUSE_ACTIONS.get(code)
+            if action is not None:
+                if self.stats is not None:
+                    self.stats.action(self.round_state, action, self.active)
+                self.round_state = self.round_state.proceed(action)
+                i += 1
+            else:
+                handler = handlers.get(code)
+                if handler is None:  # Q
+                    return None
+                i = handler(payload, i)
+        return self.respond()
 
     def run(self):
         '''
         Reconstructs the game tree based on the action history received from the engine.
         '''
-        game_state = GameState(0, 0., 1)
-        round_state = None
-        active = 0
-        round_flag = True
+        handle_packet = self.handle_packet
+        send = self.send
         for packet in self.receive():
-            for clause in packet:
-                if clause[0] == 'T':
-                    game_state = GameState(game_state.bankroll, float(clause[1:]), game_state.round_num)
-                elif clause[0] == 'P':
-                    active = int(clause[1:])
-                elif clause[0] == 'H':
-                    hands = [[], []]
-                    hands[active] = clause[1:].split(',')
-                    pips = [SMALL_BLIND, BIG_BLIND]
-                    stacks = [STARTING_STACK - SMALL_BLIND, STARTING_STACK - BIG_BLIND]
-                    round_state = RoundState(0, 0, pips, stacks, hands, [], None)
-                    if round_flag:
-                        self.pokerbot.handle_new_round(game_state, round_state, active)
-                        round_flag = False
-                elif clause[0] == 'F':
-                    round_state = round_state.proceed(FoldAction())
-                elif clause[0] == 'C':
-                    round_state = round_state.proceed(CallAction())
-                elif clause[0] == 'K':
-                    round_state = round_state.proceed(CheckAction())
-                elif clause[0] == 'R':
-                    round_state = round_state.proceed(RaiseAction(int(clause[1:])))
-                elif clause[0] == 'B':
-                    round_state = RoundState(round_state.button, round_state.street, round_state.pips, round_state.stacks,
-                                             round_state.hands, clause[1:].split(','), round_state.previous_state)
-                elif clause[0] == 'O':
-                    # backtrack
-                    round_state = round_state.previous_state
-                    revised_hands = list(round_state.hands)
-                    revised_hands[1-active] = clause[1:].split(',')
-                    # rebuild history
-                    round_state = RoundState(round_state.button, round_state.street, round_state.pips, round_state.stacks,
-                                             revised_hands, round_state.deck, round_state.previous_state)
-                    round_state = TerminalState([0, 0], round_state)
-                elif clause[0] == 'D':
-                    assert isinstance(round_state, TerminalState)
-                    delta = int(clause[1:])
-                    deltas = [-delta, -delta]
-                    deltas[active] = delta
-                    round_state = TerminalState(deltas, round_state.previous_state)
-                    game_state = GameState(game_state.bankroll + delta, game_state.game_clock, game_state.round_num)
-                    self.pokerbot.handle_round_over(game_state, round_state, active)
-                    game_state = GameState(game_state.bankroll, game_state.game_clock, game_state.round_num + 1)
-                    round_flag = True
-                elif clause[0] == 'Q':
+            if packet == [PROTOCOL_OFFER]:
+                # accept the binary protocol, which takes over the connection
+                self.socketfile.write(PROTOCOL_OFFER + '\n')
+                self.socketfile.flush()
+                self.binary = True
+                break
+            action = handle_packet(packet)
+            if action is None:
+                return
+            send(action)
+        if self.binary:
+            handle_binary_packet = self.handle_binary_packet
+            for payload in self.receive_binary():
+                action = handle_binary_packet(payload)
+                if action is None:
                     return
-            if round_flag:  # ack the engine
-                self.send(CheckAction())
-            else:
-                assert active == round_state.button % 2
-                action = self.pokerbot.get_action(game_state, round_state, active)
-                self.send(action)
+                send(action)
+
+
+def encode_action(action):
+    '''
+    Returns the socket encoding of an action.
+    '''
+    code = ACTION_CODES.get(type(action))
+    if code is None:  # RaiseAction
+        return 'R' + str(action.amount)
+    return code
 
 
 def parse_args():
@@ -112,21 +318,51 @@ def parse_args():
     '''
     parser = argparse.ArgumentParser(prog='python3 player.py')
     parser.add_argument('--host', type=str, default='localhost', help='Host to connect to, defaults to localhost')
-    parser.add_argument('port', type=int, help='Port on host to connect to')
-    return parser.parse_args()
+    parser.add_argument('--unix', type=str, default=None, help='Unix domain socket path to connect to instead of a port')
+    parser.add_argument('--fd', type=int, default=None, help='Inherited connected socket file descriptor to use instead of a port')
+    parser.add_argument('port', type=int, nargs='?', default=None, help='Port on host to connect to')
+    args = parser.parse_args()
+    if args.port is None and args.unix is None and args.fd is None:
+        parser.error('one of port, --unix or --fd is required')
+    return args
+
+def connect(args):
+    '''
+    Returns a socket connected to the engine over the transport named by args.
+    '''
+    if args.fd is not None:
+        return socket.socket(fileno=args.fd)
+    if args.unix is not None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(args.unix)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+    sock = socket.create_connection((args.host, args.port))
+    # acks and actions may be written back to back, which Nagle's algorithm would delay
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    return sock
 
-def run_bot(pokerbot, args):
+def run_bot(pokerbot, args, state_class=RoundState):
     '''
     Runs the pokerbot.
+    Pass state_class=CompactRoundState for round states which do not link to their previous states.
     '''
     assert isinstance(pokerbot, Bot)
     try:
-        sock = socket.create_connection((args.host, args.port))
+        sock = connect(args)
     except OSError:
-        print('Could not connect to {}:{}'.format(args.host, args.port))
+        if args.fd is not None:
+            print('Could not use socket file descriptor {}'.format(args.fd))
+        elif args.unix is not None:
+            print('Could not connect to {}'.format(args.unix))
+        else:
+            print('Could not connect to {}:{}'.format(args.host, args.port))
         return
     socketfile = sock.makefile('rw')
-    runner = Runner(pokerbot, socketfile)
+    runner = Runner(pokerbot, socketfile, state_class)
     runner.run()
     socketfile.close()
     sock.close()
@@ -0,0 +1,165 @@
+'''
+Plays many independent rounds in lockstep, with the same rules as RoundState in engine.py,
+holding each field of every round's state in one numpy array rather than a state object per action.
+'''
+import numpy as np
+from .equity import evaluate, permute, sample_perms
+from .states import STARTING_STACK, BIG_BLIND, SMALL_BLIND
+
+# action codes, which are also the columns of RoundBatch.legal_actions
+FOLD, CALL, CHECK, RAISE = range(4)
+
+
+class RoundBatch():
+    '''
+    Rounds dealt under value permutations, one per row of perms, or one for all rounds if perms is a single
+    permutation, or drawn from the prior for each round if perms is None.
+    Fields are indexed by round first, and by seat for pips, stacks, hands and deltas,
+    where seat 0 posts the small blind. Both hands are scored when the rounds are dealt.
+    '''
+
+    def __init__(self, num_rounds, perms=None, rng=None):
+        rng = np.random.default_rng() if rng is None else rng
+        self.num_rounds = num_rounds
+        dealt = np.argsort(rng.random((num_rounds, 52)), axis=1)[:, :9]
+        self.hands = dealt[:, :4].reshape(num_rounds, 2, 2)
+        self.board = dealt[:, 4:]
+        if perms is None:
+            self.perms = sample_perms(num_rounds, rng)
+        else:
+            self.perms = np.broadcast_to(np.asarray(perms), (num_rounds, 13))
+        self.scores = np.stack([evaluate(permute(np.hstack([self.hands[:, seat], self.board]), self.perms))
+                                for seat in (0, 1)], axis=1)
+        self.button = np.zeros(num_rounds, dtype=np.int64)
+        self.street = np.zeros(num_rounds, dtype=np.int64)
+        self.pips = np.tile([SMALL_BLIND, BIG_BLIND], (num_rounds, 1))
+        self.stacks = np.tile([STARTING_STACK - SMALL_BLIND, STARTING_STACK - BIG_BLIND], (num_rounds, 1))
+        self.deltas = np.zeros((num_rounds, 2), dtype=np.int64)
+        self.done = np.zeros(num_rounds, dtype=bool)
+
+    def active(self):
+        '''
+        Returns the seat to act in each round.
+        '''
+        return self.button % 2
+
+    def continue_costs(self, rows):
+        '''
+        Returns the active player's cost to call in some rounds.
+        '''
+        active = self.button[rows] % 2
+        return self.pips[rows, 1-active] - self.pips[rows, active]
+
+    def legal_actions(self):
+        '''
+        Returns whether each action is legal in each round, with a column per action code.
+        Nothing is legal once a round is over.
+        '''
+        rows = np.arange(self.num_rounds)
+        active = self.button % 2
+        continue_cost = self.continue_costs(rows)
+        own_stack = self.stacks[rows, active]
+        other_stack = self.stacks[rows, 1-active]
+        facing = continue_cost > 0
+        legal = np.zeros((self.num_rounds, 4), dtype=bool)
+        legal[:, FOLD] = facing
+        legal[:, CALL] = facing
+        legal[:, CHECK] = ~facing
+        # raising is only allowed if both players can afford it
+        legal[:, RAISE] = np.where(facing, (continue_cost != own_stack) & (other_stack != 0),
+                                   (own_stack != 0) & (other_stack != 0))
+        legal[self.done] = False
+        return legal
+
+    def raise_bounds(self):
+        '''
+        Returns the minimum and maximum legal raise in each round.
+        '''
+        rows = np.arange(self.num_rounds)
+        active = self.button % 2
+        continue_cost = self.continue_costs(rows)
+        max_contribution = np.minimum(self.stacks[rows, active], self.stacks[rows, 1-active] + continue_cost)
+        min_contribution = np.minimum(max_contribution, continue_cost + np.maximum(continue_cost, BIG_BLIND))
+        return self.pips[rows, active] + min_contribution, self.pips[rows, active] + max_contribution
+
+    def proceed(self, actions, amounts=None):
+        '''
+        Advances every round which is not over by the action of its active player, given as action codes
+        and the amounts raised to. Illegal actions and raises out of bounds are replaced by a check,
+        or a fold if checking is illegal, as the engine does.
+        '''
+        actions = np.asarray(actions)
+        amounts = np.zeros(self.num_rounds, dtype=np.int64) if amounts is None else np.asarray(amounts)
+        rows = np.arange(self.num_rounds)
+        legal = self.legal_actions()
+        min_raise, max_raise = self.raise_bounds()
+        valid = legal[rows, actions] & ((actions != RAISE) | ((min_raise <= amounts) & (amounts <= max_raise)))
+        actions = np.where(valid, actions, np.where(legal[:, CHECK], CHECK, FOLD))
+        active = self.button % 2
+        live = ~self.done
+        folds = np.flatnonzero(live & (actions == FOLD))
+        blind_calls = np.flatnonzero(live & (actions == CALL) & (self.button == 0))
+        calls = np.flatnonzero(live & (actions == CALL) & (self.button > 0))
+        checks = np.flatnonzero(live & (actions == CHECK))
+        raises = np.flatnonzero(live & (actions == RAISE))
+        # both players acted
+        check_ends = ((self.street[checks] == 0) & (self.button[checks] > 0)) | (self.button[checks] > 1)
+        self.deltas[folds, 0] = np.where(active[folds] == 0, self.stacks[folds, 0] - STARTING_STACK,
+                                         STARTING_STACK - self.stacks[folds, 1])
+        self.deltas[folds, 1] = -self.deltas[folds, 0]
+        self.done[folds] = True
+        # sb calls bb
+        self.pips[blind_calls] = BIG_BLIND
+        self.stacks[blind_calls] = STARTING_STACK - BIG_BLIND
+        self.button[blind_calls] = 1
+        for acted, amount in ((calls, self.pips[calls, 1-active[calls]]), (raises, amounts[raises])):
+            contribution = amount - self.pips[acted, active[acted]]
+            self.stacks[acted, active[acted]] -= contribution
+            self.pips[acted, active[acted]] += contribution
+            self.button[acted] += 1
+        self.button[checks] += 1
+        self.proceed_street(np.concatenate([calls, checks[check_ends]]))
+
+    def proceed_street(self, rows):
+        '''
+        Resets the players' pips and advances some rounds to their next round of betting,
+        or to the showdown after the river.
+        '''
+        showdowns = rows[self.street[rows] == 5]
+        self.showdown(showdowns)
+        rows = rows[self.street[rows] != 5]
+        self.button[rows] = 1
+        self.street[rows] = np.where(self.street[rows] == 0, 3, self.street[rows] + 1)
+        self.pips[rows] = 0
+
+    def showdown(self, rows):
+        '''
+        Compares the players' hands in some rounds and computes payoffs.
+        '''
+        score0, score1 = self.scores[rows, 0], self.scores[rows, 1]
+        stacks = self.stacks[rows]
+        delta = np.where(score0 > score1, STARTING_STACK - stacks[:, 1],
+                         np.where(score0 < score1, stacks[:, 0] - STARTING_STACK, (stacks[:, 0] - stacks[:, 1]) // 2))
+        self.deltas[rows, 0] = delta
+        self.deltas[rows, 1] = -delta
+        self.done[rows] = True
+
+    def play(self, policies):
+        '''
+        Plays every round to its end and returns the deltas, where policies[seat] chooses the actions of seat.
+        A policy is called as policy(batch, rows) with the indices of the rounds in which its seat is to act,
+        and returns the action codes and the amounts raised to in those rounds, which may be None if it never raises.
+        '''
+        while not self.done.all():
+            actions = np.zeros(self.num_rounds, dtype=np.int64)
+            amounts = np.zeros(self.num_rounds, dtype=np.int64)
+            active = self.button % 2
+            for seat, policy in enumerate(policies):
+                rows = np.flatnonzero(~self.done & (active == seat))
+                if len(rows):
+                    seat_actions, seat_amounts = policy(self, rows)
+                    actions[rows] = seat_actions
+                    if seat_amounts is not None:
+                        amounts[rows] = seat_amounts
+            self.proceed(actions, amounts)
+        return self.deltas
@@ -0,0 +1,419 @@
+'''
+An offline solver for the betting tree defined by RoundState, under an abstraction which only raises
+by fractions of the pot or all in, and which buckets hands by their equity on each street.
+The tree is flattened into numpy node and edge arrays and solved with CFR+ over all buckets at once,
+and the average strategy is written to a file which StrategyTable memory-maps for lookups in get_action.
+
+Run python3 -m skeleton.solver -o strategy.bin in the bot directory, which takes a few minutes.
+'''
+import argparse
+import json
+import numpy as np
+from .actions import FoldAction, CallAction, CheckAction, RaiseAction
+from .states import RoundState, TerminalState, STARTING_STACK, BIG_BLIND, SMALL_BLIND
+from .states import FOLD_CODE, CALL_CODE, CHECK_CODE
+from .equity import evaluate, permute, sample_perms, draw_cards, preflop_equity
+
+STREETS = [0, 3, 4, 5]
+DECISION, FOLD, SHOWDOWN = range(3)
+BET_FRACTIONS = [0.5, 1.]
+NUM_BUCKETS = 16
+# strategy files start with STRATEGY_MAGIC, a u32 header length and a JSON header locating each array
+STRATEGY_MAGIC = b'PBSTRAT1'
+ALIGNMENT = 64
+# deals are bucketed ROLLOUT_CHUNK at a time, to bound the memory of their rollouts
+ROLLOUT_CHUNK = 1024
+
+
+def state_key(round_state):
+    '''
+    Returns the key under which states are merged in the transposition table: the street, the button,
+    which only matters up to whether both players have acted and whose turn it is, the pips and the stacks.
+    '''
+    button = round_state.button if round_state.button < 2 else 2 + round_state.button % 2
+    return (round_state.street, button) + tuple(round_state.pips) + tuple(round_state.stacks)
+
+
+def abstract_actions(round_state, bet_fractions):
+    '''
+    Returns the actions of the abstraction in a state: folding if legal, checking or calling,
+    and raising by each fraction of the pot after calling, or all in.
+    '''
+    legal_actions = round_state.legal_actions()
+    actions = [FoldAction()] if FoldAction in legal_actions else []
+    actions.append(CheckAction() if CheckAction in legal_actions else CallAction())
+    if RaiseAction in legal_actions:
+        active = round_state.button % 2
+        min_raise, max_raise = round_state.raise_bounds()
+        continue_cost = round_state.pips[1-active] - round_state.pips[active]
+        pot = 2 * STARTING_STACK - round_state.stacks[0] - round_state.stacks[1]
+        amounts = {max_raise}
+        for fraction in bet_fractions:
+            amount = round_state.pips[active] + continue_cost + int(round(fraction * (pot + continue_cost)))
+            amounts.add(min(max(amount, min_raise), max_raise))
+        actions += [RaiseAction(amount) for amount in sorted(amounts)]
+    return actions
+
+
+def action_code(action):
+    '''
+    Returns the history code of an action, as in CompactRoundState.
+    '''
+    if isinstance(action, RaiseAction):
+        return action.amount
+    return {FoldAction: FOLD_CODE, CallAction: CALL_CODE, CheckAction: CHECK_CODE}[type(action)]
+
+
+class GameTree():
+    '''
+    The abstract betting tree flattened into arrays, with identical states merged.
+    Nodes are decisions, folds or showdowns, with the acting or folding player and each player's contribution.
+    Edges run from a decision to the node its action leads to, and are grouped by their decision.
+    An edge which starts the next street carries the index of the street it leaves, and -1 otherwise.
+    Levels are longest distances from the root, so every edge leads to a higher level.
+    '''
+
+    def __init__(self, bet_fractions=BET_FRACTIONS):
+        self.bet_fractions = list(bet_fractions)
+        pips = [SMALL_BLIND, BIG_BLIND]
+        stacks = [STARTING_STACK - SMALL_BLIND, STARTING_STACK - BIG_BLIND]
+        root = RoundState(0, 0, pips, stacks, [[], []], [], None)
+        nodes = {state_key(root): 0}
+        kinds, players, contributions, keys = [DECISION], [0], [[SMALL_BLIND, BIG_BLIND]], [state_key(root)]
+        edges = []
+        frontier = [root]
+        for state in frontier:  # grows as new states are found
+            parent = nodes[state_key(state)]
+            for action in abstract_actions(state, self.bet_fractions):
+                child = state.proceed(action)
+                if isinstance(child, TerminalState):
+                    previous_state = child.previous_state
+                    if isinstance(action, FoldAction):
+                        kind, player = FOLD, state.button % 2
+                    else:
+                        kind, player = SHOWDOWN, -1
+                    key = (kind, player) + tuple(previous_state.stacks)
+                else:
+                    previous_state = child
+                    kind, player, key = DECISION, child.button % 2, state_key(child)
+                if key not in nodes:
+                    nodes[key] = len(kinds)
+                    kinds.append(kind)
+                    players.append(player)
+                    contributions.append([STARTING_STACK - stack for stack in previous_state.stacks])
+                    keys.append(key if kind == DECISION else None)
+                    if kind == DECISION:
+                        frontier.append(child)
+                crossing = STREETS.index(state.street) if kind == DECISION and child.street != state.street else -1
+                edges.append((parent, nodes[key], action_code(action), crossing))
+        self.kinds = np.array(kinds)
+        self.players = np.array(players)
+        self.contributions = np.array(contributions)
+        self.decisions = np.flatnonzero(self.kinds == DECISION)
+        self.keys = np.array([keys[node] for node in self.decisions], dtype=np.int16)
+        self.parents, self.children, self.codes, self.crossings = (np.array(column) for column in zip(*edges))
+        # a merged state may be found from one parent before another, deeper one, so levels are set in topological order
+        self.levels = np.zeros(len(kinds), dtype=np.int64)
+        unseen_parents = np.bincount(self.children, minlength=len(kinds))
+        children = [[] for _ in kinds]
+        for parent, child in zip(self.parents, self.children):
+            children[parent].append(child)
+        ready = [0]
+        for parent in ready:  # grows as the last parent of each node is reached
+            for child in children[parent]:
+                self.levels[child] = max(self.levels[child], self.levels[parent] + 1)
+                unseen_parents[child] -= 1
+                if unseen_parents[child] == 0:
+                    ready.append(child)
+        self.num_actions = np.bincount(self.parents, minlength=len(kinds))
+
+
+def rollout_equity(hands, boards, num_rollouts, rng):
+    '''
+    Estimates the equity of each hand on its board against a random hand with num_rollouts rollouts,
+    each under its own value permutation drawn from the prior, as estimate_equity does.
+    '''
+    num_deals, num_board_cards = boards.shape
+    rows = np.repeat(np.arange(num_deals), num_rollouts)
+    excluded = np.zeros((len(rows), 52), dtype=bool)
+    samples = np.arange(len(rows))[:, None]
+    excluded[samples, hands[rows]] = True
+    excluded[samples, boards[rows]] = True
+    drawn = draw_cards(len(rows), excluded, 7 - num_board_cards, rng)
+    full_boards = np.hstack([boards[rows], drawn[:, 2:]])
+    perms = sample_perms(len(rows), rng)
+    scores = evaluate(permute(np.hstack([hands[rows], full_boards]), perms))
+    opponent_scores = evaluate(permute(np.hstack([drawn[:, :2], full_boards]), perms))
+    wins = (scores > opponent_scores) + 0.5 * (scores == opponent_scores)
+    return wins.reshape(num_deals, num_rollouts).mean(axis=1)
+
+
+def bucket_hands(num_buckets=NUM_BUCKETS, num_deals=20000, num_rollouts=64, rng=None):
+    '''
+    Deals random rounds under value permutations drawn from the prior and buckets both hands on every street
+    by equal shares of their equity against a random hand, preflop_equity preflop and rollouts after.
+    Returns the equity edges between buckets on each street, the distribution of preflop buckets,
+    the chance of each bucket moving to each bucket on the next street, and the equity of each river
+    bucket against each, which is 1 for sure wins and 0.5 for splits.
+    '''
+    rng = np.random.default_rng() if rng is None else rng
+    dealt = np.argsort(rng.random((num_deals, 52)), axis=1)[:, :9]
+    hands = [dealt[:, 0:2], dealt[:, 2:4]]
+    board = dealt[:, 4:]
+    equities = np.zeros((len(STREETS), 2, num_deals))
+    for seat in (0, 1):
+        equities[0, seat] = [preflop_equity(hand) for hand in hands[seat]]
+        for street_index, street in enumerate(STREETS[1:], 1):
+            for start in range(0, num_deals, ROLLOUT_CHUNK):
+                chunk = slice(start, start + ROLLOUT_CHUNK)
+                equities[street_index, seat, chunk] = rollout_equity(hands[seat][chunk], board[chunk, :street],
+                                                                     num_rollouts, rng)
+    quantiles = np.linspace(0., 1., num_buckets + 1)[1:-1]
+    edges = np.array([np.quantile(equities[street_index], quantiles) for street_index in range(len(STREETS))])
+    buckets = np.array([np.searchsorted(edges[street_index], equities[street_index], side='right')
+                        for street_index in range(len(STREETS))])
+    initial = np.bincount(buckets[0].ravel(), minlength=num_buckets) / buckets[0].size
+    transitions = np.zeros((len(STREETS) - 1, num_buckets, num_buckets))
+    for street_index in range(len(STREETS) - 1):
+        np.add.at(transitions[street_index], (buckets[street_index].ravel(), buckets[street_index + 1].ravel()), 1.)
+    totals = transitions.sum(axis=2, keepdims=True)
+    transitions = np.where(totals > 0., transitions / np.maximum(totals, 1.), 1. / num_buckets)
+    perms = sample_perms(num_deals, rng)
+    scores = [evaluate(permute(np.hstack([hands[seat], board]), perms)) for seat in (0, 1)]
+    wins = np.zeros((num_buckets, num_buckets))
+    counts = np.zeros((num_buckets, num_buckets))
+    for seat in (0, 1):
+        first, second = buckets[-1, seat], buckets[-1, 1-seat]
+        result = (scores[seat] > scores[1-seat]) + 0.5 * (scores[seat] == scores[1-seat])
+        np.add.at(wins, (first, second), result)
+        np.add.at(counts, (first, second), 1.)
+    showdown = np.where(counts > 0., wins / np.maximum(counts, 1.), 0.5)
+    return edges, initial, transitions, showdown
+
+
+class CFRSolver():
+    '''
+    Runs CFR+ on a GameTree over hand buckets, updating every node and bucket of a level at once.
+    Each node keeps a matrix of the value to player 0 of every pair of buckets under the current strategy,
+    which does not depend on the path to it, so merged states are valued once for all their parents.
+    '''
+
+    def __init__(self, tree, initial, transitions, showdown):
+        self.tree = tree
+        self.initial = initial
+        self.transitions = transitions
+        num_buckets = len(initial)
+        num_edges = len(tree.parents)
+        self.regrets = np.zeros((num_edges, num_buckets))
+        self.strategy_sums = np.zeros((num_edges, num_buckets))
+        self.strategy = np.ones((num_edges, num_buckets)) / tree.num_actions[tree.parents][:, None]
+        self.iterations = 0
+        # terminal values to player 0, where showdowns are won with the chance of the row bucket against the column
+        self.terminal_values = np.zeros((len(tree.kinds), num_buckets, num_buckets))
+        folds = tree.kinds == FOLD
+        losses = np.where(tree.players[folds] == 0, -tree.contributions[folds, 0], tree.contributions[folds, 1])
+        self.terminal_values[folds] = losses[:, None, None]
+        showdowns = tree.kinds == SHOWDOWN
+        pots = tree.contributions[showdowns]
+        self.terminal_values[showdowns] = (showdown[None] * pots[:, 1, None, None] -
+                                           (1. - showdown[None]) * pots[:, 0, None, None])
+        self.level_edges = [np.flatnonzero(tree.levels[tree.parents] == level)
+                            for level in range(tree.levels.max())]
+
+    def cross(self, edges, matrices, crossings):
+        '''
+        Carries values from the start of the next street back through the bucket transitions of each edge.
+        '''
+        crossed = crossings >= 0
+        if crossed.any():
+            transitions = self.transitions[crossings[crossed]]
+            matrices[crossed] = np.einsum('eab,ebc,edc->ead', transitions, matrices[crossed], transitions)
+        return matrices
+
+    def iterate(self):
+        '''
+        Runs one iteration of CFR+, updating both players at once, and returns the value of the current strategy.
+        '''
+        tree = self.tree
+        num_nodes = len(tree.kinds)
+        self.iterations += 1
+        reaches = np.zeros((2, num_nodes, len(self.initial)))
+        reaches[:, 0] = self.initial
+        for edges in self.level_edges:
+            parents = tree.parents[edges]
+            actors = tree.players[parents]
+            reach = reaches[:, parents]
+            reach[actors, np.arange(len(edges))] *= self.strategy[edges]
+            crossings = tree.crossings[edges]
+            crossed = crossings >= 0
+            if crossed.any():
+                reach[:, crossed] = np.einsum('peb,ebc->pec', reach[:, crossed], self.transitions[crossings[crossed]])
+            for player in (0, 1):
+                np.add.at(reaches[player], tree.children[edges], reach[player])
+        values = self.terminal_values.copy()
+        node_values = np.zeros((num_nodes, len(self.initial)))
+        action_values = np.zeros(self.regrets.shape)
+        for edges in reversed(self.level_edges):
+            parents = tree.parents[edges]
+            matrices = self.cross(edges, values[tree.children[edges]], tree.crossings[edges])
+            strategy = self.strategy[edges]
+            first = tree.players[parents] == 0
+            second = ~first
+            action_values[edges[first]] = np.einsum('eab,eb->ea', matrices[first], reaches[1, parents[first]])
+            action_values[edges[second]] = -np.einsum('eab,ea->eb', matrices[second], reaches[0, parents[second]])
+            matrices[first] *= strategy[first][:, :, None]
+            matrices[second] *= strategy[second][:, None, :]
+            np.add.at(values, parents, matrices)
+            np.add.at(node_values, parents, strategy * action_values[edges])
+        parents = tree.parents
+        self.regrets = np.maximum(self.regrets + action_values - node_values[parents], 0.)
+        own_reaches = reaches[tree.players[parents], parents]
+        self.strategy_sums += self.iterations * own_reaches * self.strategy
+        totals = np.zeros(node_values.shape)
+        np.add.at(totals, parents, self.regrets)
+        totals = totals[parents]
+        self.strategy = np.where(totals > 0., self.regrets / np.where(totals > 0., totals, 1.),
+                                 1. / tree.num_actions[parents][:, None])
+        return self.initial @ values[0] @ self.initial
+
+    def average_strategy(self):
+        '''
+        Returns the average strategy, with its probability of each edge in each bucket.
+        '''
+        tree = self.tree
+        totals = np.zeros((len(tree.kinds), len(self.initial)))
+        np.add.at(totals, tree.parents, self.strategy_sums)
+        totals = totals[tree.parents]
+        return np.where(totals > 0., self.strategy_sums / np.where(totals > 0., totals, 1.),
+                        1. / tree.num_actions[tree.parents][:, None])
+
+
+def write_strategy(path, tree, edges, strategy):
+    '''
+    Writes a tree's decision keys, edges and average strategy quantized to bytes, along with the bucket edges.
+    '''
+    decision_index = np.full(len(tree.kinds), -1)
+    decision_index[tree.decisions] = np.arange(len(tree.decisions))
+    order = np.argsort(decision_index[tree.parents], kind='stable')
+    edge_starts = np.searchsorted(decision_index[tree.parents][order], np.arange(len(tree.decisions) + 1))
+    arrays = {
+        'keys': tree.keys,
+        'edge_starts': edge_starts.astype(np.int32),
+        'codes': tree.codes[order].astype(np.int16),
+        'strategy': np.round(strategy[order] * 255).astype(np.uint8),
+        'bucket_edges': edges.astype(np.float32),
+    }
+    header = {'bet_fractions': tree.bet_fractions, 'num_buckets': strategy.shape[1], 'arrays': {}}
+    offset = 0
+    for name, array in arrays.items():
+        header['arrays'][name] = {'dtype': array.dtype.str, 'shape': array.shape, 'offset': offset}
+        offset += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+    header_bytes = json.dumps(header).encode()
+    start = -(-(len(STRATEGY_MAGIC) + 4 + len(header_bytes)) // ALIGNMENT) * ALIGNMENT
+    with open(path, 'wb') as strategy_file:
+        strategy_file.write(STRATEGY_MAGIC + len(header_bytes).to_bytes(4, 'big') + header_bytes)
+        for name, array in arrays.items():
+            strategy_file.seek(start + header['arrays'][name]['offset'])
+            strategy_file.write(array.tobytes())
+        strategy_file.truncate(start + offset)
+
+
+class StrategyTable():
+    '''
+    Looks up the actions of a strategy file written by the solver, which is memory-mapped rather than read.
+    States the abstraction never reaches, after raises of other sizes, are looked up at the nearest state
+    on the same street with the same player to act.
+    '''
+
+    def __init__(self, path):
+        with open(path, 'rb') as strategy_file:
+            magic = strategy_file.read(len(STRATEGY_MAGIC))
+            if magic != STRATEGY_MAGIC:
+                raise ValueError(path + ' is not a strategy file')
+            header_size = int.from_bytes(strategy_file.read(4), 'big')
+            header = json.loads(strategy_file.read(header_size).decode())
+        start = -(-(len(STRATEGY_MAGIC) + 4 + header_size) // ALIGNMENT) * ALIGNMENT
+        self.bet_fractions = header['bet_fractions']
+        self.num_buckets = header['num_buckets']
+        for name, layout in header['arrays'].items():
+            setattr(self, name, np.memmap(path, dtype=np.dtype(layout['dtype']), mode='r',
+                                          offset=start + layout['offset'], shape=tuple(layout['shape'])))
+        self.index = {tuple(key): node for node, key in enumerate(self.keys.tolist())}
+
+    def node(self, round_state):
+        '''
+        Returns the index of the decision a state is looked up at.
+        '''
+        key = state_key(round_state)
+        node = self.index.get(key)
+        if node is None:
+            keys = self.keys
+            candidates = np.flatnonzero((keys[:, 0] == key[0]) & (keys[:, 1] % 2 == key[1] % 2))
+            distances = np.abs(keys[candidates, 2:].astype(np.int64) - key[2:]).sum(axis=1)
+            node = candidates[distances.argmin()]
+        return node
+
+    def bucket(self, street, equity):
+        '''
+        Returns the bucket of a hand with an equity against a random hand on a street.
+        Use preflop_equity preflop and estimate_equity after, both from equity.py.
+        '''
+        return int(np.searchsorted(self.bucket_edges[STREETS.index(street)], equity, side='right'))
+
+    def probabilities(self, round_state, equity):
+        '''
+        Returns the history codes of the actions at a state's decision and the probability of each.
+        '''
+        node = self.node(round_state)
+        start, end = self.edge_starts[node], self.edge_starts[node + 1]
+        weights = self.strategy[start:end, self.bucket(round_state.street, equity)].astype(float)
+        total = weights.sum()
+        return self.codes[start:end], weights / total if total > 0 else np.full(end - start, 1. / (end - start))
+
+    def get_action(self, round_state, equity, rng=None):
+        '''
+        Draws an action from the strategy, made legal in the state: raises are clamped to its raise bounds,
+        and checks and calls swapped if the state it was looked up at differs.
+        '''
+        rng = np.random.default_rng() if rng is None else rng
+        codes, probabilities = self.probabilities(round_state, equity)
+        code = int(codes[rng.choice(len(codes), p=probabilities)])
+        legal_actions = round_state.legal_actions()
+        if code >= 0 and RaiseAction in legal_actions:
+            min_raise, max_raise = round_state.raise_bounds()
+            return RaiseAction(min(max(code, min_raise), max_raise))
+        if code == FOLD_CODE and FoldAction in legal_actions:
+            return FoldAction()
+        return CheckAction() if CheckAction in legal_actions else CallAction()
+
+
+def parse_args():
+    '''
+    Parses solver arguments.
+    '''
+    parser = argparse.ArgumentParser(prog='python3 -m skeleton.solver')
+    parser.add_argument('-o', '--output', type=str, default='strategy.bin', help='Strategy file to write')
+    parser.add_argument('-b', '--buckets', type=int, default=NUM_BUCKETS, help='Hand buckets on each street')
+    parser.add_argument('--bet-sizes', type=float, nargs='+', default=BET_FRACTIONS,
+                        help='Raises as fractions of the pot after calling, besides all in')
+    parser.add_argument('-i', '--iterations', type=int, default=1000, help='CFR+ iterations')
+    parser.add_argument('--deals', type=int, default=20000, help='Random deals to bucket hands with')
+    parser.add_argument('--rollouts', type=int, default=64, help='Rollouts per hand to estimate equity with')
+    parser.add_argument('-s', '--seed', type=int, default=None, help='Seed for the deals and rollouts')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    ARGS = parse_args()
+    TREE = GameTree(ARGS.bet_sizes)
+    print('{} decisions, {} edges, {} levels'.format(len(TREE.decisions), len(TREE.parents), TREE.levels.max() + 1))
+    EDGES, INITIAL, TRANSITIONS, SHOWDOWN_EQUITY = bucket_hands(ARGS.buckets, ARGS.deals, ARGS.rollouts,
+                                                               np.random.default_rng(ARGS.seed))
+    SOLVER = CFRSolver(TREE, INITIAL, TRANSITIONS, SHOWDOWN_EQUITY)
+    for ITERATION in range(1, ARGS.iterations + 1):
+        VALUE = SOLVER.iterate()
+        if ITERATION % 100 == 0 or ITERATION == ARGS.iterations:
+            print('Iteration {}, small blind value {:.3f}, regret {:.3f}'.format(
+                ITERATION, VALUE, SOLVER.regrets.sum() / ITERATION))
+    write_strategy(ARGS.output, TREE, EDGES, SOLVER.average_strategy())
+    print('Wrote', ARGS.output)
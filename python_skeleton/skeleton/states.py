@@ -2,10 +2,14 @@
 Encapsulates game and round state information for the player.
 '''
 from collections import namedtuple
+from array import array
 from .actions import FoldAction, CallAction, CheckAction, RaiseAction
+from .cards import card_ints
 
 GameState = namedtuple('GameState', ['bankroll', 'game_clock', 'round_num'])
 TerminalState = namedtuple('TerminalState', ['deltas', 'previous_state'])
+# namedtuple constructors go through a Python-level __new__, which building the tuple directly skips
+tuple_new = tuple.__new__
 
 NUM_ROUNDS = 1000
 STARTING_STACK = 200
@@ -18,6 +22,20 @@ class RoundState(namedtuple('_RoundState', ['button', 'street', 'pips', 'stacks'
     Encodes the game tree for one round of poker.
     '''
 
+    @property
+    def int_hands(self):
+        '''
+        The players' hands as integer cards, see cards.py.
+        '''
+        return [card_ints(hand) for hand in self.hands]
+
+    @property
+    def int_deck(self):
+        '''
+        The board cards as integer cards, see cards.py.
+        '''
+        return card_ints(self.deck)
+
     def showdown(self):
         '''
         Compares the players' hands and computes payoffs.
@@ -56,7 +74,7 @@ class RoundState(namedtuple('_RoundState', ['button', 'street', 'pips', 'stacks'
         if self.street == 5:
             return self.showdown()
         new_street = 3 if self.street == 0 else self.street + 1
-        return RoundState(1, new_street, [0, 0], self.stacks, self.hands, self.deck, self)
+        return tuple_new(RoundState, (1, new_street, [0, 0], self.stacks, self.hands, self.deck, self))
 
     def proceed(self, action):
         '''
@@ -65,27 +83,185 @@ class RoundState(namedtuple('_RoundState', ['button', 'street', 'pips', 'stacks'
         active = self.button % 2
         if isinstance(action, FoldAction):
             delta = self.stacks[0] - STARTING_STACK if active == 0 else STARTING_STACK - self.stacks[1]
-            return TerminalState([delta, -delta], self)
+            return tuple_new(TerminalState, ([delta, -delta], self))
         if isinstance(action, CallAction):
             if self.button == 0:  # sb calls bb
-                return RoundState(1, 0, [BIG_BLIND] * 2, [STARTING_STACK - BIG_BLIND] * 2, self.hands, self.deck, self)
+                return tuple_new(RoundState, (1, 0, [BIG_BLIND] * 2, [STARTING_STACK - BIG_BLIND] * 2,
+                                              self.hands, self.deck, self))
             # both players acted
             new_pips = list(self.pips)
             new_stacks = list(self.stacks)
             contribution = new_pips[1-active] - new_pips[active]
             new_stacks[active] -= contribution
             new_pips[active] += contribution
-            state = RoundState(self.button + 1, self.street, new_pips, new_stacks, self.hands, self.deck, self)
+            state = tuple_new(RoundState, (self.button + 1, self.street, new_pips, new_stacks,
+                                           self.hands, self.deck, self))
             return state.proceed_street()
         if isinstance(action, CheckAction):
             if (self.street == 0 and self.button > 0) or self.button > 1:  # both players acted
                 return self.proceed_street()
             # let opponent act
-            return RoundState(self.button + 1, self.street, self.pips, self.stacks, self.hands, self.deck, self)
+            return tuple_new(RoundState, (self.button + 1, self.street, self.pips, self.stacks,
+                                          self.hands, self.deck, self))
+        # isinstance(action, RaiseAction)
+        new_pips = list(self.pips)
+        new_stacks = list(self.stacks)
+        contribution = action.amount - new_pips[active]
+        new_stacks[active] -= contribution
+        new_pips[active] += contribution
+        return tuple_new(RoundState, (self.button + 1, self.street, new_pips, new_stacks,
+                                      self.hands, self.deck, self))
+
+
+# CompactRoundState history encoding:
+#
+# Each action is stored as one signed 16-bit code, the amount raised to for a RaiseAction
+# and a negative code otherwise.
+FOLD_CODE = -1
+CALL_CODE = -2
+CHECK_CODE = -3
+
+
+class CompactRoundState():
+    '''
+    Encodes the game tree for one round of poker, like RoundState.
+    Rather than each state referring to the state before it, the actions of the round are
+    appended to one history array shared by all of its states.
+    '''
+
+    __slots__ = ['button', 'street', 'pips', 'stacks', 'hands', 'deck', 'history', 'num_actions']
+
+    def __init__(self, button, street, pips, stacks, hands, deck, history=None, num_actions=0):
+        self.button = button
+        self.street = street
+        self.pips = pips
+        self.stacks = stacks
+        self.hands = hands
+        self.deck = deck
+        self.history = array('h') if history is None else history
+        self.num_actions = num_actions
+
+    def _replace(self, **fields):
+        '''
+        Returns a copy of the state with some fields replaced, like namedtuple._replace.
+        '''
+        state = CompactRoundState(self.button, self.street, self.pips, self.stacks, self.hands, self.deck,
+                                  self.history, self.num_actions)
+        for name, value in fields.items():
+            setattr(state, name, value)
+        return state
+
+    @property
+    def int_hands(self):
+        '''
+        The players' hands as integer cards, see cards.py.
+        '''
+        return [card_ints(hand) for hand in self.hands]
+
+    @property
+    def int_deck(self):
+        '''
+        The board cards as integer cards, see cards.py.
+        '''
+        return card_ints(self.deck)
+
+    def actions(self):
+        '''
+        Returns the actions of the round which led to this state.
+        '''
+        decode = {FOLD_CODE: FoldAction(), CALL_CODE: CallAction(), CHECK_CODE: CheckAction()}
+        return [decode[code] if code < 0 else RaiseAction(code) for code in self.history[:self.num_actions]]
+
+    def showdown(self):
+        '''
+        Compares the players' hands and computes payoffs.
+        '''
+        return TerminalState([0, 0], self)
+
+    def legal_actions(self):
+        '''
+        Returns a set which corresponds to the active player's legal moves.
+        '''
+        active = self.button % 2
+        continue_cost = self.pips[1-active] - self.pips[active]
+        if continue_cost == 0:
+            # we can only raise the stakes if both players can afford it
+            bets_forbidden = (self.stacks[0] == 0 or self.stacks[1] == 0)
+            return {CheckAction} if bets_forbidden else {CheckAction, RaiseAction}
+        # continue_cost > 0
+        # similarly, re-raising is only allowed if both players can afford it
+        raises_forbidden = (continue_cost == self.stacks[active] or self.stacks[1-active] == 0)
+        return {FoldAction, CallAction} if raises_forbidden else {FoldAction, CallAction, RaiseAction}
+
+    def raise_bounds(self):
+        '''
+        Returns a tuple of the minimum and maximum legal raises.
+        '''
+        active = self.button % 2
+        continue_cost = self.pips[1-active] - self.pips[active]
+        max_contribution = min(self.stacks[active], self.stacks[1-active] + continue_cost)
+        min_contribution = min(max_contribution, continue_cost + max(continue_cost, BIG_BLIND))
+        return (self.pips[active] + min_contribution, self.pips[active] + max_contribution)
+
+    def record(self, code):
+        '''
+        Appends an action code to the history and returns the history of the next state.
+        '''
+        history = self.history
+        if len(history) > self.num_actions:  # branching from an earlier state
+            history = history[:self.num_actions]
+        history.append(code)
+        return history
+
+    def proceed_street(self):
+        '''
+        Resets the players' pips and advances the game tree to the next round of betting.
+        '''
+        if self.street == 5:
+            return self.showdown()
+        new_street = 3 if self.street == 0 else self.street + 1
+        return CompactRoundState(1, new_street, [0, 0], self.stacks, self.hands, self.deck, self.history, self.num_actions)
+
+    def proceed(self, action):
+        '''
+        Advances the game tree by one action performed by the active player.
+        '''
+        active = self.button % 2
+        if isinstance(action, FoldAction):
+            delta = self.stacks[0] - STARTING_STACK if active == 0 else STARTING_STACK - self.stacks[1]
+            # the round ends where it stood, with the fold recorded like any other action
+            state = CompactRoundState(self.button, self.street, self.pips, self.stacks, self.hands, self.deck,
+                                      self.record(FOLD_CODE), self.num_actions + 1)
+            return TerminalState([delta, -delta], state)
+        num_actions = self.num_actions + 1
+        if isinstance(action, CallAction):
+            history = self.record(CALL_CODE)
+            if self.button == 0:  # sb calls bb
+                return CompactRoundState(1, 0, [BIG_BLIND] * 2, [STARTING_STACK - BIG_BLIND] * 2,
+                                         self.hands, self.deck, history, num_actions)
+            # both players acted
+            new_pips = list(self.pips)
+            new_stacks = list(self.stacks)
+            contribution = new_pips[1-active] - new_pips[active]
+            new_stacks[active] -= contribution
+            new_pips[active] += contribution
+            state = CompactRoundState(self.button + 1, self.street, new_pips, new_stacks,
+                                      self.hands, self.deck, history, num_actions)
+            return state.proceed_street()
+        if isinstance(action, CheckAction):
+            history = self.record(CHECK_CODE)
+            state = CompactRoundState(self.button + 1, self.street, self.pips, self.stacks,
+                                      self.hands, self.deck, history, num_actions)
+            if (self.street == 0 and self.button > 0) or self.button > 1:  # both players acted
+                return state.proceed_street()
+            # let opponent act
+            return state
         # isinstance(action, RaiseAction)
+        history = self.record(action.amount)
         new_pips = list(self.pips)
         new_stacks = list(self.stacks)
         contribution = action.amount - new_pips[active]
         new_stacks[active] -= contribution
         new_pips[active] += contribution
-        return RoundState(self.button + 1, self.street, new_pips, new_stacks, self.hands, self.deck, self)
+        return CompactRoundState(self.button + 1, self.street, new_pips, new_stacks,
+                                 self.hands, self.deck, history, num_actions)
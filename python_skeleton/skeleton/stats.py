@@ -0,0 +1,149 @@
+'''
+Counts of the opponent's actions, kept over the whole game and over a window of the latest rounds.
+'''
+from array import array
+from .actions import CallAction, CheckAction, RaiseAction
+
+# counters for the whole round
+ROUNDS, VPIP, PREFLOP_RAISES, SHOWDOWNS, SHOWDOWN_WINS = range(5)
+# counters for each street, offset by street_offset(street)
+FACED_RAISES, FOLDS_TO_RAISES, RAISES, CALLS, CHECKS = range(5)
+NUM_STREET_COUNTERS = 5
+STREET_INDICES = {0: 0, 3: 1, 4: 2, 5: 3}
+NUM_COUNTERS = 5 + NUM_STREET_COUNTERS * len(STREET_INDICES)
+WINDOW = 100
+
+
+def street_offset(street):
+    '''
+    Returns the index of the first counter of a street, 0, 3, 4 or 5.
+    '''
+    return 5 + NUM_STREET_COUNTERS * STREET_INDICES[street]
+
+
+class OpponentStats():
+    '''
+    Lifetime and sliding window counters of the opponent's actions, fed by the runner clause by clause.
+    Set a bot's opponent_stats to an instance for the runner to feed it.
+    Each action costs O(1), each round O(NUM_COUNTERS), and every query O(1) whatever the number
+    of rounds played, as the window's sums are kept up to date as rounds enter and leave it.
+    Rates are None until the opponent has had the chance to act on them.
+    '''
+
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self.totals = array('q', bytes(8 * NUM_COUNTERS))
+        self.window_totals = array('q', bytes(8 * NUM_COUNTERS))
+        self.current = array('q', bytes(8 * NUM_COUNTERS))
+        # the counters of the latest window rounds, one row of NUM_COUNTERS per round
+        self.history = array('q', bytes(8 * NUM_COUNTERS * window))
+        self.num_rounds = 0
+
+    def action(self, round_state, action, active):
+        '''
+        Counts an action about to be applied to round_state, if it is the opponent's.
+        '''
+        button = round_state.button
+        if button % 2 == active:
+            return
+        street = round_state.street
+        offset = street_offset(street)
+        current = self.current
+        # the small blind's first action is not facing a raise
+        facing = round_state.pips[active] > round_state.pips[1-active] and (street > 0 or button > 0)
+        if facing:
+            current[offset + FACED_RAISES] += 1
+        kind = type(action)
+        if kind is RaiseAction:
+            current[offset + RAISES] += 1
+        elif kind is CallAction:
+            current[offset + CALLS] += 1
+        elif kind is CheckAction:
+            current[offset + CHECKS] += 1
+        elif facing:
+            current[offset + FOLDS_TO_RAISES] += 1
+
+    def reveal(self):
+        '''
+        Counts a showdown in the current round.
+        '''
+        self.current[SHOWDOWNS] = 1
+
+    def round_over(self, delta):
+        '''
+        Ends the current round, in which our bankroll changed by delta.
+        '''
+        current = self.current
+        current[ROUNDS] = 1
+        current[VPIP] = 1 if current[5 + RAISES] or current[5 + CALLS] else 0
+        current[PREFLOP_RAISES] = 1 if current[5 + RAISES] else 0
+        current[SHOWDOWN_WINS] = 1 if current[SHOWDOWNS] and delta < 0 else 0
+        totals = self.totals
+        window_totals = self.window_totals
+        history = self.history
+        start = (self.num_rounds % self.window) * NUM_COUNTERS
+        for i in range(NUM_COUNTERS):
+            count = current[i]
+            totals[i] += count
+            window_totals[i] += count - history[start + i]
+            history[start + i] = count
+            current[i] = 0
+        self.num_rounds += 1
+
+    def counts(self, window=False):
+        '''
+        Returns the counters over the latest rounds if window, or over every round, indexed by the counter constants.
+        '''
+        return self.window_totals if window else self.totals
+
+    def rate(self, numerator, denominator, window=False):
+        '''
+        Returns the ratio of two counters, or None if the denominator is 0.
+        '''
+        counts = self.window_totals if window else self.totals
+        return counts[numerator] / counts[denominator] if counts[denominator] else None
+
+    def vpip(self, window=False):
+        '''
+        Returns the fraction of rounds in which the opponent called or raised preflop.
+        '''
+        return self.rate(VPIP, ROUNDS, window)
+
+    def preflop_raise(self, window=False):
+        '''
+        Returns the fraction of rounds in which the opponent raised preflop.
+        '''
+        return self.rate(PREFLOP_RAISES, ROUNDS, window)
+
+    def fold_to_raise(self, street, window=False):
+        '''
+        Returns the fraction of bets and raises on a street, 0, 3, 4 or 5, to which the opponent folded.
+        '''
+        offset = street_offset(street)
+        return self.rate(offset + FOLDS_TO_RAISES, offset + FACED_RAISES, window)
+
+    def aggression(self, street=None, window=False):
+        '''
+        Returns the fraction of the opponent's actions on a street, or on every street if None, which were raises.
+        Folds are not counted.
+        '''
+        counts = self.window_totals if window else self.totals
+        streets = STREET_INDICES if street is None else (street,)
+        raises = actions = 0
+        for street in streets:
+            offset = street_offset(street)
+            raises += counts[offset + RAISES]
+            actions += counts[offset + RAISES] + counts[offset + CALLS] + counts[offset + CHECKS]
+        return raises / actions if actions else None
+
+    def showdown_frequency(self, window=False):
+        '''
+        Returns the fraction of rounds which were shown down.
+        '''
+        return self.rate(SHOWDOWNS, ROUNDS, window)
+
+    def showdown_win_rate(self, window=False):
+        '''
+        Returns the fraction of showdowns the opponent won outright.
+        '''
+        return self.rate(SHOWDOWN_WINS, SHOWDOWNS, window)
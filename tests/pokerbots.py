@@ -0,0 +1,48 @@
+'''
+Writes pokerbots built on python_skeleton for the tests to play against each other.
+'''
+import os
+import shutil
+
+SKELETON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'python_skeleton')
+
+# folds, raises, bets and illegal raises, which are noted in the game log, chosen from the round so far
+PLAYER = '''
+from skeleton.actions import FoldAction, CallAction, CheckAction, RaiseAction
+from skeleton.bot import Bot
+from skeleton.runner import parse_args, run_bot
+
+
+class Player(Bot):
+    def handle_new_round(self, game_state, round_state, active):
+        pass
+
+    def handle_round_over(self, game_state, terminal_state, active):
+        pass
+
+    def get_action(self, game_state, round_state, active):
+        legal_actions = round_state.legal_actions()
+        choice = (game_state.round_num + round_state.button + round_state.street + sum(round_state.int_hands[active])) % 7
+        if RaiseAction in legal_actions and choice < 2:
+            min_raise, max_raise = round_state.raise_bounds()
+            return RaiseAction(min_raise if choice == 0 else max_raise)
+        if choice == 2:
+            return RaiseAction(10000)
+        if FoldAction in legal_actions and choice == 3:
+            return FoldAction()
+        return CheckAction() if CheckAction in legal_actions else CallAction()
+
+
+if __name__ == '__main__':
+    run_bot(Player(), parse_args())
+'''
+
+
+def make_bot(path):
+    '''
+    Writes a copy of python_skeleton playing PLAYER to path and returns the path as a string.
+    '''
+    shutil.copytree(SKELETON_DIR, str(path), ignore=shutil.ignore_patterns('__pycache__', '*.npy', '*.txt'))
+    with open(os.path.join(str(path), 'player.py'), 'w') as player_file:
+        player_file.write(PLAYER)
+    return str(path)
@@ -0,0 +1,55 @@
+'''
+Tests that BotLog keeps at most PLAYER_LOG_SIZE_LIMIT bytes of output and PLAYER_LOG_TAIL_SIZE bytes of tail.
+
+Run with python3 -m pytest tests from the repository root.
+'''
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import engine
+
+
+def write_chunks(path, num_chunks, chunk_size):
+    '''
+    Writes numbered chunks of output to a BotLog and returns it, still open, with all of the output.
+    '''
+    log = engine.BotLog(str(path))
+    output = b''.join(bytes([i % 256]) * chunk_size for i in range(num_chunks))
+    for i in range(num_chunks):
+        log.write(output[i * chunk_size:(i + 1) * chunk_size])
+    return log, output
+
+
+def test_zero_tail_keeps_nothing(tmp_path, monkeypatch):
+    monkeypatch.setattr(engine, 'PLAYER_LOG_SIZE_LIMIT', 10)
+    monkeypatch.setattr(engine, 'PLAYER_LOG_TAIL_SIZE', 0)
+    log, output = write_chunks(tmp_path / 'bot.txt', 1000, 100)
+    assert len(log.tail) == 0
+    log.close()
+    assert (tmp_path / 'bot.txt').read_bytes() == output[:10] + b'\n[99990 bytes omitted]\n'
+
+
+def test_small_tail_keeps_last_bytes(tmp_path, monkeypatch):
+    monkeypatch.setattr(engine, 'PLAYER_LOG_SIZE_LIMIT', 10)
+    monkeypatch.setattr(engine, 'PLAYER_LOG_TAIL_SIZE', 3)
+    log, output = write_chunks(tmp_path / 'bot.txt', 1000, 100)
+    assert log.tail == output[-3:]
+    log.close()
+    assert (tmp_path / 'bot.txt').read_bytes() == output[:10] + b'\n[99987 bytes omitted]\n' + output[-3:]
+
+
+def test_tail_spans_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(engine, 'PLAYER_LOG_SIZE_LIMIT', 10)
+    monkeypatch.setattr(engine, 'PLAYER_LOG_TAIL_SIZE', 250)
+    log, output = write_chunks(tmp_path / 'bot.txt', 1000, 100)
+    assert log.tail == output[-250:]
+    log.close()
+
+
+def test_output_under_limit_is_kept(tmp_path, monkeypatch):
+    monkeypatch.setattr(engine, 'PLAYER_LOG_SIZE_LIMIT', 1000)
+    monkeypatch.setattr(engine, 'PLAYER_LOG_TAIL_SIZE', 0)
+    log, output = write_chunks(tmp_path / 'bot.txt', 10, 100)
+    log.close()
+    assert (tmp_path / 'bot.txt').read_bytes() == output
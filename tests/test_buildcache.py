@@ -0,0 +1,84 @@
+'''
+Tests that BuildCache restores the outputs of a build only while the pokerbot's sources are unchanged.
+
+Run with python3 -m pytest tests from the repository root.
+'''
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from buildcache import BuildCache
+
+
+def make_bot(tmp_path):
+    '''
+    Returns the path of a pokerbot directory with a source file and a commands.json.
+    '''
+    bot_path = tmp_path / 'bot'
+    bot_path.mkdir()
+    (bot_path / 'commands.json').write_text('{"build": ["make"], "run": ["./bot"]}')
+    (bot_path / 'bot.cpp').write_text('int main() {}')
+    return str(bot_path)
+
+
+def build(cache, bot_path, output=b'binary'):
+    '''
+    Builds the pokerbot as a build command would, by writing its output, and saves the build.
+    '''
+    files, cached = cache.lookup(bot_path)
+    assert cached is None
+    with open(os.path.join(bot_path, 'bot'), 'wb') as output_file:
+        output_file.write(output)
+    cache.save(bot_path, files, b'build log')
+
+
+def test_miss_then_hit(tmp_path):
+    bot_path = make_bot(tmp_path)
+    cache = BuildCache(str(tmp_path / 'cache'))
+    build(cache, bot_path)
+    _, cached = cache.lookup(bot_path)
+    assert cached is not None
+    assert list(cached['outputs']) == ['bot']
+    assert cache.restore(bot_path, cached) == b'build log'
+
+
+def test_restore_rewrites_missing_outputs(tmp_path):
+    bot_path = make_bot(tmp_path)
+    cache = BuildCache(str(tmp_path / 'cache'))
+    build(cache, bot_path)
+    os.remove(os.path.join(bot_path, 'bot'))
+    # the key leaves out build outputs, so a clean checkout still hits
+    _, cached = cache.lookup(bot_path)
+    assert cached is not None
+    assert cache.restore(bot_path, cached) == b'build log'
+    with open(os.path.join(bot_path, 'bot'), 'rb') as output_file:
+        assert output_file.read() == b'binary'
+
+
+def test_changed_source_misses(tmp_path):
+    bot_path = make_bot(tmp_path)
+    cache = BuildCache(str(tmp_path / 'cache'))
+    build(cache, bot_path)
+    with open(os.path.join(bot_path, 'bot.cpp'), 'w') as source_file:
+        source_file.write('int main() { return 1; }')
+    _, cached = cache.lookup(bot_path)
+    assert cached is None
+
+
+def test_changed_commands_miss(tmp_path):
+    bot_path = make_bot(tmp_path)
+    cache = BuildCache(str(tmp_path / 'cache'))
+    build(cache, bot_path)
+    with open(os.path.join(bot_path, 'commands.json'), 'w') as commands_file:
+        commands_file.write('{"build": ["make", "-O3"], "run": ["./bot"]}')
+    _, cached = cache.lookup(bot_path)
+    assert cached is None
+
+
+def test_missing_blob_is_not_restored(tmp_path):
+    bot_path = make_bot(tmp_path)
+    cache = BuildCache(str(tmp_path / 'cache'))
+    build(cache, bot_path)
+    _, cached = cache.lookup(bot_path)
+    os.remove(cache.entry_name('blobs', cached['outputs']['bot'][0]))
+    assert cache.restore(bot_path, cached) is None
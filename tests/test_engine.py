@@ -0,0 +1,91 @@
+'''
+Tests that seeded games are dealt the same cards however they are played,
+and that every transport, protocol and round over mode plays them the same way.
+
+Run with python3 -m pytest tests from the repository root.
+'''
+import os
+import socket
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import engine
+from pokerbots import make_bot
+
+
+def configure(monkeypatch, bot_path, num_rounds, in_process=True):
+    '''
+    Points both players at bot_path for games of num_rounds rounds.
+    '''
+    for name, value in [('NUM_ROUNDS', num_rounds), ('GAME_RECORD', False), ('GAME_LOG_COMPRESSION', None),
+                        ('WARM_BOTS', False), ('PLAYER_1_PATH', bot_path), ('PLAYER_2_PATH', bot_path),
+                        ('PLAYER_1_IN_PROCESS', in_process), ('PLAYER_2_IN_PROCESS', in_process)]:
+        monkeypatch.setattr(engine, name, value)
+
+
+def play_game(output_dir, seed, swap_seats=False):
+    '''
+    Plays a game in output_dir and returns its game log.
+    '''
+    os.makedirs(output_dir)
+    engine.Game(output_dir, seed, swap_seats).run(build=False)
+    with open(os.path.join(output_dir, 'gamelog.txt')) as log_file:
+        return log_file.read()
+
+
+def dealt(log, name):
+    '''
+    Returns the cards dealt to the named player in each round of a game log.
+    '''
+    return [line.split(' dealt ')[1] for line in log.split('\n') if line.startswith(name + ' dealt ')]
+
+
+def test_predealt_rounds_match_live_deals(tmp_path, monkeypatch):
+    monkeypatch.setattr(engine, 'NUM_ROUNDS', 100)
+    monkeypatch.setattr(engine, 'PREDEAL_ROUNDS', False)
+    live = engine.Game(str(tmp_path), seed=11)
+    monkeypatch.setattr(engine, 'PREDEAL_ROUNDS', True)
+    predealt = engine.Game(str(tmp_path), seed=11)
+    assert live.perm == predealt.perm
+    for _ in range(engine.NUM_ROUNDS):
+        (live_hands, live_deck), (predealt_hands, predealt_deck) = live.deal(), predealt.deal()
+        assert live_hands == predealt_hands
+        assert live_deck.board == predealt_deck.board
+
+
+def test_seeded_games_repeat(tmp_path, monkeypatch):
+    configure(monkeypatch, make_bot(tmp_path / 'bot'), 40)
+    log = play_game(str(tmp_path / 'first'), 5)
+    assert play_game(str(tmp_path / 'second'), 5) == log
+    assert play_game(str(tmp_path / 'other'), 6) != log
+
+
+def test_swapped_seats_swap_cards(tmp_path, monkeypatch):
+    configure(monkeypatch, make_bot(tmp_path / 'bot'), 40)
+    log = play_game(str(tmp_path / 'game'), 5)
+    swapped_log = play_game(str(tmp_path / 'swapped'), 5, swap_seats=True)
+    assert dealt(swapped_log, engine.PLAYER_2_NAME) == dealt(log, engine.PLAYER_1_NAME)
+    assert dealt(swapped_log, engine.PLAYER_1_NAME) == dealt(log, engine.PLAYER_2_NAME)
+
+
+@pytest.mark.parametrize('transport, protocol, round_over_mode', [
+    ('tcp', 'text', 'ack'),
+    ('tcp', 'binary', 'push'),
+    ('unix', 'text', 'push'),
+    ('unix', 'binary', 'piggyback'),
+    ('socketpair', 'text', 'piggyback'),
+    ('socketpair', 'binary', 'ack'),
+])
+def test_transports_play_the_same_game(tmp_path, monkeypatch, transport, protocol, round_over_mode):
+    if transport != 'tcp' and not hasattr(socket, 'AF_UNIX'):
+        pytest.skip('{} transport needs AF_UNIX'.format(transport))
+    bot_path = make_bot(tmp_path / 'bot')
+    configure(monkeypatch, bot_path, 40)
+    log = play_game(str(tmp_path / 'in_process'), 7)
+    configure(monkeypatch, bot_path, 40, in_process=False)
+    monkeypatch.setattr(engine, 'BOT_TRANSPORT', transport)
+    monkeypatch.setattr(engine, 'BOT_PROTOCOL', protocol)
+    monkeypatch.setattr(engine, 'ROUND_OVER_MODE', round_over_mode)
+    assert play_game(str(tmp_path / 'subprocess'), 7) == log
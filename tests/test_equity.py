@@ -0,0 +1,65 @@
+'''
+Tests the Python skeleton's numpy equity module.
+
+Run with python3 -m pytest tests from the repository root.
+'''
+import os
+import sys
+
+import eval7
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'python_skeleton'))
+from skeleton import equity
+from skeleton.cards import CARD_STRINGS, to_ints
+
+ACES = (4 * 12, 4 * 12 + 1)
+IDENTITY = equity.RANKS[None, :]
+# hands random deals rarely make, such as wheels, straight flushes and two sets of trips
+RARE_HANDS = [
+    ['Ac', '2d', '3h', '4s', '5c', 'Kd', 'Kh'],
+    ['Ac', '2c', '3c', '4c', '5c', '6d', '7d'],
+    ['9h', 'Th', 'Jh', 'Qh', 'Kh', 'Ah', '2c'],
+    ['5s', '6s', '7s', '8s', '9s', 'Ts', 'Js'],
+    ['7c', '7d', '7h', '2s', '2c', '2d', 'Ac'],
+    ['Qc', 'Qd', 'Qh', 'Qs', 'Jc', 'Jd', 'Jh'],
+    ['2c', '3c', '4c', '5c', '7c', '8c', '9d'],
+    ['Tc', 'Td', '9h', '9s', '8c', '8d', 'Ah'],
+]
+
+
+def test_missing_preflop_table_is_not_built(tmp_path, monkeypatch):
+    monkeypatch.setattr(equity, '_preflop_table', None)
+    monkeypatch.setattr(equity, '_preflop_table_loaded', False)
+    path = tmp_path / 'preflop_equity.npy'
+    assert equity.preflop_table(str(path)) is None
+    assert not path.exists()
+
+
+def test_preflop_equity_falls_back_without_table(monkeypatch):
+    monkeypatch.setattr(equity, '_preflop_table', None)
+    monkeypatch.setattr(equity, '_preflop_table_loaded', True)
+    assert equity.preflop_equity(ACES, perms=IDENTITY) > 0.8
+
+
+def test_preflop_equity_looks_up_table(monkeypatch):
+    table = equity.compute_preflop_table(num_samples=200, rng=np.random.default_rng(1))
+    monkeypatch.setattr(equity, '_preflop_table', table)
+    monkeypatch.setattr(equity, '_preflop_table_loaded', True)
+    assert equity.preflop_equity(ACES, perms=IDENTITY) == table[12, 12]
+
+
+def test_evaluate_orders_hands_as_eval7():
+    rng = np.random.default_rng(2)
+    hands = np.array([rng.permutation(52)[:7] for _ in range(5000)] + [to_ints(hand) for hand in RARE_HANDS])
+    scores = equity.evaluate(hands)
+    eval7_scores = np.array([eval7.evaluate([eval7.Card(CARD_STRINGS[card]) for card in hand]) for hand in hands])
+    order = np.argsort(scores, kind='stable')
+    # sorting by score sorts by eval7's value too, and hands tie exactly when eval7 ties them
+    assert (np.diff(eval7_scores[order]) >= 0).all()
+    assert ((np.diff(scores[order]) == 0) == (np.diff(eval7_scores[order]) == 0)).all()
+    categories = scores // equity.CATEGORY_SCALE
+    assert set(categories) == set(range(9))
+    assert categories[-len(RARE_HANDS):].tolist() == [equity.STRAIGHT, equity.STRAIGHT_FLUSH, equity.STRAIGHT_FLUSH,
+                                                      equity.STRAIGHT_FLUSH, equity.FULL_HOUSE, equity.QUADS,
+                                                      equity.FLUSH, equity.TWO_PAIR]
@@ -0,0 +1,90 @@
+'''
+Tests that a binary game record regenerates the text game log it was written alongside,
+and that the index of a record cut short is rebuilt by scanning its rounds.
+
+Run with python3 -m pytest tests from the repository root.
+'''
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import engine
+import gamerecord
+from pokerbots import make_bot
+
+
+def play_game(tmp_path, monkeypatch, num_rounds):
+    '''
+    Plays a game between two in-process copies of a pokerbot and returns its output directory.
+    '''
+    bot_path = make_bot(tmp_path / 'bot')
+    for name, value in [('NUM_ROUNDS', num_rounds), ('GAME_RECORD', True), ('GAME_LOG_COMPRESSION', None),
+                        ('PLAYER_1_PATH', bot_path), ('PLAYER_2_PATH', bot_path),
+                        ('PLAYER_1_IN_PROCESS', True), ('PLAYER_2_IN_PROCESS', True)]:
+        monkeypatch.setattr(engine, name, value)
+    output_dir = tmp_path / 'game'
+    output_dir.mkdir()
+    engine.Game(str(output_dir), seed=3).run(build=False)
+    return output_dir
+
+
+def test_record_regenerates_game_log(tmp_path, monkeypatch):
+    output_dir = play_game(tmp_path, monkeypatch, 60)
+    record = gamerecord.GameRecord(str(output_dir / 'gamelog.pbr'))
+    text = (output_dir / 'gamelog.txt').read_text()
+    assert len(record) == 60
+    assert '\n'.join(record.text_lines()) == text
+    for line in ('folds', 'raises to', 'bets', 'attempted illegal', 'shows'):
+        assert line in text
+    # any round can be read without the ones before it
+    assert record[41].round_num == 42
+    lines = list(record.round_lines(record[41]))
+    assert lines[1].startswith('Round #42,')
+    assert '\n'.join(lines) in text
+    record.close()
+
+
+def write_rounds(name, num_rounds, stopped=False):
+    '''
+    Writes a record of rounds in which the first player folds, noting the line of a stopped game if stopped.
+    Returns the writer, which is left open.
+    '''
+    writer = gamerecord.GameRecordWriter(name, ['A', 'B'], list(range(13)), [1, 2, 200])
+    for round_num in range(1, num_rounds + 1):
+        writer.begin_round(round_num, ['A', 'B'], [-(round_num - 1), round_num - 1])
+        writer.deal([[0, 1], [2, 3]], [4, 5, 6, 7, 8])
+        writer.note('A attempted illegal RaiseAction')
+        writer.action('A', 'F', False)
+        writer.award([-1, 1])
+        writer.end_round()
+    if stopped:
+        writer.note('')
+        writer.note('Stopped after {} rounds'.format(num_rounds))
+    return writer
+
+
+def test_notes_after_the_last_round(tmp_path):
+    name = str(tmp_path / 'gamelog.pbr')
+    write_rounds(name, 3, stopped=True).close([0, 0], ['A', 'B'], [-3, 3])
+    record = gamerecord.GameRecord(name)
+    lines = list(record.text_lines())
+    assert lines[-7:] == ['B awarded 1', '', 'Stopped after 3 rounds', '', 'Straights 0 0', '', 'Final, A (-3), B (3)']
+    assert record[0].events[0] == (gamerecord.NOTE, 'A attempted illegal RaiseAction')
+    record.close()
+
+
+def test_index_rebuilt_without_footer(tmp_path):
+    name = str(tmp_path / 'gamelog.pbr')
+    writer = write_rounds(name, 5)
+    writer.flush()
+    # the game did not finish, and its last round was only partly written
+    size = os.path.getsize(name)
+    writer.record_file.close()
+    with open(name, 'r+b') as record_file:
+        record_file.truncate(size - 3)
+    record = gamerecord.GameRecord(name)
+    assert record.final is None
+    assert len(record) == 4
+    assert [round_record.round_num for round_record in record] == [1, 2, 3, 4]
+    assert record[3].bankrolls == [-3, 3]
+    record.close()
@@ -0,0 +1,84 @@
+'''
+Tests that the Python skeleton's permutation posterior draws from the engine's prior
+and stays consistent with the showdowns it has been shown.
+
+Run with python3 -m pytest tests from the repository root.
+'''
+from types import SimpleNamespace
+import os
+import sys
+
+import numpy as np
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'python_skeleton'))
+import engine
+from skeleton.equity import NUM_RANKS, sample_perms
+from skeleton.posterior import PRIOR_P, PermutationPosterior, log_prior, outcomes
+
+
+def showdowns(true_perm, num_showdowns, rng):
+    '''
+    Deals showdowns of our hand, the opponent's hand and the board, with their signs under true_perm.
+    '''
+    shown = np.array([rng.permutation(52)[:9] for _ in range(num_showdowns)])
+    return shown, outcomes(np.tile(true_perm, (num_showdowns, 1)), shown)
+
+
+def explained(perms, weights, shown, signs):
+    '''
+    Returns the weighted share of the showdowns each permutation explains.
+    '''
+    shares = [(outcomes(np.tile(perm, (len(shown), 1)), shown) == signs).mean() for perm in perms]
+    return np.average(shares, weights=weights)
+
+
+def test_sample_perms_match_engine():
+    for seed in range(20):
+        # both draw their geometric offsets in the same order, so the same generator makes the same permutation
+        game = SimpleNamespace(geometric=np.random.default_rng(seed).geometric)
+        assert engine.Game.permute_values(game) == sample_perms(1, np.random.default_rng(seed))[0].tolist()
+
+
+def test_log_prior():
+    # offsets of zero pick the lowest value left for each rank, which is the most likely permutation
+    identity = np.arange(NUM_RANKS)[None, :]
+    remaining = np.arange(1, NUM_RANKS + 1)
+    expected = (np.log(PRIOR_P) - np.log1p(-(1 - PRIOR_P) ** remaining)).sum()
+    assert np.isclose(log_prior(identity)[0], expected)
+    perms = sample_perms(1000, np.random.default_rng(3))
+    assert (log_prior(perms) <= expected + 1e-9).all()
+    # taking the higher of the last two values left is one offset further, so (1 - PRIOR_P) times as likely
+    swapped = perms.copy()
+    swapped[:, [-2, -1]] = perms[:, [-1, -2]]
+    ratio = np.where(perms[:, -2] < perms[:, -1], np.log1p(-PRIOR_P), -np.log1p(-PRIOR_P))
+    assert np.allclose(log_prior(swapped) - log_prior(perms), ratio)
+
+
+def test_weights_condition_on_every_showdown():
+    rng = np.random.default_rng(4)
+    shown, signs = showdowns(sample_perms(1, rng)[0], 6, rng)
+    # without resampling, the particles stay put and only their weights are conditioned
+    posterior = PermutationPosterior(2000, resample_threshold=0., rng=np.random.default_rng(5))
+    particles = posterior.particles.copy()
+    for cards, sign in zip(shown, signs):
+        posterior.update(cards[:2], cards[2:4], cards[4:], sign)
+    consistent = np.array([(outcomes(np.tile(perm, (len(shown), 1)), shown) == signs).all() for perm in particles])
+    assert consistent.any()
+    assert (posterior.particles == particles).all()
+    assert np.allclose(posterior.weights, consistent / consistent.sum())
+
+
+def test_particles_explain_showdowns():
+    rng = np.random.default_rng(0)
+    true_perm = sample_perms(1, rng)[0]
+    shown, signs = showdowns(true_perm, 40, rng)
+    posterior = PermutationPosterior(500, rng=np.random.default_rng(100))
+    for cards, sign in zip(shown, signs):
+        posterior.update(cards[:2], cards[2:4], cards[4:], 3 * sign)
+        # particles which the latest showdown contradicts carry no weight, even once resampled and moved
+        weighted = posterior.particles[posterior.weights > 0]
+        assert (outcomes(weighted, np.tile(cards, (len(weighted), 1))) == sign).all()
+    prior = sample_perms(500, np.random.default_rng(7))
+    assert explained(posterior.particles, posterior.weights, shown, signs) > explained(prior, None, shown, signs) + 0.05
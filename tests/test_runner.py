@@ -0,0 +1,184 @@
+'''
+Tests that the python_skeleton Runner rebuilds the same rounds from text and binary messages,
+including random rounds recorded as benchmarks/replay.py records them,
+and that it negotiates the binary protocol the engine offers.
+
+Run with python3 -m pytest tests from the repository root.
+'''
+import os
+import socket
+import sys
+import threading
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'python_skeleton'))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'benchmarks'))
+import engine
+from replay import record_streams, trace_python
+from skeleton.actions import FoldAction, CallAction, CheckAction, RaiseAction
+from skeleton.bot import Bot
+from skeleton.cards import CARD_INDEX
+from skeleton.runner import Runner, PROTOCOL_OFFER, FRAME, RESPONSE
+
+# two rounds, as the player in the first seat is sent them: it calls, then folds to a raise on the flop,
+# and from the other seat checks down to a showdown it wins
+ROUNDS = [
+    ['P0', 'H2c,3d'],
+    ['C', 'K', 'B4h,5s,6d', 'R10'],
+    ['F', 'D-2'],
+    ['P1', 'HAs,Ad', 'C'],
+    ['K', 'B4h,5s,6d'],
+    ['K', 'K', 'B4h,5s,6d,7c'],
+    ['K', 'K', 'B4h,5s,6d,7c,8c'],
+    ['K', 'K', 'OKs,Kd', 'D2'],
+]
+# the same rounds with their ends piggybacked on the next message, as ROUND_OVER_MODE 'piggyback' sends them
+PIGGYBACKED_ROUNDS = ROUNDS[:2] + [ROUNDS[2] + ROUNDS[3]] + ROUNDS[4:7] + [ROUNDS[7] + ['Q']]
+ACTIONS = [CallAction(), FoldAction(), CheckAction(), CheckAction(), CheckAction(), CheckAction()]
+
+
+class ScriptedBot(Bot):
+    '''
+    A pokerbot which plays a list of actions and notes every callback.
+    '''
+
+    def __init__(self, actions):
+        self.actions = list(actions)
+        self.events = []
+
+    def handle_new_round(self, game_state, round_state, active):
+        self.events.append(('new round', game_state.round_num, game_state.bankroll, active,
+                            list(round_state.hands[active])))
+
+    def handle_round_over(self, game_state, terminal_state, active):
+        self.events.append(('round over', game_state.round_num, game_state.bankroll, terminal_state.deltas,
+                            list(terminal_state.previous_state.hands[1-active])))
+
+    def get_action(self, game_state, round_state, active):
+        self.events.append(('action', round(game_state.game_clock, 3), round_state.street, round_state.pips,
+                            round_state.stacks, list(round_state.deck[:round_state.street])))
+        return self.actions.pop(0)
+
+
+def binary_clause(clause):
+    '''
+    Encodes a text clause as the engine would in the binary protocol.
+    '''
+    code, fields = clause[0], clause[1:]
+    if code == 'P':
+        return b'P' + bytes([int(fields)])
+    if code in 'HO':
+        return code.encode() + bytes(CARD_INDEX[card] for card in fields.split(','))
+    if code == 'B':
+        board = [CARD_INDEX[card] for card in fields.split(',')]
+        return b'B' + bytes([len(board)] + board)
+    if code == 'R':
+        return engine.RAISE_CLAUSE.pack(b'R', int(fields))
+    if code == 'D':
+        return engine.DELTA_CLAUSE.pack(b'D', int(fields))
+    return code.encode()
+
+
+def encode(clauses, binary, game_clock=20.):
+    '''
+    Returns a message stamped with the game clock, as the engine sends it.
+    '''
+    player = engine.Player.__new__(engine.Player)  # skips the bot log file
+    player.game_clock = game_clock
+    player.binary = binary
+    if binary:
+        return player.encode([b''] + [binary_clause(clause) for clause in clauses])
+    return player.encode([''] + clauses)
+
+
+def replay(messages, binary):
+    '''
+    Feeds messages to a Runner without a socket and returns its pokerbot and the responses it made.
+    '''
+    pokerbot = ScriptedBot(ACTIONS)
+    runner = Runner(pokerbot, None)
+    responses = []
+    for message in messages:
+        if binary:
+            responses.append(runner.handle_binary_packet(encode(message, True)[FRAME.size:]))
+        else:
+            responses.append(runner.handle_packet(encode(message, False).strip().split(' ')))
+    return pokerbot, responses
+
+
+def test_text_rounds():
+    pokerbot, responses = replay(ROUNDS, False)
+    assert responses == [CallAction(), FoldAction(), CheckAction(), CheckAction(), CheckAction(), CheckAction(),
+                         CheckAction(), CheckAction()]
+    assert pokerbot.events == [
+        ('new round', 1, 0, 0, ['2c', '3d']),
+        ('action', 20., 0, [1, 2], [199, 198], []),
+        ('action', 20., 3, [0, 10], [198, 188], ['4h', '5s', '6d']),
+        ('round over', 1, -2, [-2, 2], []),
+        ('new round', 2, -2, 1, ['As', 'Ad']),
+        ('action', 20., 0, [2, 2], [198, 198], []),
+        ('action', 20., 3, [0, 0], [198, 198], ['4h', '5s', '6d']),
+        ('action', 20., 4, [0, 0], [198, 198], ['4h', '5s', '6d', '7c']),
+        ('action', 20., 5, [0, 0], [198, 198], ['4h', '5s', '6d', '7c', '8c']),
+        ('round over', 2, 0, [-2, 2], ['Ks', 'Kd']),
+    ]
+
+
+def test_binary_rounds_match_text():
+    text_bot, text_responses = replay(ROUNDS, False)
+    binary_bot, binary_responses = replay(ROUNDS, True)
+    assert binary_responses == text_responses
+    assert binary_bot.events == text_bot.events
+
+
+def test_piggybacked_round_over():
+    text_bot, _ = replay(ROUNDS, False)
+    for binary in (False, True):
+        pokerbot, responses = replay(PIGGYBACKED_ROUNDS, binary)
+        # the end of a round is handled before the next round starts, and is not acked
+        assert pokerbot.events == text_bot.events
+        assert responses == [CallAction(), FoldAction(), CheckAction(), CheckAction(), CheckAction(), CheckAction(),
+                             None]
+
+
+def test_random_streams_match():
+    text_stream, binary_stream, _ = record_streams(300, 1)
+    trace = trace_python(text_stream)
+    assert trace.count('\nD ') == 300
+    assert trace_python(binary_stream) == trace
+
+
+def test_quit():
+    runner = Runner(ScriptedBot([]), None)
+    assert runner.handle_packet(['Q']) is None
+    assert runner.handle_binary_packet(b'Q') is None
+
+
+def test_negotiates_binary_protocol():
+    engine_socket, bot_socket = socket.socketpair()
+    engine_socket.settimeout(10.)
+    pokerbot = ScriptedBot([RaiseAction(4), CallAction()])
+    socketfile = bot_socket.makefile('rw')
+    bot_thread = threading.Thread(target=Runner(pokerbot, socketfile).run)
+    bot_thread.start()
+    try:
+        engine_file = engine_socket.makefile('rwb')
+        engine_file.write((PROTOCOL_OFFER + '\n').encode())
+        engine_file.flush()
+        assert engine_file.readline() == (PROTOCOL_OFFER + '\n').encode()
+        responses = []
+        for message in (['P0', 'H2c,3d'], ['R4', 'R8']):
+            engine_file.write(encode(message, True))
+            engine_file.flush()
+            responses.append(RESPONSE.unpack(engine_file.read(RESPONSE.size)))
+        engine_file.write(engine.BINARY_QUIT)
+        engine_file.flush()
+        bot_thread.join(10.)
+        assert not bot_thread.is_alive()
+        assert responses == [(b'R', 4), (b'C', 0)]
+        assert pokerbot.events[-1] == ('action', 20., 0, [4, 8], [196, 192], [])
+    finally:
+        engine_socket.close()
+        socketfile.close()
+        bot_socket.close()
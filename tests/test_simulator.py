@@ -0,0 +1,66 @@
+'''
+Tests that rounds played by the Python skeleton's RoundBatch pay off as engine.RoundState pays off
+the same actions, replayed as benchmarks/simulator.py --check replays them.
+
+Run with python3 -m pytest tests from the repository root.
+'''
+import os
+import sys
+
+import numpy as np
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT_DIR, 'python_skeleton'))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'benchmarks'))
+from simulator import always_call, random_raise, recorded, round_actions, replay
+from skeleton.simulator import RoundBatch, RAISE
+
+NUM_ROUNDS = 2000
+
+
+def any_action(seed):
+    '''
+    Returns a policy which plays any action code, legal or not, and raises to any amount, in bounds or not.
+    '''
+    rng = np.random.default_rng(seed)
+
+    def policy(batch, rows):
+        return rng.integers(RAISE + 1, size=len(rows)), rng.integers(0, 2 * batch.stacks.max() + 2, size=len(rows))
+    return policy
+
+
+def play(policies, perms=None, seed=0):
+    '''
+    Plays a batch of rounds, returning it and the rounds whose payoffs engine.RoundState does not match.
+    '''
+    log = []
+    batch = RoundBatch(NUM_ROUNDS, perms, np.random.default_rng(seed))
+    batch.play([recorded(policy, log) for policy in policies])
+    return batch, replay(batch, round_actions(log, NUM_ROUNDS))
+
+
+def test_showdowns_match_engine():
+    batch, mismatched = play([always_call, always_call])
+    assert mismatched == []
+    assert (batch.street == 5).all()
+    assert (batch.deltas[:, 0] != 0).any() and (batch.deltas.sum(axis=1) == 0).all()
+
+
+def test_random_raises_match_engine():
+    batch, mismatched = play([random_raise(1), random_raise(2)])
+    assert mismatched == []
+    # some rounds are folded, and some go all in
+    assert (batch.street < 5).any()
+    assert (batch.stacks == 0).any()
+
+
+def test_illegal_actions_match_engine():
+    _, mismatched = play([any_action(3), any_action(4)], seed=5)
+    assert mismatched == []
+
+
+def test_single_permutation_matches_engine():
+    perm = np.random.default_rng(6).permutation(13)
+    batch, mismatched = play([random_raise(7), always_call], perm, seed=8)
+    assert mismatched == []
+    assert (batch.perms == perm).all()
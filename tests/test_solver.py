@@ -0,0 +1,87 @@
+'''
+Tests that the Python skeleton's CFR+ solver converges to an equilibrium of a toy game,
+a one-street poker game with three hand buckets and a single bet.
+
+Run with python3 -m pytest tests from the repository root.
+'''
+from types import SimpleNamespace
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'python_skeleton'))
+from skeleton.solver import DECISION, FOLD, SHOWDOWN, CFRSolver
+
+# both players ante 1 and are dealt one of three equally likely buckets, the higher of which wins a showdown
+# the first player checks or bets 1, and a check may be checked behind or bet into
+INITIAL = np.full(3, 1. / 3)
+SHOWDOWN_EQUITY = np.array([[0.5, 0., 0.], [1., 0.5, 0.], [1., 1., 0.5]])
+NODES = [  # kind, player, contributions
+    (DECISION, 0, [1, 1]),
+    (DECISION, 1, [1, 1]),  # after a check
+    (DECISION, 1, [2, 1]),  # facing a bet
+    (SHOWDOWN, -1, [1, 1]),
+    (DECISION, 0, [1, 2]),  # facing a bet after checking
+    (FOLD, 0, [1, 2]),
+    (SHOWDOWN, -1, [2, 2]),
+    (FOLD, 1, [2, 1]),
+    (SHOWDOWN, -1, [2, 2]),
+]
+EDGES = [(0, 1), (0, 2), (1, 3), (1, 4), (4, 5), (4, 6), (2, 7), (2, 8)]  # parent, child
+
+
+def toy_tree():
+    '''
+    Returns the toy game's tree with the arrays GameTree has.
+    '''
+    kinds, players, contributions = (np.array(column) for column in zip(*NODES))
+    parents, children = (np.array(column) for column in zip(*EDGES))
+    levels = np.zeros(len(NODES), dtype=np.int64)
+    for parent, child in EDGES:  # parents come first
+        levels[child] = levels[parent] + 1
+    return SimpleNamespace(kinds=kinds, players=players, contributions=contributions, parents=parents,
+                           children=children, crossings=np.full(len(EDGES), -1), levels=levels,
+                           num_actions=np.bincount(parents, minlength=len(NODES)))
+
+
+def best_response_value(solver, strategy, player, node=0, opponent_reach=INITIAL):
+    '''
+    Returns the value to player of each of its buckets at node when it best responds to the other player's strategy.
+    '''
+    tree = solver.tree
+    if tree.kinds[node] != DECISION:
+        values = solver.terminal_values[node]
+        return values @ opponent_reach if player == 0 else -(opponent_reach @ values)
+    edges = np.flatnonzero(tree.parents == node)
+    if tree.players[node] == player:
+        return np.max([best_response_value(solver, strategy, player, tree.children[edge], opponent_reach)
+                       for edge in edges], axis=0)
+    return np.sum([best_response_value(solver, strategy, player, tree.children[edge],
+                                       opponent_reach * strategy[edge]) for edge in edges], axis=0)
+
+
+def exploitability(solver):
+    '''
+    Returns how much both players together gain by best responding to the average strategy, which is 0 at equilibrium.
+    '''
+    strategy = solver.average_strategy()
+    return sum(INITIAL @ best_response_value(solver, strategy, player) for player in (0, 1))
+
+
+def test_cfr_converges_on_toy_game():
+    solver = CFRSolver(toy_tree(), INITIAL, np.zeros((0, 3, 3)), SHOWDOWN_EQUITY)
+    for _ in range(100):
+        solver.iterate()
+    early = exploitability(solver)
+    for _ in range(1900):
+        value = solver.iterate()
+    assert 0. <= exploitability(solver) < min(early, 0.005)
+    # the value of the current strategy lies within the best responses' bounds on the game's value
+    strategy = solver.average_strategy()
+    upper = INITIAL @ best_response_value(solver, strategy, 0)
+    lower = -(INITIAL @ best_response_value(solver, strategy, 1))
+    assert lower - 0.01 <= value <= upper + 0.01
+    # the best hand never folds to a bet, and the worst never calls one
+    assert strategy[EDGES.index((2, 7)), 2] < 0.01
+    assert strategy[EDGES.index((4, 6)), 0] < 0.01
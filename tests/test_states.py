@@ -0,0 +1,80 @@
+'''
+Tests that the round states of the engine and the Python skeleton record every action of a round in their history,
+including when play branches from an earlier state.
+
+Run with python3 -m pytest tests from the repository root.
+'''
+from array import array
+import os
+import sys
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'python_skeleton'))
+import engine
+from skeleton import states
+from skeleton.actions import FoldAction, CallAction, CheckAction, RaiseAction
+
+
+def engine_state():
+    '''
+    Returns the first state of a round in the engine.
+    '''
+    pips = [engine.SMALL_BLIND, engine.BIG_BLIND]
+    stacks = [engine.STARTING_STACK - engine.SMALL_BLIND, engine.STARTING_STACK - engine.BIG_BLIND]
+    return engine.RoundState(0, 0, pips, stacks, [[0, 1], [2, 3]], None, array('h'), 0)
+
+
+def skeleton_state():
+    '''
+    Returns the first state of a round in the Python skeleton.
+    '''
+    pips = [states.SMALL_BLIND, states.BIG_BLIND]
+    stacks = [states.STARTING_STACK - states.SMALL_BLIND, states.STARTING_STACK - states.BIG_BLIND]
+    return states.CompactRoundState(0, 0, pips, stacks, [['Ac', 'Kd'], []], [])
+
+
+def history(state):
+    '''
+    Returns the action codes which led to a state.
+    '''
+    return list(state.history[:state.num_actions])
+
+
+def test_engine_fold_is_recorded():
+    state = engine_state().proceed(engine.RaiseAction(6))
+    terminal = state.proceed(engine.FoldAction())
+    assert isinstance(terminal, engine.TerminalState)
+    assert history(terminal.previous_state) == [6, engine.FOLD_CODE]
+    assert terminal.deltas == [engine.BIG_BLIND, -engine.BIG_BLIND]
+
+
+def test_engine_fold_is_recorded_when_branching():
+    state = engine_state().proceed(engine.RaiseAction(6))
+    called = state.proceed(engine.CallAction())
+    terminal = state.proceed(engine.FoldAction())
+    assert history(terminal.previous_state) == [6, engine.FOLD_CODE]
+    assert history(called) == [6, engine.CALL_CODE]
+
+
+def test_engine_fold_keeps_folding_player():
+    state = engine_state().proceed(engine.RaiseAction(6))
+    terminal = state.proceed(engine.FoldAction())
+    previous_state = terminal.previous_state
+    assert (previous_state.button, previous_state.pips, previous_state.stacks) == (state.button, state.pips, state.stacks)
+    assert engine.FoldAction in previous_state.legal_actions()
+
+
+def test_skeleton_fold_is_recorded():
+    state = skeleton_state().proceed(CallAction()).proceed(RaiseAction(8))
+    terminal = state.proceed(FoldAction())
+    assert [type(action) for action in terminal.previous_state.actions()] == [CallAction, RaiseAction, FoldAction]
+
+
+def test_skeleton_fold_is_recorded_when_branching():
+    state = skeleton_state().proceed(CallAction())
+    raised = state.proceed(RaiseAction(8))
+    checked = state.proceed(CheckAction())
+    terminal = raised.proceed(FoldAction())
+    assert [type(action) for action in terminal.previous_state.actions()] == [CallAction, RaiseAction, FoldAction]
+    assert [type(action) for action in checked.actions()] == [CallAction, CheckAction]
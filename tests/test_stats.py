@@ -0,0 +1,83 @@
+'''
+Tests that the OpponentStats the runner feeds count the opponent's actions over the game and over its window.
+
+Run with python3 -m pytest tests from the repository root.
+'''
+import os
+import sys
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT_DIR, 'python_skeleton'))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'benchmarks'))
+from replay import NoOpBot, ReplaySocketFile, record_streams
+from skeleton.actions import FoldAction, CallAction, CheckAction, RaiseAction
+from skeleton.runner import Runner
+from skeleton.stats import OpponentStats, ROUNDS, NUM_COUNTERS
+
+# three rounds, as the player in the first seat is sent them: the opponent checks its big blind and bets the flop,
+# then raises its small blind and folds to a reraise, then checks its big blind down to a showdown it loses
+ROUNDS_PLAYED = [
+    ['P0', 'H2c,3d'],
+    ['C', 'K', 'B4h,5s,6d', 'R10'],
+    ['F', 'D-2'],
+    ['P1', 'HAs,Ad', 'R6'],
+    ['R18', 'F', 'D6'],
+    ['P0', 'HKs,Kd'],
+    ['C', 'K', 'B4h,5s,6d', 'K'],
+    ['K', 'B4h,5s,6d,7c', 'K'],
+    ['K', 'B4h,5s,6d,7c,8c', 'K'],
+    ['K', 'OQs,Qd', 'D2'],
+]
+ACTIONS = [CallAction(), FoldAction(), RaiseAction(18), CallAction(), CheckAction(), CheckAction(), CheckAction()]
+
+
+class StatsBot(NoOpBot):
+    '''
+    A pokerbot which plays a list of actions, if given, and keeps the opponent's counters at the end of each round.
+    '''
+
+    def __init__(self, window, actions=()):
+        self.opponent_stats = OpponentStats(window)
+        self.actions = list(actions)
+        self.snapshots = []
+
+    def handle_round_over(self, game_state, terminal_state, active):
+        stats = self.opponent_stats
+        self.snapshots.append((stats.counts().tolist(), stats.counts(window=True).tolist()))
+
+    def get_action(self, game_state, round_state, active):
+        return self.actions.pop(0) if self.actions else super().get_action(game_state, round_state, active)
+
+
+def test_counts_rounds():
+    pokerbot = StatsBot(2, ACTIONS)
+    runner = Runner(pokerbot, None)
+    for packet in ROUNDS_PLAYED:
+        runner.handle_packet(packet)
+    stats = pokerbot.opponent_stats
+    assert stats.num_rounds == 3
+    assert stats.vpip() == stats.preflop_raise() == stats.showdown_frequency() == 1 / 3
+    assert stats.fold_to_raise(0) == 1.
+    assert stats.fold_to_raise(3) is None
+    assert stats.aggression(0) == 1 / 3
+    assert stats.aggression(3) == 0.5
+    assert stats.aggression() == 2 / 7
+    assert stats.showdown_win_rate() == 0.
+    # the window has forgotten the first round
+    assert stats.counts(window=True)[ROUNDS] == 2
+    assert stats.vpip(window=True) == stats.showdown_frequency(window=True) == 0.5
+    assert stats.aggression(0, window=True) == 0.5
+    assert stats.aggression(3, window=True) == 0.
+
+
+def test_window_counts_latest_rounds():
+    text_stream, _, _ = record_streams(300, 2)
+    window = 7
+    pokerbot = StatsBot(window)
+    Runner(pokerbot, ReplaySocketFile(text_stream)).run()
+    assert len(pokerbot.snapshots) == 300
+    totals = [[0] * NUM_COUNTERS] + [lifetime for lifetime, _ in pokerbot.snapshots]
+    for num_rounds, (lifetime, windowed) in enumerate(pokerbot.snapshots, 1):
+        earlier = totals[max(num_rounds - window, 0)]
+        assert windowed == [total - count for total, count in zip(lifetime, earlier)]
+    assert totals[-1][ROUNDS] == 300
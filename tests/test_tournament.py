@@ -0,0 +1,92 @@
+'''
+Tests the tournament summary, including tournaments which finished too few games to summarize,
+and the decisions of the sequential test which stops tournaments early.
+
+Run with python3 -m pytest tests from the repository root.
+'''
+import math
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import tournament
+
+
+def results(*bankrolls):
+    '''
+    Returns game results in which PLAYER_1 finished with each of bankrolls.
+    '''
+    return [{tournament.PLAYER_1_NAME: bankroll, tournament.PLAYER_2_NAME: -bankroll} for bankroll in bankrolls]
+
+
+def test_no_results():
+    summary = tournament.summarize([], [])
+    assert summary['games'] == 0
+    assert summary['mean'] is None
+    assert summary['stddev'] is None
+    assert summary['confidence_interval'] is None
+
+
+def test_one_result():
+    summary = tournament.summarize(results(12), [5])
+    assert summary['games'] == 1
+    assert summary['mean'] == 12
+    assert summary['stddev'] is None
+    assert summary['confidence_interval'] is None
+    assert summary['wins'] == 1
+
+
+def test_results():
+    summary = tournament.summarize(results(10, -2, 4), [1, 2, 3])
+    assert summary['mean'] == 4
+    assert summary['stddev'] == 6
+    low, high = summary['confidence_interval']
+    assert low < 4 < high
+    assert (summary['wins'], summary['losses']) == (2, 1)
+    assert summary['seeds'] == [1, 2, 3]
+
+
+def test_sequential_test_bounds():
+    test = tournament.SequentialTest(1., 0.05, 0.1, 2)
+    assert test.upper_bound == math.log(0.9 / 0.05)
+    assert test.lower_bound == math.log(0.1 / 0.95)
+
+
+def test_sequential_test_decides_at_bounds():
+    # two observations 2 and 0 have a total of 2 and a variance of 2, so the log likelihood ratio is 2 min_effect
+    upper_bound = math.log(0.95 / 0.05)
+    above = tournament.SequentialTest(upper_bound / 2 * (1 + 1e-9), 0.05, 0.05, 2)
+    assert above.add_game(1, [2, 0])
+    assert above.decision == tournament.PLAYER_1_NAME
+    below = tournament.SequentialTest(upper_bound / 2 * (1 - 1e-9), 0.05, 0.05, 2)
+    assert not below.add_game(1, [2, 0])
+    assert below.decision is None
+    lower = tournament.SequentialTest(upper_bound / 2 * (1 + 1e-9), 0.05, 0.05, 2)
+    assert lower.add_game(1, [-2, 0])
+    assert lower.decision == tournament.PLAYER_2_NAME
+
+
+def test_sequential_test_waits_for_min_observations():
+    test = tournament.SequentialTest(1., 0.05, 0.05, 10)
+    assert not test.add_game(1, [100, 90] * 4)
+    assert test.add_game(2, [100, 90])
+    assert test.report()['observations'] == 10
+
+
+def test_sequential_test_skips_constant_observations():
+    test = tournament.SequentialTest(1., 0.05, 0.05, 2)
+    assert not test.add_game(1, [5] * 100)
+
+
+def test_sequential_test_takes_games_in_order():
+    in_order = tournament.SequentialTest(0.5, 0.05, 0.05, 2)
+    out_of_order = tournament.SequentialTest(0.5, 0.05, 0.05, 2)
+    games = [[1, -1], [3, 1], [2, 0], [1, 1]]
+    in_order_decisions = [in_order.add_game(game_num, deltas) for game_num, deltas in enumerate(games, 1)]
+    # the later games wait for the first one
+    assert not out_of_order.add_game(2, games[1])
+    assert not out_of_order.add_game(3, games[2])
+    out_of_order.add_game(1, games[0])
+    out_of_order.add_game(4, games[3])
+    assert any(in_order_decisions)
+    assert out_of_order.report() == in_order.report()
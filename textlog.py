@@ -0,0 +1,54 @@
+'''
+6.176 MIT POKERBOTS TEXT GAME LOG
+Streams the text game log to disk as the game is played.
+'''
+import importlib
+
+
+class GameLog():
+    '''
+    Streams the game log to disk, optionally compressed.
+    Lines are buffered in memory only until the next flush.
+    '''
+
+    COMPRESSORS = {'gz': 'gzip', 'bz2': 'bz2', 'xz': 'lzma', 'zst': 'compression.zstd'}
+
+    def __init__(self, name, compression=None):
+        if compression is not None:
+            try:
+                module = importlib.import_module(GameLog.COMPRESSORS[compression])
+            except ImportError:
+                print(compression, 'compression unavailable - falling back to gz')
+                compression = 'gz'
+                module = importlib.import_module(GameLog.COMPRESSORS[compression])
+            name += '.' + compression
+            self.log_file = module.open(name, 'wt')
+        else:
+            self.log_file = open(name, 'w')
+        self.name = name
+        self.lines = []
+        self.separator = ''
+
+    def append(self, line):
+        '''
+        Adds one line to the game log.
+        '''
+        self.lines.append(line)
+
+    def flush(self):
+        '''
+        Writes the buffered lines to disk.
+        '''
+        if self.lines:
+            # lines are joined by newlines without a trailing one
+            self.log_file.write(self.separator + '\n'.join(self.lines))
+            self.separator = '\n'
+            self.lines = []
+        self.log_file.flush()
+
+    def close(self):
+        '''
+        Writes any buffered lines and closes the game log.
+        '''
+        self.flush()
+        self.log_file.close()
@@ -0,0 +1,319 @@
+'''
+6.176 MIT POKERBOTS TOURNAMENT RUNNER
+Plays many independent games of the engine in parallel and summarizes the results.
+'''
+from multiprocessing import Pool, util
+import contextlib
+import itertools
+import queue
+import asyncio
+import argparse
+import statistics
+import random
+import math
+import json
+import sys
+import os
+
+sys.path.append(os.getcwd())
+from config import *
+import engine
+import asyncengine
+from botpool import BotPool
+
+# two-sided 95% normal quantile used for the confidence interval
+CONFIDENCE_Z = 1.96
+# the pokerbots each worker keeps running between its games when WARM_BOTS is set
+BOT_POOL = None
+
+
+def build_players(output_dir):
+    '''
+    Builds each distinct pokerbot once so that parallel games do not rebuild them concurrently.
+    Build output is saved to <name>_build.txt in the tournament directory.
+    '''
+    built = set()
+    cwd = os.getcwd()
+    os.chdir(output_dir)
+    try:
+        for name, path in [(PLAYER_1_NAME, engine.PLAYER_1_PATH), (PLAYER_2_NAME, engine.PLAYER_2_PATH)]:
+            if path in built:
+                continue
+            player = engine.Player(name + '_build', path)
+            player.build()
+            player.stop()
+            built.add(path)
+    finally:
+        os.chdir(cwd)
+
+
+def init_worker(player_1_path, player_2_path):
+    '''
+    Points every worker at the absolute pokerbot paths, since games run in their own directories,
+    and gives it a bot pool if WARM_BOTS is set, which is closed when the worker exits.
+    '''
+    global BOT_POOL
+    engine.PLAYER_1_PATH = player_1_path
+    engine.PLAYER_2_PATH = player_2_path
+    if WARM_BOTS:
+        BOT_POOL = BotPool()
+        util.Finalize(BOT_POOL, BOT_POOL.close, exitpriority=10)
+
+
+def play_game(job):
+    '''
+    Plays one game, or one duplicate match, inside its own working directory and returns its final bankrolls
+    and PLAYER_1's bankroll change in each round.
+    '''
+    game_num, game_dir, seed = job
+    os.makedirs(game_dir, exist_ok=True)
+    cwd = os.getcwd()
+    os.chdir(game_dir)
+    try:
+        with open('engine.txt', 'w') as engine_output:
+            with contextlib.redirect_stdout(engine_output):
+                if DUPLICATE_MATCH:
+                    bankrolls, round_deltas = engine.play_duplicate(seed=seed, build=False, bot_pool=BOT_POOL)
+                else:
+                    game = engine.Game(seed=seed, bot_pool=BOT_POOL)
+                    bankrolls = game.run(build=False)
+                    round_deltas = game.round_deltas
+    finally:
+        os.chdir(cwd)
+    return game_num, bankrolls, round_deltas
+
+
+class SequentialTest():
+    '''
+    Sequential probability ratio test between PLAYER_1 winning and PLAYER_1 losing min_effect chips
+    per observation, where each observation is one round, or one round in both seatings of a duplicate match.
+    Games are tested in order whatever order they finish in, so the decision only depends on the seeds.
+    The variance of the observations is estimated from those seen so far.
+    '''
+
+    def __init__(self, min_effect, alpha, beta, min_observations):
+        self.min_effect = min_effect
+        self.alpha = alpha
+        self.beta = beta
+        self.min_observations = max(min_observations, 2)
+        # accept that PLAYER_1 wins above the upper bound and that PLAYER_1 loses below the lower bound
+        self.upper_bound = math.log((1 - beta) / alpha)
+        self.lower_bound = math.log(beta / (1 - alpha))
+        self.count = 0
+        self.total = 0.
+        self.total_squares = 0.
+        self.log_likelihood_ratio = 0.
+        self.decision = None
+        self.games = 0
+        self.pending = {}
+
+    def add_game(self, game_num, round_deltas):
+        '''
+        Adds the round deltas of a game and tests every game up to the first which has not finished.
+        Returns True once the test has reached a decision.
+        '''
+        self.pending[game_num] = round_deltas
+        while self.decision is None and self.games + 1 in self.pending:
+            self.games += 1
+            self.update(self.pending.pop(self.games))
+        return self.decision is not None
+
+    def update(self, observations):
+        '''
+        Adds observations one at a time until the log likelihood ratio crosses a bound.
+        '''
+        for observation in observations:
+            self.count += 1
+            self.total += observation
+            self.total_squares += observation * observation
+            if self.count < self.min_observations:
+                continue
+            variance = (self.total_squares - self.total * self.total / self.count) / (self.count - 1)
+            if variance <= 0.:
+                continue
+            # for normal observations with means +min_effect and -min_effect
+            self.log_likelihood_ratio = 2. * self.min_effect * self.total / variance
+            if self.log_likelihood_ratio >= self.upper_bound:
+                self.decision = PLAYER_1_NAME
+                return
+            if self.log_likelihood_ratio <= self.lower_bound:
+                self.decision = PLAYER_2_NAME
+                return
+
+    def report(self):
+        '''
+        Returns the decision and the evidence for it.
+        '''
+        mean = self.total / self.count if self.count else 0.
+        variance = (self.total_squares - self.total * mean) / (self.count - 1) if self.count > 1 else 0.
+        return {
+            'decision': self.decision,
+            'hypotheses': ['{} loses {} chips per observation'.format(PLAYER_1_NAME, self.min_effect),
+                           '{} wins {} chips per observation'.format(PLAYER_1_NAME, self.min_effect)],
+            'alpha': self.alpha,
+            'beta': self.beta,
+            'log_likelihood_ratio': self.log_likelihood_ratio,
+            'bounds': [self.lower_bound, self.upper_bound],
+            'observations': self.count,
+            'games': self.games,
+            'mean': mean,
+            'stddev': math.sqrt(max(variance, 0.)),
+        }
+
+
+def summarize(results, seeds):
+    '''
+    Computes summary statistics of PLAYER_1's final bankroll over all games,
+    which are net bankrolls over both seatings in duplicate matches.
+    The mean is None without any results, and the stddev and confidence interval without two.
+    '''
+    bankrolls = [result[PLAYER_1_NAME] for result in results]
+    mean = statistics.mean(bankrolls) if bankrolls else None
+    stddev = statistics.stdev(bankrolls) if len(bankrolls) > 1 else None
+    confidence_interval = None
+    if stddev is not None:
+        half_width = CONFIDENCE_Z * stddev / math.sqrt(len(bankrolls))
+        confidence_interval = [mean - half_width, mean + half_width]
+    return {
+        'player': PLAYER_1_NAME,
+        'opponent': PLAYER_2_NAME,
+        'games': len(bankrolls),
+        'rounds_per_game': 2 * NUM_ROUNDS if DUPLICATE_MATCH else NUM_ROUNDS,
+        'duplicate': DUPLICATE_MATCH,
+        'wins': sum(1 for bankroll in bankrolls if bankroll > 0),
+        'losses': sum(1 for bankroll in bankrolls if bankroll < 0),
+        'mean': mean,
+        'stddev': stddev,
+        'confidence_interval': confidence_interval,
+        'bankrolls': bankrolls,
+        'seeds': seeds,
+    }
+
+
+def play_pool(jobs, workers, initargs, on_result):
+    '''
+    Plays jobs on a pool of worker processes, keeping at most workers games in progress,
+    and passes each result to on_result. No more games are started once it returns True.
+    '''
+    completed = queue.Queue()
+    with Pool(workers, initializer=init_worker, initargs=initargs) as pool:
+        def start(job):
+            pool.apply_async(play_game, (job,), callback=completed.put, error_callback=completed.put)
+        remaining = iter(jobs)
+        in_progress = 0
+        for job in itertools.islice(remaining, workers):
+            start(job)
+            in_progress += 1
+        stopped = False
+        while in_progress:
+            result = completed.get()
+            in_progress -= 1
+            if isinstance(result, BaseException):
+                raise result
+            if on_result(*result):
+                stopped = True
+            job = None if stopped else next(remaining, None)
+            if job is not None:
+                start(job)
+                in_progress += 1
+        # let the workers exit on their own, which stops any warm pokerbots they kept
+        pool.close()
+        pool.join()
+
+
+def run_tournament(num_games, output_dir, workers, use_asyncio=False, concurrency=0, early_stopping=False):
+    '''
+    Plays num_games games on a pool of worker processes, or on one event loop if use_asyncio is set,
+    and writes summary.json. With early_stopping, no more games are played once a sequential test
+    decides which player is better, and its decision is added to the summary.
+    '''
+    assert PLAYER_1_NAME != PLAYER_2_NAME, 'player names must differ'
+    output_dir = os.path.abspath(output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    player_1_path = os.path.abspath(PLAYER_1_PATH)
+    player_2_path = os.path.abspath(PLAYER_2_PATH)
+    engine.PLAYER_1_PATH = player_1_path
+    engine.PLAYER_2_PATH = player_2_path
+    build_cache_dir = BUILD_CACHE_DIR if BUILD_CACHE_DIR is not None else TOURNAMENT_BUILD_CACHE_DIR
+    engine.BUILD_CACHE_PATH = os.path.abspath(build_cache_dir) if build_cache_dir is not None else None
+    print('Building pokerbots...')
+    build_players(output_dir)
+    # seeds are drawn here, since forked workers would otherwise share their random state
+    seeds = [GAME_SEED + game_num - 1 if GAME_SEED is not None else random.randrange(engine.SEED_RANGE)
+             for game_num in range(1, num_games + 1)]
+    jobs = [(game_num, os.path.join(output_dir, 'game_{:05d}'.format(game_num)), seeds[game_num - 1])
+            for game_num in range(1, num_games + 1)]
+    results = [None] * num_games
+    test = None
+    if early_stopping:
+        # an observation of a duplicate match is a round in both seatings
+        test = SequentialTest(SPRT_MIN_EFFECT * (2 if DUPLICATE_MATCH else 1), SPRT_ALPHA, SPRT_BETA, SPRT_MIN_ROUNDS)
+    completed = itertools.count(1)
+
+    def on_result(game_num, bankrolls, round_deltas):
+        results[game_num - 1] = bankrolls
+        print('Game #{} ({}/{}){}'.format(game_num, next(completed), num_games,
+                                          ''.join(engine.PVALUE(name, bankrolls[name])
+                                                  for name in (PLAYER_1_NAME, PLAYER_2_NAME))))
+        return test is not None and test.add_game(game_num, round_deltas)
+
+    if use_asyncio:
+        print('Playing', num_games, 'games on one event loop...')
+        asyncio.run(asyncengine.play_games([game_dir for _, game_dir, _ in jobs], concurrency, seeds=seeds,
+                                           duplicate=DUPLICATE_MATCH, on_result=on_result))
+    else:
+        print('Playing', num_games, 'games on', workers, 'workers...')
+        play_pool(jobs, workers, (player_1_path, player_2_path), on_result)
+    played = [game_num for game_num in range(num_games) if results[game_num] is not None]
+    summary = summarize([results[game_num] for game_num in played], [seeds[game_num] for game_num in played])
+    if test is not None:
+        summary['sequential_test'] = test.report()
+        summary['sequential_test']['min_effect_per_round'] = SPRT_MIN_EFFECT
+    name = os.path.join(output_dir, 'summary.json')
+    print('Writing', name)
+    with open(name, 'w') as summary_file:
+        json.dump(summary, summary_file, indent=2)
+    return summary
+
+
+def parse_args():
+    '''
+    Parses tournament arguments, which default to the values in config.py.
+    '''
+    parser = argparse.ArgumentParser(prog='python3 tournament.py')
+    parser.add_argument('-n', '--games', type=int, default=NUM_GAMES, help='Number of games to play')
+    parser.add_argument('-j', '--workers', type=int, default=TOURNAMENT_WORKERS,
+                        help='Number of worker processes, 0 uses every core')
+    parser.add_argument('-o', '--output', type=str, default=TOURNAMENT_DIR,
+                        help='Directory holding one subdirectory per game')
+    parser.add_argument('--asyncio', action='store_true',
+                        help='Play every game on one asyncio event loop instead of worker processes')
+    parser.add_argument('-c', '--concurrent', type=int, default=0,
+                        help='With --asyncio, number of games played at once, 0 plays them all at once')
+    parser.add_argument('--early-stopping', action='store_true', default=EARLY_STOPPING,
+                        help='Stop once a sequential test decides which player is better')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    ARGS = parse_args()
+    SUMMARY = run_tournament(ARGS.games, ARGS.output, ARGS.workers or os.cpu_count(), ARGS.asyncio, ARGS.concurrent,
+                             ARGS.early_stopping)
+    print()
+    print('{} vs {} over {} games of {} rounds'.format(SUMMARY['player'], SUMMARY['opponent'],
+                                                      SUMMARY['games'], SUMMARY['rounds_per_game']))
+    if SUMMARY['mean'] is None:
+        print('No results')
+    elif SUMMARY['stddev'] is None:
+        print('Mean bankroll {:.2f}, too few games for a stddev'.format(SUMMARY['mean']))
+    else:
+        print('Mean bankroll {:.2f}, stddev {:.2f}, 95% CI [{:.2f}, {:.2f}]'.format(
+            SUMMARY['mean'], SUMMARY['stddev'], *SUMMARY['confidence_interval']))
+    if 'sequential_test' in SUMMARY:
+        TEST = SUMMARY['sequential_test']
+        if TEST['decision'] is None:
+            print('Sequential test undecided after {} rounds, log likelihood ratio {:.2f} in ({:.2f}, {:.2f})'.format(
+                TEST['observations'], TEST['log_likelihood_ratio'], *TEST['bounds']))
+        else:
+            print('Sequential test decided {} is better after {} rounds of {} games, log likelihood ratio {:.2f}'.format(
+                TEST['decision'], TEST['observations'], TEST['games'], TEST['log_likelihood_ratio']))